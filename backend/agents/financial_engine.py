@@ -173,9 +173,9 @@ class FinancialEngine:
             "roi_year1_percent": round(roi_year1, 2)
         }
     
-    def generate_financial_model(self) -> Dict:
-        """Generate complete financial model"""
-        revenue_projections = self.calculate_revenue_projection(years=5)
+    def generate_financial_model(self, years: int = 5) -> Dict:
+        """Generate complete financial model over `years` annual periods"""
+        revenue_projections = self.calculate_revenue_projection(years=years)
         cogs = self.calculate_cogs(revenue_projections)
         opex = self.calculate_operating_expenses(revenue_projections)
         pnl = self.calculate_pnl(revenue_projections, cogs, opex)
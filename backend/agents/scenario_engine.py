@@ -0,0 +1,125 @@
+"""Scenario Engine - Best/worst/realistic and what-if financial scenarios
+Deterministic, built on top of the FinancialEngine. NO AI INVOLVED."""
+
+from typing import Dict, List
+
+from .financial_engine import FinancialEngine
+
+# Fixed multipliers for the standard three-scenario set
+BEST_CASE = {"revenue_multiplier": 1.2, "cost_multiplier": 0.9}
+WORST_CASE = {"revenue_multiplier": 0.7, "cost_multiplier": 1.15}
+
+
+def build_scenario(
+    intake_data: Dict,
+    benchmarks: Dict,
+    revenue_multiplier: float,
+    cost_multiplier: float,
+    adjust_costs: bool = True
+) -> Dict:
+    """Run the financial engine for a single what-if scenario"""
+    scenario_intake = intake_data.copy()
+    scenario_intake["monthly_revenue_estimate"] = intake_data.get("monthly_revenue_estimate", 0) * revenue_multiplier
+    model = FinancialEngine(scenario_intake, benchmarks).generate_financial_model()
+
+    # generate_financial_model() returns the model directly, not wrapped in "data"
+    data = model["data"] if "data" in model else model
+
+    # Adjust costs - check for pnl_annual (not pnl_monthly)
+    if adjust_costs and data.get("pnl_annual"):
+        for year in data["pnl_annual"]:
+            if "operating_expenses" in year:
+                year["operating_expenses"] = year["operating_expenses"] * cost_multiplier
+            if "total_expenses" in year:
+                year["total_expenses"] = year["total_expenses"] * cost_multiplier
+            if "net_profit" in year:
+                year["net_profit"] = year.get("revenue", 0) - year.get("total_expenses", 0)
+
+    data["revenue_multiplier"] = revenue_multiplier
+    data["cost_multiplier"] = cost_multiplier
+    return data
+
+
+def build_scenario_set(intake_data: Dict, financial_data: Dict, benchmarks: Dict) -> Dict:
+    """Build the best case, worst case and realistic scenarios for a plan"""
+    scenarios = {}
+
+    # 1. Best Case Scenario (+20% revenue, -10% costs)
+    # Only revenue is re-projected; cost figures are left as the engine computed them
+    scenarios["best_case"] = build_scenario(
+        intake_data, benchmarks, BEST_CASE["revenue_multiplier"], BEST_CASE["cost_multiplier"], adjust_costs=False
+    )
+
+    # 2. Worst Case Scenario (-30% revenue, +15% costs)
+    scenarios["worst_case"] = build_scenario(
+        intake_data, benchmarks, WORST_CASE["revenue_multiplier"], WORST_CASE["cost_multiplier"]
+    )
+
+    # 3. Realistic Scenario (base projections)
+    realistic = financial_data.copy()
+    realistic["revenue_multiplier"] = 1.0
+    realistic["cost_multiplier"] = 1.0
+    scenarios["realistic"] = realistic
+
+    return scenarios
+
+
+def calculate_sensitivity(intake_data: Dict, financial_data: Dict, benchmarks: Dict) -> List[Dict]:
+    """Calculate sensitivity analysis for key variables"""
+
+    variables = []
+
+    # Revenue sensitivity
+    base_revenue = intake_data.get("monthly_revenue_estimate", 0)
+    if base_revenue > 0:
+        # Test ±20% revenue change - check for pnl_annual (not pnl_monthly)
+        pnl_data = financial_data.get("pnl_annual") or financial_data.get("pnl_monthly", [{}])
+        if pnl_data and len(pnl_data) > 0:
+            first_period = pnl_data[0]
+            period_revenue = first_period.get("revenue", 0)
+            revenue_impact = (period_revenue * 0.2) / base_revenue * 100 if base_revenue > 0 else 0
+            variables.append({
+                "name": "Monthly Revenue",
+                "impact_score": min(100, abs(revenue_impact)),
+                "effect": "positive" if revenue_impact > 0 else "negative",
+                "description": "20% change in revenue affects profitability significantly"
+            })
+
+    # Cost sensitivity
+    pnl_data = financial_data.get("pnl_annual") or financial_data.get("pnl_monthly", [])
+    if pnl_data and len(pnl_data) > 0:
+        first_period = pnl_data[0]
+        base_costs = first_period.get("total_expenses", 0)
+        if base_costs > 0:
+            cost_impact = (base_costs * 0.15) / base_costs * 100
+            variables.append({
+                "name": "Operating Costs",
+                "impact_score": min(100, abs(cost_impact)),
+                "effect": "negative",
+                "description": "15% change in costs has significant impact on profitability"
+            })
+
+    # Price per unit sensitivity
+    price_per_unit = intake_data.get("price_per_unit", 0)
+    if price_per_unit > 0:
+        variables.append({
+            "name": "Price per Unit",
+            "impact_score": 75,
+            "effect": "positive",
+            "description": "Price changes directly affect revenue and margins"
+        })
+
+    # Units per month sensitivity
+    units_per_month = intake_data.get("units_per_month", 0)
+    if units_per_month > 0:
+        variables.append({
+            "name": "Units per Month",
+            "impact_score": 80,
+            "effect": "positive",
+            "description": "Volume changes significantly impact total revenue"
+        })
+
+    # Sort by impact score
+    variables.sort(key=lambda x: x["impact_score"], reverse=True)
+
+    return variables
@@ -0,0 +1,212 @@
+"""Explain the queries behind each route and flag collection scans
+
+Dev tool: runs `explain` (queryPlanner) for the find/count/sort shapes the
+API routes issue and reports any whose winning plan contains a COLLSCAN.
+Run it against a database with the indexes from utils/db_init.INDEX_MANIFEST
+applied (pass --sync to apply them first). Exits non-zero when an unexpected
+scan is found so it can gate CI.
+
+Two sources of queries:
+
+- QUERY_CATALOG, a hand-maintained list with at least one entry per route
+  module. It is manual and can drift from the routes; update it alongside
+  new queries.
+- --shapes FILE: the shapes the routes actually issued, as recorded by
+  utils/db_metrics and served by GET /admin/db-stats/shapes (save the JSON
+  response after exercising the app, e.g. a staging run or the e2e suite).
+  Placeholder values stand in for the literals the shapes leave out.
+
+    python audit_query_plans.py [--sync] [--route plans] [--shapes shapes.json]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+from bson import ObjectId
+from datetime import datetime
+import os
+
+ROOT_DIR = Path(__file__).parent
+sys.path.insert(0, str(ROOT_DIR))
+load_dotenv(ROOT_DIR / '.env')
+
+from utils.db_init import create_indexes  # noqa: E402
+
+# Placeholder values: explain only needs the query shape
+PLAN_ID = "000000000000000000000000"
+USER_ID = "000000000000000000000001"
+OID = ObjectId()
+
+# (route, collection, filter, sort)
+QUERY_CATALOG = [
+    ("POST /auth/login", "users", {"email": "user@example.com"}, None),
+    ("GET /plans", "plans", {"user_id": USER_ID}, [("created_at", -1)]),
+    ("GET /plans/{id}", "plans", {"_id": OID, "user_id": USER_ID}, None),
+    ("GET /plans/{id}/sections", "sections", {"plan_id": PLAN_ID}, [("order_index", 1)]),
+    ("GET /plans/{id}/financials", "financial_models", {"plan_id": PLAN_ID}, None),
+    ("GET /plans/{id}/compliance", "compliance_reports", {"plan_id": PLAN_ID}, None),
+    ("GET /plans/{id}/research", "research_packs", {"plan_id": PLAN_ID}, None),
+    ("GET /subscriptions/current", "subscriptions", {"user_id": USER_ID}, None),
+    ("GET /exports", "exports", {"user_id": USER_ID}, [("created_at", -1)]),
+    ("POST /exports (cache lookup)", "exports",
+     {"plan_id": PLAN_ID, "cache_key": "k", "status": "complete", "storage": "gridfs"}, [("created_at", -1)]),
+    ("POST /exports (fragments)", "pdf_fragments", {"key": {"$in": ["k"]}, "storage": "gridfs"}, None),
+    ("GET /exports/bulk/{id}", "bulk_export_jobs", {"_id": OID, "user_id": USER_ID}, None),
+    ("GET /audit-logs", "audit_logs", {"user_id": USER_ID, "activity_type": "export_created"}, [("timestamp", -1)]),
+    ("GET /audit-logs/entity/{type}/{id}", "audit_logs", {"entity_type": "plan", "entity_id": PLAN_ID}, [("timestamp", -1)]),
+    ("GET /audit-logs/stats", "audit_logs", {"user_id": USER_ID, "timestamp": {"$gte": datetime.utcnow()}}, None),
+    ("GET /plans/{id}/shares", "plan_shares", {"plan_id": PLAN_ID, "is_active": True}, [("created_at", -1)]),
+    ("GET /plans/shared/{token}", "plan_shares", {"share_token": "token", "is_active": True}, None),
+    ("GET /plans/{id}/collaborators", "plan_collaborators", {"plan_id": PLAN_ID}, None),
+    ("collaborator access check", "plan_collaborators", {"plan_id": PLAN_ID, "user_id": USER_ID}, None),
+    ("GET /plans/{id}/comments", "plan_comments", {"plan_id": PLAN_ID, "section_id": "s"}, [("created_at", 1)]),
+    ("GET /plans/{id}/versions", "plan_versions", {"plan_id": PLAN_ID}, [("created_at", -1)]),
+    ("GET /plans/{id}/chat/history", "plan_chats", {"plan_id": PLAN_ID, "user_id": USER_ID}, [("created_at", -1)]),
+    ("GET /plans/{id}/pitch-deck/download", "pitch_decks",
+     {"plan_id": PLAN_ID, "user_id": USER_ID}, [("created_at", -1)]),
+    ("GET /plans/{id}/scenarios", "plan_scenarios", {"plan_id": PLAN_ID}, [("created_at", -1)]),
+    ("GET /{plan_id}/swot", "swot_analyses", {"plan_id": PLAN_ID}, None),
+    ("GET /{plan_id}/competitors", "competitor_analyses", {"plan_id": PLAN_ID}, None),
+    ("GET /{plan_id}/canvas", "business_model_canvas", {"plan_id": PLAN_ID}, None),
+    ("GET /tickets", "tickets", {"user_id": USER_ID, "status": "open"}, [("created_at", -1)]),
+    ("GET /admin/tickets", "tickets", {"status": "open"}, [("created_at", -1)]),
+    ("GET /users/achievements", "user_achievements", {"user_id": USER_ID}, None),
+    ("POST /webhook/revenucat", "revenucat_user_mappings", {"revenucat_user_id": "rc"}, None),
+    ("GET /companies", "companies", {"user_id": USER_ID}, [("created_at", -1)]),
+    # Admin
+    ("GET /admin/stats (signups)", "users", {"created_at": {"$gte": datetime.utcnow()}}, None),
+    ("GET /admin/stats (plan status)", "plans", {"status": "failed"}, None),
+    ("GET /admin/stats (new plans)", "plans", {"created_at": {"$gte": datetime.utcnow()}}, None),
+    ("GET /admin/stats (subscriptions)", "subscriptions", {"tier": "pro", "status": "active"}, None),
+    ("GET /admin/analytics (users by tier)", "users", {"subscription_tier": "pro"}, None),
+    ("GET /admin/users", "users", {}, [("created_at", -1), ("_id", -1)]),
+    ("GET /admin/users/{id} (plans)", "plans", {"user_id": USER_ID}, [("created_at", -1)]),
+    ("GET /admin/users/{id} (payments)", "payment_transactions", {"user_id": USER_ID}, [("created_at", -1)]),
+    ("GET /admin/admins", "users", {"role": "admin"}, None),
+    # Analytics, scoring, achievements and comparison
+    ("GET /plans/{id}/analytics", "plans", {"_id": OID, "user_id": USER_ID}, None),
+    ("GET /plans/{id}/analytics (backfill)", "sections", {"plan_id": PLAN_ID}, [("order_index", 1)]),
+    ("GET /plans/{id}/readiness-score", "sections", {"plan_id": PLAN_ID}, [("order_index", 1)]),
+    ("POST /users/achievements/check (plans)", "plans", {"user_id": USER_ID}, None),
+    ("POST /users/achievements/check (collaborations)", "plan_collaborators", {"user_id": USER_ID}, None),
+    ("POST /users/achievements/check (exports)", "exports", {"user_id": USER_ID}, None),
+    ("POST /plans/compare", "plans", {"_id": {"$in": [OID]}, "user_id": USER_ID}, None),
+    ("POST /plans/compare (financials)", "financial_models", {"plan_id": {"$in": [PLAN_ID]}}, None),
+    # Auth, billing and generation
+    ("GET /auth/google/callback", "users", {"email": "user@example.com"}, None),
+    ("GET /subscriptions/usage", "plans", {"user_id": USER_ID}, None),
+    ("GET /stripe/checkout/status/{id}", "payment_transactions", {"session_id": "cs"}, None),
+    ("POST /{plan_id}/swot", "sections", {"plan_id": PLAN_ID, "section_type": "swot_analysis"}, None),
+    ("GET /plans/{id}/versions/{vid} (delta chain)", "plan_versions",
+     {"plan_id": PLAN_ID, "version_number": {"$gte": 1, "$lte": 2}}, [("version_number", 1)]),
+    # Background jobs
+    ("mail sender (claim)", "mail_outbox", {"status": "pending", "next_attempt_at": {"$lte": datetime.utcnow()}}, [("next_attempt_at", 1)]),
+    ("export sweeper", "export_files.files", {"metadata.last_accessed": {"$lt": datetime.utcnow()}}, None),
+    ("export sweeper (exports)", "exports", {"storage_id": {"$in": ["s"]}}, None),
+]
+
+# Admin dashboard counters over whole collections or low-cardinality fields:
+# scanning is expected, and indexing each would tax every user/plan write
+ALLOWED_SCANS = {
+    "GET /admin/stats (new plans)",
+    "GET /admin/stats (subscriptions)",
+    "GET /admin/analytics (users by tier)",
+    "GET /admin/admins",
+}
+
+# Operations whose first argument is a filter explain can plan
+EXPLAINABLE_OPERATIONS = {
+    "find", "find_one", "count_documents", "update_one", "update_many", "replace_one",
+    "delete_one", "delete_many", "find_one_and_update", "find_one_and_replace", "find_one_and_delete"
+}
+
+# Placeholders for operators that do not accept the generic "?" string
+PLACEHOLDERS = {"$exists": True, "$size": 0, "$regex": "^x", "$options": "", "$type": "string"}
+
+
+def _stages(plan):
+    """All stage names in an explain plan tree"""
+    stages = [plan.get("stage")]
+    for child_key in ("inputStage", "queryPlan"):
+        if isinstance(plan.get(child_key), dict):
+            stages += _stages(plan[child_key])
+    for child in plan.get("inputStages", []):
+        stages += _stages(child)
+    return [stage for stage in stages if stage]
+
+
+async def explain(db, collection, query, sort):
+    command = {"find": collection, "filter": query}
+    if sort:
+        command["sort"] = dict(sort)
+    result = await db.command({"explain": command, "verbosity": "queryPlanner"})
+    return _stages(result["queryPlanner"]["winningPlan"])
+
+
+def _sample(shape):
+    """A filter with the shape's "?" placeholders swapped for values explain accepts"""
+    if isinstance(shape, dict):
+        return {key: PLACEHOLDERS.get(key, _sample(value)) for key, value in shape.items()}
+    if isinstance(shape, list):
+        return [_sample(item) for item in shape]
+    return shape
+
+
+def load_shapes(path: str) -> list:
+    """(route, collection, filter, sort) entries from a db-stats/shapes response"""
+    with open(path) as f:
+        data = json.load(f)
+    entries = []
+    for shape in data.get("shapes", data) if isinstance(data, dict) else data:
+        if shape["operation"] not in EXPLAINABLE_OPERATIONS or not isinstance(shape.get("filter"), dict):
+            continue
+        sort = [tuple(field) for field in shape["sort"]] if shape.get("sort") else None
+        entries.append((f"{shape['route']} [{shape['operation']}]", shape["collection"], _sample(shape["filter"]), sort))
+    return entries
+
+
+async def audit_query_plans(sync: bool = False, route_filter: str = None, shapes_path: str = None):
+    """Explain every catalogued (and recorded) query; returns the number of unexpected collection scans"""
+    mongo_url = os.getenv("MONGO_URL")
+    db_name = os.getenv("DB_NAME", "strattio_db")
+
+    if not mongo_url:
+        print("Error: MONGO_URL not found in environment variables")
+        return 1
+
+    client = AsyncIOMotorClient(mongo_url)
+    db = client[db_name]
+
+    if sync:
+        await create_indexes(db, force=True)
+
+    queries = QUERY_CATALOG + (load_shapes(shapes_path) if shapes_path else [])
+
+    scans = 0
+    for route, collection, query, sort in queries:
+        if route_filter and route_filter not in route:
+            continue
+        stages = await explain(db, collection, query, sort)
+        if "COLLSCAN" in stages and route in ALLOWED_SCANS:
+            print(f"~ COLLSCAN  {route:<45} {collection}  {' <- '.join(stages)} (allowed)")
+        elif "COLLSCAN" in stages:
+            scans += 1
+            print(f"✗ COLLSCAN  {route:<45} {collection}  {' <- '.join(stages)}")
+        else:
+            print(f"✓           {route:<45} {collection}  {' <- '.join(stages)}")
+
+    print(f"\n{scans} unexpected collection scan(s) in {len(queries)} queries")
+    client.close()
+    return scans
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Flag route queries that scan whole collections")
+    parser.add_argument("--sync", action="store_true", help="apply INDEX_MANIFEST before explaining")
+    parser.add_argument("--route", help="only explain routes containing this text")
+    parser.add_argument("--shapes", help="also explain the shapes in this GET /admin/db-stats/shapes response")
+    args = parser.parse_args()
+    sys.exit(1 if asyncio.run(audit_query_plans(args.sync, args.route, args.shapes)) else 0)
@@ -1,9 +1,41 @@
-"""Compatibility layer for Stripe Checkout using native stripe package"""
+"""Compatibility layer for Stripe Checkout using native stripe package
 
+Network calls go through the SDK's async path (StripeClient + HTTPXClient), so
+creating a session or polling its status never blocks the event loop. One
+client per API key (and event loop) is kept for the life of the process, which
+reuses its HTTP connections; the SDK applies STRIPE_MAX_RETRIES retries (with
+idempotency keys on POSTs) to connection errors, 409/429 and 5xx responses.
+
+Checkout status lookups are cached: the success page polls
+/checkout/status/{session_id} every few seconds, so an open session's status
+is reused for STRIPE_STATUS_CACHE_TTL seconds and a finished one (complete or
+expired, which never change again) for STRIPE_STATUS_FINAL_TTL. Concurrent
+lookups of the same session share one request.
+
+STRIPE_API_BASE points the client at another server, e.g. a local stripe-mock
+(http://localhost:12111) in tests.
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from typing import Optional, List, Dict
+from typing import Dict, List, Optional, Tuple
+
 import stripe
 
+STRIPE_API_BASE = os.environ.get("STRIPE_API_BASE")
+STRIPE_TIMEOUT = float(os.environ.get("STRIPE_TIMEOUT", "20"))
+STRIPE_MAX_RETRIES = int(os.environ.get("STRIPE_MAX_RETRIES", "2"))
+STRIPE_STATUS_CACHE_TTL = float(os.environ.get("STRIPE_STATUS_CACHE_TTL", "3"))
+STRIPE_STATUS_FINAL_TTL = float(os.environ.get("STRIPE_STATUS_FINAL_TTL", "3600"))
+STRIPE_STATUS_CACHE_SIZE = int(os.environ.get("STRIPE_STATUS_CACHE_SIZE", "1024"))
+
+# Session statuses that never change again
+_FINAL_STATUSES = {"complete", "expired"}
+
 
 @dataclass
 class CheckoutSessionRequest:
@@ -40,22 +72,75 @@ class WebhookResponse:
     payment_status: str
 
 
+# ============================================================================
+# SHARED CLIENTS AND STATUS CACHE
+# ============================================================================
+
+# api key -> (event loop, client); HTTP connections belong to the loop that opened them
+_clients: Dict[str, Tuple[asyncio.AbstractEventLoop, stripe.StripeClient]] = {}
+_status_cache: "OrderedDict[str, Tuple[float, CheckoutStatusResponse]]" = OrderedDict()
+_status_inflight: Dict[str, asyncio.Future] = {}
+
+
+def get_stripe_client(api_key: str) -> stripe.StripeClient:
+    """Process-wide async client for `api_key` (keeps its connection pool)"""
+    loop = asyncio.get_running_loop()
+    entry = _clients.get(api_key)
+    if entry is not None and entry[0] is loop:
+        return entry[1]
+    client = stripe.StripeClient(
+        api_key,
+        http_client=stripe.HTTPXClient(timeout=STRIPE_TIMEOUT),
+        max_network_retries=STRIPE_MAX_RETRIES,
+        base_addresses={"api": STRIPE_API_BASE} if STRIPE_API_BASE else None
+    )
+    _clients[api_key] = (loop, client)
+    return client
+
+
+def _cached_status(session_id: str) -> Optional[CheckoutStatusResponse]:
+    entry = _status_cache.get(session_id)
+    if entry is None:
+        return None
+    expires_at, status = entry
+    if expires_at <= time.monotonic():
+        del _status_cache[session_id]
+        return None
+    return status
+
+
+def _cache_status(status: CheckoutStatusResponse):
+    ttl = STRIPE_STATUS_FINAL_TTL if status.status in _FINAL_STATUSES else STRIPE_STATUS_CACHE_TTL
+    _status_cache[status.session_id] = (time.monotonic() + ttl, status)
+    _status_cache.move_to_end(status.session_id)
+    while len(_status_cache) > STRIPE_STATUS_CACHE_SIZE:
+        _status_cache.popitem(last=False)
+
+
+def invalidate_checkout_status(session_id: str):
+    """Forget a cached status, e.g. when a webhook reports the session changed"""
+    _status_cache.pop(session_id, None)
+
+
 class StripeCheckout:
     """Stripe Checkout wrapper compatible with emergentintegrations interface"""
-    
+
     def __init__(self, api_key: str, webhook_url: str = ""):
         self.api_key = api_key
         self.webhook_url = webhook_url
-        stripe.api_key = api_key
-    
+
+    @property
+    def client(self) -> stripe.StripeClient:
+        return get_stripe_client(self.api_key)
+
     async def create_checkout_session(self, request: CheckoutSessionRequest) -> CheckoutSessionResponse:
         """Create a Stripe checkout session"""
         # Convert amount to cents (Stripe uses smallest currency unit)
         amount_cents = int(request.amount * 100)
-        
-        session = stripe.checkout.Session.create(
-            payment_method_types=request.payment_methods,
-            line_items=[{
+
+        session = await self.client.v1.checkout.sessions.create_async({
+            "payment_method_types": request.payment_methods,
+            "line_items": [{
                 "price_data": {
                     "currency": request.currency,
                     "product_data": {
@@ -65,23 +150,50 @@ class StripeCheckout:
                 },
                 "quantity": 1,
             }],
-            mode="payment",
-            success_url=request.success_url,
-            cancel_url=request.cancel_url,
-            metadata=request.metadata,
-            allow_promotion_codes=True,  # Enable promo code field in checkout
-        )
-        
+            "mode": "payment",
+            "success_url": request.success_url,
+            "cancel_url": request.cancel_url,
+            "metadata": request.metadata,
+            "allow_promotion_codes": True,  # Enable promo code field in checkout
+        })
+
         return CheckoutSessionResponse(
             session_id=session.id,
             url=session.url,
             status=session.status
         )
-    
+
     async def get_checkout_status(self, session_id: str) -> CheckoutStatusResponse:
-        """Get the status of a checkout session"""
-        session = stripe.checkout.Session.retrieve(session_id)
-        
+        """Get the status of a checkout session (cached, see module docstring)"""
+        status = _cached_status(session_id)
+        if status is not None:
+            return status
+
+        inflight = _status_inflight.get(session_id)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        _status_inflight[session_id] = future
+        try:
+            status = await self._retrieve_status(session_id)
+            _cache_status(status)
+            future.set_result(status)
+            return status
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters re-raise it; mark it retrieved so an unwaited future doesn't warn
+            future.exception()
+            raise
+        finally:
+            _status_inflight.pop(session_id, None)
+
+    async def _retrieve_status(self, session_id: str) -> CheckoutStatusResponse:
+        session = await self.client.v1.checkout.sessions.retrieve_async(session_id)
+
         return CheckoutStatusResponse(
             session_id=session.id,
             status=session.status,
@@ -90,25 +202,25 @@ class StripeCheckout:
             currency=session.currency or "gbp",
             metadata=dict(session.metadata) if session.metadata else {}
         )
-    
+
     async def handle_webhook(self, payload: bytes, signature: str) -> WebhookResponse:
-        """Handle a Stripe webhook event"""
+        """Handle a Stripe webhook event (local parsing, no network call)"""
         webhook_secret = stripe.webhook_secret if hasattr(stripe, 'webhook_secret') else None
-        
+
         if webhook_secret:
             event = stripe.Webhook.construct_event(payload, signature, webhook_secret)
         else:
-            import json
-            event = stripe.Event.construct_from(json.loads(payload), stripe.api_key)
-        
+            event = stripe.Event.construct_from(json.loads(payload), self.api_key)
+
         session_id = ""
         payment_status = "unknown"
-        
+
         if event.type == "checkout.session.completed":
             session = event.data.object
             session_id = session.id
             payment_status = session.payment_status or "paid"
-        
+            invalidate_checkout_status(session_id)
+
         return WebhookResponse(
             event_type=event.type,
             event_id=event.id,
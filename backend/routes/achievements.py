@@ -7,6 +7,7 @@ import logging
 
 from utils.serializers import serialize_doc, to_object_id
 from utils.dependencies import get_db
+from utils.plan_metrics import METRICS_FIELD, load_plan_metrics, quality_breakdown, readiness_breakdown
 from utils.admin import get_current_user_id
 
 router = APIRouter()
@@ -112,9 +113,13 @@ async def check_achievements(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Get user's plans
-    plans = await db.plans.find({"user_id": user_id}).to_list(None)
+    # Get user's plans with their maintained metrics (no sections or financials are read)
+    plans = await db.plans.find(
+        {"user_id": user_id},
+        {"created_at": 1, "completed_at": 1, METRICS_FIELD: 1}
+    ).to_list(None)
     plan_count = len(plans)
+    plan_metrics = await load_plan_metrics(db, plans)
     
     # Get user achievements
     user_achievements = await db.user_achievements.find_one({"user_id": user_id})
@@ -130,15 +135,14 @@ async def check_achievements(
         achievements_to_check.append("first_plan")
     
     # 2. Financial Master
-    financial_plans = await db.financial_models.find({"plan_id": {"$in": [str(p["_id"]) for p in plans]}}).to_list(None)
-    if len(financial_plans) > 0 and "financial_master" not in earned_badge_ids:
+    has_financials = any(totals.get("financial", {}).get("present") for totals in plan_metrics)
+    if has_financials and "financial_master" not in earned_badge_ids:
         achievements_to_check.append("financial_master")
     
     # 3. Plan Perfectionist
-    for plan in plans:
-        sections = await db.sections.find({"plan_id": str(plan["_id"])}).to_list(None)
-        total_sections = len(sections)
-        completed_sections = sum(1 for s in sections if s.get("content") and len(s.get("content", "").strip()) > 50)
+    for totals in plan_metrics:
+        total_sections = totals["sections"]
+        completed_sections = totals["completed"]
         if total_sections > 0 and (completed_sections / total_sections) >= 1.0 and "plan_perfectionist" not in earned_badge_ids:
             achievements_to_check.append("plan_perfectionist")
             break
@@ -168,17 +172,15 @@ async def check_achievements(
         achievements_to_check.append("export_expert")
     
     # 7. Quality Champion
-    for plan in plans:
-        analytics = plan.get("analytics", {})
-        quality_score = analytics.get("quality_score", 0)
+    for totals in plan_metrics:
+        quality_score = sum(quality_breakdown(totals).values())
         if quality_score >= 80 and "quality_champion" not in earned_badge_ids:
             achievements_to_check.append("quality_champion")
             break
     
     # 8. Readiness Expert
-    for plan in plans:
-        readiness_score = plan.get("readiness_score", {})
-        overall_score = readiness_score.get("overall_score", 0)
+    for totals in plan_metrics:
+        overall_score = sum(readiness_breakdown(totals).values())
         if overall_score >= 80 and "readiness_expert" not in earned_badge_ids:
             achievements_to_check.append("readiness_expert")
             break
@@ -4,13 +4,18 @@ from fastapi import APIRouter, HTTPException, Depends, Header
 from pydantic import BaseModel, EmailStr
 from typing import Optional, List, Dict
 from datetime import datetime, timedelta
+import asyncio
 import logging
 from bson import ObjectId
 
 from utils.serializers import serialize_doc, to_object_id
-from utils.auth import get_password_hash, verify_password
+from utils.auth import get_password_hash_async
 from utils.dependencies import get_db
+from utils.loaders import Loaders, get_loaders
+from utils.pagination import PageParams, legacy_page_params, paginate
 from utils.admin import get_current_admin_user, get_current_user_id
+from utils.db_metrics import DB_N_PLUS_ONE_THRESHOLD, DB_SLOW_QUERY_MS, get_db_stats, get_query_shapes, reset_db_stats
+from utils.loop_monitor import get_loop_stats, reset_loop_stats
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -229,17 +234,55 @@ async def get_revenue_analytics(
         "by_tier": tier_revenue
     }
 
+@router.get("/db-stats")
+async def get_database_stats(
+    limit: int = 50,
+    reset: bool = False,
+    admin_user = Depends(get_current_admin_user)
+):
+    """Per-route Mongo query counts and time for this instance (see utils/db_metrics)"""
+    
+    routes = get_db_stats(limit)
+    if reset:
+        reset_db_stats()
+    
+    return {
+        "routes": routes,
+        "slow_query_ms": DB_SLOW_QUERY_MS,
+        "n_plus_one_threshold": DB_N_PLUS_ONE_THRESHOLD
+    }
+
+@router.get("/db-stats/shapes")
+async def get_database_query_shapes(admin_user = Depends(get_current_admin_user)):
+    """Distinct query shapes per route on this instance (input for audit_query_plans.py --shapes)"""
+    
+    return {"shapes": get_query_shapes()}
+
+@router.get("/loop-stats")
+async def get_event_loop_stats(
+    limit: int = 20,
+    reset: bool = False,
+    admin_user = Depends(get_current_admin_user)
+):
+    """Event loop lag and, with LOOP_BLOCK_DEBUG, blocking call sites for this instance (see utils/loop_monitor)"""
+    
+    stats = get_loop_stats(limit)
+    if reset:
+        reset_loop_stats()
+    
+    return stats
+
 # ============================================================================
 # USER MANAGEMENT ROUTES
 # ============================================================================
 
 @router.get("/users")
 async def list_users(
-    skip: int = 0,
-    limit: int = 50,
+    paging: PageParams = Depends(legacy_page_params),
     search: Optional[str] = None,
     admin_user = Depends(get_current_admin_user),
-    db = Depends(get_db)
+    db = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """List all users with pagination and search"""
     
@@ -252,17 +295,18 @@ async def list_users(
             ]
         }
     
-    users = await db.users.find(query).sort("created_at", -1).skip(skip).limit(limit).to_list(None)
-    total = await db.users.count_documents(query)
+    page = await paginate(db.users, query, paging, projection={"password_hash": 0})
+    users = page.items
+    
+    # Subscription and plan count for the page of users (one query each)
+    user_ids = [str(user["_id"]) for user in users]
+    subscriptions, plan_counts = await asyncio.gather(
+        loaders.subscriptions_by_user.load_many(user_ids),
+        loaders.plan_counts_by_user.load_many(user_ids)
+    )
     
-    # Get subscription info for each user
-    for user in users:
-        user_id = str(user["_id"])
-        subscription = await db.subscriptions.find_one({"user_id": user_id})
+    for user, subscription, plan_count in zip(users, subscriptions, plan_counts):
         user["subscription"] = serialize_doc(subscription) if subscription else None
-        
-        # Get plan count
-        plan_count = await db.plans.count_documents({"user_id": user_id})
         user["plan_count"] = plan_count
         
         # Remove sensitive data
@@ -272,13 +316,12 @@ async def list_users(
     # Serialize users
     serialized_users = [serialize_doc(u) for u in users]
     
-    logger.info(f"Admin: Listed {len(serialized_users)} users (total: {total}, skip: {skip}, limit: {limit})")
+    logger.info(f"Admin: Listed {len(serialized_users)} users (total: {page.total}, limit: {paging.limit})")
     
     return {
         "users": serialized_users,
-        "total": total,
-        "skip": skip,
-        "limit": limit
+        "skip": paging.skip,
+        **page.meta()
     }
 
 @router.get("/users/{user_id}")
@@ -335,7 +378,7 @@ async def change_user_password(
     await db.users.update_one(
         {"_id": to_object_id(user_id)},
         {"$set": {
-            "password_hash": get_password_hash(password_data.new_password),
+            "password_hash": await get_password_hash_async(password_data.new_password),
             "updated_at": datetime.utcnow()
         }}
     )
@@ -358,7 +401,7 @@ async def change_admin_password(
     await db.users.update_one(
         {"_id": admin_user["_id"]},
         {"$set": {
-            "password_hash": get_password_hash(password_data.new_password),
+            "password_hash": await get_password_hash_async(password_data.new_password),
             "updated_at": datetime.utcnow()
         }}
     )
@@ -419,7 +462,7 @@ async def create_admin(
     # Create admin user
     admin_doc = {
         "email": admin_data.email,
-        "password_hash": get_password_hash(admin_data.password),
+        "password_hash": await get_password_hash_async(admin_data.password),
         "name": admin_data.name or admin_data.email.split("@")[0],
         "role": "admin",
         "subscription_tier": "enterprise",
@@ -9,6 +9,8 @@ import os
 from utils.serializers import serialize_doc, to_object_id
 from utils.dependencies import get_db
 from utils.admin import get_current_user_id
+from utils.plan_loader import load_plan_aggregate
+from utils.plan_revision import with_revision_bump
 from emergentintegrations.llm.chat import LlmChat, UserMessage
 
 router = APIRouter()
@@ -22,19 +24,19 @@ async def get_ai_insights(
 ):
     """Get AI-powered insights for a plan"""
     
-    # Get plan
-    plan = await db.plans.find_one({
-        "_id": to_object_id(plan_id),
-        "user_id": user_id
-    })
+    # Get plan and its data in one round trip
+    aggregate = await load_plan_aggregate(
+        db, plan_id, user_id,
+        sections=True, financial_model=True, research_pack=True
+    )
     
-    if not plan:
+    if not aggregate:
         raise HTTPException(status_code=404, detail="Plan not found")
     
-    # Get plan data
-    sections = await db.sections.find({"plan_id": plan_id}).sort("order_index", 1).to_list(None)
-    financial_model = await db.financial_models.find_one({"plan_id": plan_id})
-    research_pack = await db.research_packs.find_one({"plan_id": plan_id})
+    plan = aggregate.plan
+    sections = aggregate.sections
+    financial_model = aggregate.financial_model
+    research_pack = aggregate.research_pack
     intake_data = plan.get("intake_data", {})
     
     # Generate insights using AI
@@ -43,7 +45,7 @@ async def get_ai_insights(
     # Store insights
     await db.plans.update_one(
         {"_id": to_object_id(plan_id)},
-        {"$set": {"ai_insights": insights, "updated_at": datetime.utcnow()}}
+        with_revision_bump({"$set": {"ai_insights": insights, "updated_at": datetime.utcnow()}})
     )
     
     return insights
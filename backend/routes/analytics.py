@@ -1,18 +1,28 @@
 """Plan analytics routes - Track completion, quality, and progress metrics"""
 
 from fastapi import APIRouter, HTTPException, Depends
-from typing import Optional, Dict
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
-from bson import ObjectId
 
-from utils.serializers import serialize_doc, to_object_id
 from utils.dependencies import get_db
 from utils.admin import get_current_user_id
+from utils.plan_metrics import METRICS_FIELD, completion_percent, load_plan_metrics, quality_breakdown
+from utils.serializers import to_object_id
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Plan fields the analytics are built from; section totals are maintained on
+# write (utils/plan_metrics), so no section is read here
+ANALYTICS_PLAN_PROJECTION = {
+    METRICS_FIELD: 1, "created_at": 1, "updated_at": 1, "completed_at": 1, "intake_data.industry": 1
+}
+
+def _as_datetime(value):
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return value
+
 @router.get("/plans/{plan_id}/analytics")
 async def get_plan_analytics(
     plan_id: str,
@@ -21,92 +31,33 @@ async def get_plan_analytics(
 ):
     """Get analytics for a specific plan"""
     
-    # Get plan
-    plan = await db.plans.find_one({
-        "_id": to_object_id(plan_id),
-        "user_id": user_id
-    })
-    
+    plan = await db.plans.find_one({"_id": to_object_id(plan_id), "user_id": user_id}, ANALYTICS_PLAN_PROJECTION)
     if not plan:
         raise HTTPException(status_code=404, detail="Plan not found")
     
-    # Get all sections for this plan
-    sections = await db.sections.find({"plan_id": plan_id}).sort("order_index", 1).to_list(None)
-    
-    # Get financial model
-    financial_model = await db.financial_models.find_one({"plan_id": plan_id})
+    totals = (await load_plan_metrics(db, [plan]))[0]
     
     # Calculate completion score
-    total_sections = len(sections)
-    completed_sections = sum(1 for s in sections if s.get("content") and len(s.get("content", "").strip()) > 50)
-    completion_score = int((completed_sections / total_sections * 100)) if total_sections > 0 else 0
-    
-    # Calculate quality score
-    quality_factors = {
-        "section_length": 0,  # Average word count
-        "financial_completeness": 0,  # Financial data filled
-        "detail_level": 0,  # Citations and data points
-        "user_engagement": 0  # User edits
-    }
+    total_sections = totals["sections"]
+    completed_sections = totals["completed"]
+    completion_score = completion_percent(totals)
     
-    # Section length factor (0-25 points)
-    total_words = sum(s.get("word_count", 0) for s in sections)
-    avg_words = total_words / total_sections if total_sections > 0 else 0
-    # Target: 500 words per section average
-    quality_factors["section_length"] = min(25, int((avg_words / 500) * 25))
-    
-    # Financial completeness factor (0-25 points)
-    if financial_model:
-        financial_data = financial_model.get("data", {})
-        pnl = financial_data.get("pnl_monthly", [])
-        cashflow = financial_data.get("cashflow_monthly", [])
-        # Check if we have at least 12 months of data
-        if len(pnl) >= 12 and len(cashflow) >= 12:
-            quality_factors["financial_completeness"] = 25
-        elif len(pnl) >= 6 and len(cashflow) >= 6:
-            quality_factors["financial_completeness"] = 15
-        else:
-            quality_factors["financial_completeness"] = 5
-    else:
-        quality_factors["financial_completeness"] = 0
-    
-    # Detail level factor (0-25 points) - based on citations
-    total_citations = sum(len(s.get("data_citations", [])) for s in sections)
-    citations_per_section = total_citations / total_sections if total_sections > 0 else 0
-    # Target: 3 citations per section
-    quality_factors["detail_level"] = min(25, int((citations_per_section / 3) * 25))
-    
-    # User engagement factor (0-25 points) - based on edits
-    edited_sections = sum(1 for s in sections if s.get("edited_by_user", False))
-    edit_ratio = edited_sections / total_sections if total_sections > 0 else 0
-    quality_factors["user_engagement"] = int(edit_ratio * 25)
-    
-    # Total quality score
+    # Calculate quality score (section length, financial completeness,
+    # detail level and user engagement, 0-25 points each)
+    quality_factors = quality_breakdown(totals)
     quality_score = sum(quality_factors.values())
     
     # Calculate time metrics
-    created_at = plan.get("created_at", datetime.utcnow())
-    updated_at = plan.get("updated_at", created_at)
-    completed_at = plan.get("completed_at")
-    
-    if isinstance(created_at, str):
-        created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-    if isinstance(updated_at, str):
-        updated_at = datetime.fromisoformat(updated_at.replace('Z', '+00:00'))
+    created_at = _as_datetime(plan.get("created_at", datetime.utcnow()))
+    completed_at = _as_datetime(plan.get("completed_at"))
+    first_section_at = totals.get("first_section_at")
     
     time_to_first_edit = None
-    if sections:
-        first_section = min(sections, key=lambda s: s.get("created_at", datetime.utcnow()))
-        first_edit_time = first_section.get("created_at")
-        if first_edit_time:
-            if isinstance(first_edit_time, str):
-                first_edit_time = datetime.fromisoformat(first_edit_time.replace('Z', '+00:00'))
-            time_to_first_edit = (first_edit_time - created_at).total_seconds() / 3600  # hours
+    if first_section_at:
+        time_to_first_edit = (first_section_at - created_at).total_seconds() / 3600  # hours
     
     time_to_complete = None
     if completed_at:
-        if isinstance(completed_at, str):
-            completed_at = datetime.fromisoformat(completed_at.replace('Z', '+00:00'))
         time_to_complete = (completed_at - created_at).total_seconds() / 3600  # hours
     
     # Get industry for benchmarking (from intake_data)
@@ -147,13 +98,7 @@ async def get_plan_analytics(
                 "comparison": "higher" if completion_score > industry_benchmarks["average_completion_rate"] else "lower"
             }
         },
-        "last_analyzed": datetime.utcnow().isoformat()
+        "last_analyzed": totals.get("updated_at")
     }
     
-    # Store analytics in plan document for caching
-    await db.plans.update_one(
-        {"_id": to_object_id(plan_id)},
-        {"$set": {"analytics": analytics, "updated_at": datetime.utcnow()}}
-    )
-    
     return analytics
@@ -1,48 +1,19 @@
 """Audit Logs routes"""
 
-from fastapi import APIRouter, HTTPException, Depends, Header, Query
+from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import Optional
 from datetime import datetime
 import logging
-from bson import ObjectId
 
 from utils.serializers import serialize_doc, to_object_id
-from utils.auth import decode_token
 from utils.audit_logger import AuditLogger
 from utils.dependencies import get_db
+from utils.pagination import PageParams, legacy_page_params, page_params
+from utils.principal import get_current_user_id
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# ============================================================================
-# DEPENDENCY: Get Current User
-# ============================================================================
-
-async def get_current_user_id(authorization: Optional[str] = Header(None)):
-    """Extract user_id from JWT token"""
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Missing authorization header")
-    
-    try:
-        scheme, token = authorization.split()
-        if scheme.lower() != 'bearer':
-            raise HTTPException(status_code=401, detail="Invalid authentication scheme")
-        
-        payload = decode_token(token)
-        if not payload:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
-        user_id = payload.get("sub")
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token payload")
-        
-        return user_id
-    except ValueError:
-        raise HTTPException(status_code=401, detail="Invalid authorization header format")
-    except Exception as e:
-        logger.error(f"Auth error: {e}")
-        raise HTTPException(status_code=401, detail="Authentication failed")
-
 # ============================================================================
 # ROUTES
 # ============================================================================
@@ -50,27 +21,24 @@ async def get_current_user_id(authorization: Optional[str] = Header(None)):
 @router.get("")
 async def get_activities(
     user_id: str = Depends(get_current_user_id),
-    limit: int = Query(50, ge=1, le=100),
-    skip: int = Query(0, ge=0),
+    paging: PageParams = Depends(legacy_page_params),
     activity_type: Optional[str] = None,
-    entity_type: Optional[str] = None
+    entity_type: Optional[str] = None,
+    db = Depends(get_db)
 ):
     """Get activity logs for the current user"""
     
-    logs = await AuditLogger.get_user_activities(
+    page = await AuditLogger.get_user_activities(
         db=db,
         user_id=user_id,
-        limit=limit,
-        skip=skip,
+        params=paging,
         activity_type=activity_type,
         entity_type=entity_type
     )
     
     return {
-        "activities": logs,
-        "total": len(logs),
-        "limit": limit,
-        "skip": skip
+        "activities": page.items,
+        **page.meta()
     }
 
 @router.get("/entity/{entity_type}/{entity_id}")
@@ -78,7 +46,8 @@ async def get_entity_activities(
     entity_type: str,
     entity_id: str,
     user_id: str = Depends(get_current_user_id),
-    limit: int = Query(50, ge=1, le=100)
+    paging: PageParams = Depends(page_params),
+    db = Depends(get_db)
 ):
     """Get activity logs for a specific entity"""
     
@@ -92,16 +61,16 @@ async def get_entity_activities(
         if not plan:
             raise HTTPException(status_code=404, detail="Plan not found or access denied")
     
-    logs = await AuditLogger.get_entity_activities(
+    page = await AuditLogger.get_entity_activities(
         db=db,
         entity_type=entity_type,
         entity_id=entity_id,
-        limit=limit
+        params=paging
     )
     
     return {
-        "activities": logs,
-        "total": len(logs),
+        "activities": page.items,
+        **page.meta(),
         "entity_type": entity_type,
         "entity_id": entity_id
     }
@@ -109,7 +78,8 @@ async def get_entity_activities(
 @router.get("/stats")
 async def get_activity_stats(
     user_id: str = Depends(get_current_user_id),
-    days: int = Query(30, ge=1, le=365)
+    days: int = Query(30, ge=1, le=365),
+    db = Depends(get_db)
 ):
     """Get activity statistics for the user"""
     
@@ -5,12 +5,12 @@ from pydantic import BaseModel, EmailStr
 from datetime import datetime
 from typing import Optional
 import logging
-from bson import ObjectId
 
-from utils.auth import get_password_hash, verify_password, create_access_token, create_refresh_token, decode_token
+from utils.auth import get_password_hash_async, verify_password_async, password_needs_rehash, create_access_token, create_refresh_token, decode_token
 from utils.serializers import serialize_doc, to_object_id
 from utils.audit_logger import AuditLogger
 from utils.dependencies import get_db
+from utils.principal import get_current_user_id, invalidate_principal
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -50,7 +50,7 @@ async def register(user_data: UserRegister, db = Depends(get_db)):
     # Create user
     user_doc = {
         "email": user_data.email,
-        "password_hash": get_password_hash(user_data.password),
+        "password_hash": await get_password_hash_async(user_data.password),
         "name": user_data.name,
         "role": "user",
         "subscription_tier": "free",
@@ -115,7 +115,7 @@ async def login(credentials: UserLogin, db = Depends(get_db)):
         )
     
     # Verify password
-    if not verify_password(credentials.password, user["password_hash"]):
+    if not await verify_password_async(credentials.password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     # Create tokens
@@ -129,6 +129,14 @@ async def login(credentials: UserLogin, db = Depends(get_db)):
         {"$set": {"last_login_at": datetime.utcnow()}}
     )
     
+    # Upgrade the hash if BCRYPT_ROUNDS changed since it was made, unless the
+    # password was changed in the meantime
+    if password_needs_rehash(user["password_hash"]):
+        await db.users.update_one(
+            {"_id": user["_id"], "password_hash": user["password_hash"]},
+            {"$set": {"password_hash": await get_password_hash_async(credentials.password)}}
+        )
+    
     user_clean = serialize_doc(user)
     del user_clean["password_hash"]
     
@@ -166,31 +174,6 @@ async def refresh_token(refresh_token: str, db = Depends(get_db)):
         "token_type": "bearer"
     }
 
-async def get_current_user_id(authorization: Optional[str] = Header(None)):
-    """Extract user_id from JWT token"""
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Missing authorization header")
-    
-    try:
-        scheme, token = authorization.split()
-        if scheme.lower() != 'bearer':
-            raise HTTPException(status_code=401, detail="Invalid authentication scheme")
-        
-        payload = decode_token(token)
-        if not payload:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
-        user_id = payload.get("sub")
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token payload")
-        
-        return user_id
-    except ValueError:
-        raise HTTPException(status_code=401, detail="Invalid authorization header format")
-    except Exception as e:
-        logger.error(f"Auth error: {e}")
-        raise HTTPException(status_code=401, detail="Authentication failed")
-
 @router.get("/me")
 async def get_me(authorization: Optional[str] = Header(None), db = Depends(get_db)):
     """Get current user"""
@@ -239,6 +222,7 @@ async def update_me(
         {"_id": to_object_id(user_id)},
         {"$set": update_data}
     )
+    invalidate_principal(user_id)
     
     # Return updated user
     updated_user = await db.users.find_one({"_id": to_object_id(user_id)})
@@ -276,7 +260,7 @@ async def change_password(
         )
     
     # Verify current password
-    if not verify_password(password_data.current_password, user["password_hash"]):
+    if not await verify_password_async(password_data.current_password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Current password is incorrect")
     
     # Validate new password
@@ -290,7 +274,7 @@ async def change_password(
     await db.users.update_one(
         {"_id": to_object_id(user_id)},
         {"$set": {
-            "password_hash": get_password_hash(password_data.new_password),
+            "password_hash": await get_password_hash_async(password_data.new_password),
             "updated_at": datetime.utcnow()
         }}
     )
@@ -353,6 +337,7 @@ async def delete_account(
     
     # 6. Finally, delete the user
     await db.users.delete_one({"_id": to_object_id(user_id)})
+    invalidate_principal(user_id)
     
     logger.info(f"Account and all data deleted for user: {user_id}")
     
@@ -1,49 +1,20 @@
 """Business Model Canvas routes"""
 
-from fastapi import APIRouter, HTTPException, Depends, Header
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends
 from datetime import datetime
 import logging
-from bson import ObjectId
 
 from utils.serializers import serialize_doc, to_object_id
-from utils.auth import decode_token
 from utils.audit_logger import AuditLogger
 from utils.dependencies import get_db
+from utils.plan_loader import load_plan_aggregate
+from utils.plan_revision import bump_plan_revision
+from utils.principal import get_current_user_id
 from agents.business_model_canvas_agent import BusinessModelCanvasAgent
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# ============================================================================
-# DEPENDENCY: Get Current User
-# ============================================================================
-
-async def get_current_user_id(authorization: Optional[str] = Header(None)):
-    """Extract user_id from JWT token"""
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Missing authorization header")
-    
-    try:
-        scheme, token = authorization.split()
-        if scheme.lower() != 'bearer':
-            raise HTTPException(status_code=401, detail="Invalid authentication scheme")
-        
-        payload = decode_token(token)
-        if not payload:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
-        user_id = payload.get("sub")
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token payload")
-        
-        return user_id
-    except ValueError:
-        raise HTTPException(status_code=401, detail="Invalid authorization header format")
-    except Exception as e:
-        logger.error(f"Auth error: {e}")
-        raise HTTPException(status_code=401, detail="Authentication failed")
-
 # ============================================================================
 # ROUTES
 # ============================================================================
@@ -76,17 +47,18 @@ async def get_canvas(plan_id: str, user_id: str = Depends(get_current_user_id),
 async def generate_canvas(plan_id: str, user_id: str = Depends(get_current_user_id), db = Depends(get_db)):
     """Generate Business Model Canvas for a plan"""
     
-    plan = await db.plans.find_one({
-        "_id": to_object_id(plan_id),
-        "user_id": user_id
-    })
+    # Get plan with its research pack and financial model
+    aggregate = await load_plan_aggregate(
+        db, plan_id, user_id,
+        research_pack={"data": 1}, financial_model={"data": 1}
+    )
     
-    if not plan:
+    if not aggregate:
         raise HTTPException(status_code=404, detail="Plan not found")
     
-    # Get research pack and financial model
-    research_pack_doc = await db.research_packs.find_one({"plan_id": plan_id})
-    financial_model_doc = await db.financial_models.find_one({"plan_id": plan_id})
+    plan = aggregate.plan
+    research_pack_doc = aggregate.research_pack
+    financial_model_doc = aggregate.financial_model
     
     if not research_pack_doc or not financial_model_doc:
         raise HTTPException(
@@ -126,6 +98,7 @@ async def generate_canvas(plan_id: str, user_id: str = Depends(get_current_user_
         canvas_doc["created_at"] = datetime.utcnow()
         result = await db.business_model_canvas.insert_one(canvas_doc)
         canvas_doc["_id"] = result.inserted_id
+    await bump_plan_revision(db, plan_id)
     
     # Log activity
     await AuditLogger.log_activity(
@@ -1,49 +1,20 @@
 """Companies routes - Business/Company management"""
 
-from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import Dict, List, Optional
 from datetime import datetime
 import logging
-from bson import ObjectId
 
 from utils.serializers import serialize_doc, to_object_id
-from utils.auth import decode_token
 from utils.audit_logger import AuditLogger
 from utils.dependencies import get_db
+from utils.pagination import PageParams, full_page_params, paginate
+from utils.principal import get_current_user_id
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# ============================================================================
-# DEPENDENCY: Get Current User
-# ============================================================================
-
-async def get_current_user_id(authorization: Optional[str] = Header(None)):
-    """Extract user_id from JWT token"""
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Missing authorization header")
-    
-    try:
-        scheme, token = authorization.split()
-        if scheme.lower() != 'bearer':
-            raise HTTPException(status_code=401, detail="Invalid authentication scheme")
-        
-        payload = decode_token(token)
-        if not payload:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
-        user_id = payload.get("sub")
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token payload")
-        
-        return user_id
-    except ValueError:
-        raise HTTPException(status_code=401, detail="Invalid authorization header format")
-    except Exception as e:
-        logger.error(f"Auth error: {e}")
-        raise HTTPException(status_code=401, detail="Authentication failed")
-
 # ============================================================================
 # MODELS
 # ============================================================================
@@ -87,11 +58,15 @@ class CompanyUpdate(BaseModel):
 # ============================================================================
 
 @router.get("")
-async def list_companies(user_id: str = Depends(get_current_user_id), db = Depends(get_db)):
-    """List all companies for a user"""
+async def list_companies(
+    paging: PageParams = Depends(full_page_params),
+    user_id: str = Depends(get_current_user_id),
+    db = Depends(get_db)
+):
+    """List a user's companies, newest first"""
     
-    companies = await db.companies.find({"user_id": user_id}).sort("created_at", -1).to_list(100)
-    return {"companies": [serialize_doc(c) for c in companies]}
+    page = await paginate(db.companies, {"user_id": user_id}, paging)
+    return {"companies": [serialize_doc(c) for c in page.items], **page.meta()}
 
 @router.post("")
 async def create_company(company_data: CompanyCreate, user_id: str = Depends(get_current_user_id), db = Depends(get_db)):
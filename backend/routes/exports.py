@@ -1,22 +1,37 @@
-"""Exports routes - PDF generation"""
+"""Exports routes - PDF/DOCX/Markdown export jobs"""
 
-from fastapi import APIRouter, HTTPException, Depends, Header
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, Dict, List, Tuple
+import asyncio
 import logging
+import re
 from datetime import datetime
 import os
 from bson import ObjectId
-from pathlib import Path
 
 from utils.serializers import serialize_doc, to_object_id
-from utils.auth import decode_token
 from utils.audit_logger import AuditLogger
-from utils.pdf_generator import generate_business_plan_pdf
-from utils.docx_generator import generate_business_plan_docx
-from utils.markdown_generator import generate_business_plan_markdown
+from utils.export_worker import (
+    EXPORT_FORMATS,
+    FILE_EXTENSIONS,
+    MEDIA_TYPES,
+    export_file_name,
+    get_worker_count,
+    run_export,
+    run_pdf_export
+)
+from utils.export_cache import FORMAT_ALIASES, compute_export_key, find_cached_export
+from utils.export_storage import get_export_storage
+from utils.file_responses import build_stream_response, iter_chunks
+from utils.pdf_fragments import fragment_keys, load_cached_fragments, store_fragments
+from utils.zip_stream import stream_zip
 from utils.dependencies import get_db
+from utils.plan_loader import load_plan_aggregate
+from utils.projections import resolve_view, view_query
+from utils.pagination import PageParams, page_params, paginate
+from utils.principal import get_current_user_id, get_subscription_tier
 import logging
 
 logger = logging.getLogger(__name__)
@@ -24,159 +39,470 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-async def get_current_user_id(authorization: Optional[str] = Header(None)):
-    """Extract user_id from JWT token"""
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Missing authorization header")
-    
-    try:
-        scheme, token = authorization.split()
-        payload = decode_token(token)
-        user_id = payload.get("sub")
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return user_id
-    except Exception:
-        raise HTTPException(status_code=401, detail="Authentication failed")
+# How long POST /exports waits for the render before returning a pending job
+EXPORT_WAIT_SECONDS = float(os.environ.get("EXPORT_WAIT_SECONDS", "30"))
+
+# Strong references to in-flight export jobs so they are not garbage collected
+_export_jobs: Dict[str, asyncio.Task] = {}
+
+# Legacy exports kept rendered bytes inline; keep them out of JSON responses
+EXPORT_META_PROJECTION = {"content": 0}
 
 class ExportCreate(BaseModel):
     plan_id: str
     format: str
 
+async def _render_export(
+    db,
+    storage,
+    format: str,
+    plan_data: Dict,
+    sections_data: List[Dict],
+    financial_data: Optional[Dict]
+) -> bytes:
+    """Render one export in the worker pool; PDFs reuse cached section fragments"""
+    if format != "pdf":
+        return await run_export(format, plan_data, sections_data, financial_data)
+    
+    # Only sections whose content changed since the last export are re-rendered
+    cached_fragments = await load_cached_fragments(
+        db, storage, fragment_keys(sections_data, financial_data)
+    )
+    content, new_fragments = await run_pdf_export(
+        plan_data, sections_data, financial_data, cached_fragments
+    )
+    logger.info(f"PDF for plan {plan_data.get('id')}: {len(cached_fragments)} cached fragments, {len(new_fragments)} rendered")
+    if new_fragments:
+        await store_fragments(db, storage, new_fragments)
+    return content
+
+async def _run_export_job(
+    db,
+    export_id: str,
+    user_id: str,
+    plan_id: str,
+    format: str,
+    plan_data: Dict,
+    sections_data: List[Dict],
+    financial_data: Optional[Dict]
+):
+    """Render an export in the worker pool and record the outcome on the export doc"""
+    await db.exports.update_one(
+        {"_id": ObjectId(export_id)},
+        {"$set": {"status": "processing", "started_at": datetime.utcnow()}}
+    )
+    
+    storage = get_export_storage(db)
+    try:
+        logger.info(f"Generating {format.upper()} for plan {plan_id}")
+        content = await _render_export(db, storage, format, plan_data, sections_data, financial_data)
+    except Exception as e:
+        logger.error(f"Export generation error: {e}")
+        await db.exports.update_one(
+            {"_id": ObjectId(export_id)},
+            {"$set": {"status": "failed", "error": str(e), "completed_at": datetime.utcnow()}}
+        )
+        return
+    
+    file_name = export_file_name(plan_id, format)
+    try:
+        stored = await storage.put(content, file_name, MEDIA_TYPES[format])
+    except Exception as e:
+        logger.error(f"Export storage error: {e}")
+        await db.exports.update_one(
+            {"_id": ObjectId(export_id)},
+            {"$set": {"status": "failed", "error": f"Storage failed: {e}", "completed_at": datetime.utcnow()}}
+        )
+        return
+    
+    await db.exports.update_one(
+        {"_id": ObjectId(export_id)},
+        {"$set": {
+            "status": "complete",
+            "storage": storage.name,
+            "storage_id": stored["storage_id"],
+            "size": stored["size"],
+            "etag": f'"{stored["sha256"]}"',
+            "media_type": MEDIA_TYPES[format],
+            "file_name": file_name,
+            "completed_at": datetime.utcnow()
+        }}
+    )
+    
+    # Log activity
+    await AuditLogger.log_activity(
+        db=db,
+        user_id=user_id,
+        activity_type="export_created",
+        entity_type="plan",
+        entity_id=plan_id,
+        details={"format": format, "file_name": file_name}
+    )
+    
+    logger.info(f"Export created: {file_name}")
+
 @router.post("")
-async def create_export(export_data: ExportCreate, user_id: str = Depends(get_current_user_id), db = Depends(get_db)):
-    """Create an export job and generate PDF"""
+async def create_export(
+    export_data: ExportCreate,
+    wait: float = Query(EXPORT_WAIT_SECONDS, ge=0, le=120, description="Seconds to wait for the render before returning a pending job"),
+    user_id: str = Depends(get_current_user_id),
+    db = Depends(get_db)
+):
+    """Create an export job rendered in the export worker pool"""
     
     plan_id = export_data.plan_id
     format = export_data.format
     
-    # Verify plan ownership
-    plan = await db.plans.find_one({"_id": to_object_id(plan_id), "user_id": user_id})
-    if not plan:
+    # Verify plan ownership; sections and financials come back in the same round trip
+    aggregate = await load_plan_aggregate(db, plan_id, user_id, sections=True, financial_model=True)
+    if not aggregate:
         raise HTTPException(status_code=404, detail="Plan not found")
+    plan = aggregate.plan
     
     # Check if plan is complete
     if plan.get("status") != "complete":
         raise HTTPException(status_code=400, detail="Plan must be generated before exporting")
     
     # Check subscription tier for format access
-    subscription = await db.subscriptions.find_one({"user_id": user_id})
-    if not subscription:
+    tier = await get_subscription_tier(db, user_id)
+    if not tier:
         raise HTTPException(status_code=403, detail="No subscription found")
     
     # Free tier: no exports
-    if subscription["tier"] == "free" and format != "preview":
+    if tier == "free" and format != "preview":
         raise HTTPException(
             status_code=403,
             detail="Upgrade to export plans. Free tier: preview only."
         )
     
     # Validate format
-    valid_formats = ["pdf", "docx", "markdown", "md"]
-    if format not in valid_formats:
+    if format not in EXPORT_FORMATS:
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid format. Supported formats: {', '.join(valid_formats)}"
+            detail=f"Invalid format. Supported formats: {', '.join(EXPORT_FORMATS)}"
         )
     
+    sections = aggregate.sections
+    if not sections:
+        raise HTTPException(status_code=400, detail="No sections found. Generate plan first.")
+    
+    financial_model = aggregate.financial_model
+    
+    plan_data_serialized = serialize_doc(plan)
+    sections_data_serialized = [serialize_doc(s) for s in sections]
+    financial_data_serialized = serialize_doc(financial_model) if financial_model else None
+    
+    # Reuse the existing artifact if nothing that shapes the document has changed
+    cache_key = compute_export_key(plan, sections, financial_model, format)
+    cached_export = await find_cached_export(db, get_export_storage(db), plan_id, cache_key)
+    if cached_export:
+        logger.info(f"Export cache hit for plan {plan_id} ({format})")
+        response = serialize_doc(cached_export)
+        response["cached"] = True
+        return response
+    
+    # Create export job record
+    export_doc = {
+        "plan_id": plan_id,
+        "user_id": user_id,
+        "format": format,
+        "cache_key": cache_key,
+        "status": "pending",
+        "file_name": None,
+        "download_count": 0,
+        "created_at": datetime.utcnow()
+    }
+    
+    result = await db.exports.insert_one(export_doc)
+    export_id = str(result.inserted_id)
+    
+    task = asyncio.create_task(_run_export_job(
+        db,
+        export_id,
+        user_id,
+        plan_id,
+        format,
+        plan_data_serialized,
+        sections_data_serialized,
+        financial_data_serialized
+    ))
+    _export_jobs[export_id] = task
+    task.add_done_callback(lambda _: _export_jobs.pop(export_id, None))
+    
+    # Optionally wait for the render; the job keeps running if we time out
+    if wait > 0:
+        try:
+            await asyncio.wait_for(asyncio.shield(task), timeout=wait)
+        except asyncio.TimeoutError:
+            pass
+    
+    export = await db.exports.find_one({"_id": result.inserted_id}, EXPORT_META_PROJECTION)
+    if export.get("status") == "failed":
+        raise HTTPException(status_code=500, detail=f"Failed to generate export: {export.get('error')}")
+    
+    return serialize_doc(export)
+
+# ============================================================================
+# BULK EXPORTS
+# ============================================================================
+
+MAX_BULK_PLANS = 100
+
+class BulkExportCreate(BaseModel):
+    plan_ids: List[str]
+    formats: List[str] = ["pdf"]
+
+def _zip_entry_name(plan: Dict, format: str) -> str:
+    """Archive path for one rendered export, unique per plan"""
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", plan.get("name") or "business_plan").strip("_")[:60] or "business_plan"
+    return f"{slug}_{str(plan['_id'])[-6:]}.{FILE_EXTENSIONS.get(format, format)}"
+
+async def _bulk_export_item(db, storage, job_id: str, user_id: str, plan: Dict, format: str) -> Tuple[str, object]:
+    """
+    Produce one archive entry: the cached artifact if the plan is unchanged,
+    otherwise a fresh render (recorded as a normal export so later requests reuse it).
+    """
+    plan_id = str(plan["_id"])
+    sections = await db.sections.find({"plan_id": plan_id}).sort("order_index", 1).to_list(100)
+    if not sections:
+        raise ValueError("No sections found")
+    financial_model = await db.financial_models.find_one({"plan_id": plan_id})
+    
+    cache_key = compute_export_key(plan, sections, financial_model, format)
+    cached_export = await find_cached_export(db, storage, plan_id, cache_key)
+    if cached_export:
+        storage_id = cached_export["storage_id"]
+        return _zip_entry_name(plan, format), storage.stream(storage_id)
+    
+    content = await _render_export(
+        db,
+        storage,
+        format,
+        serialize_doc(plan),
+        [serialize_doc(s) for s in sections],
+        serialize_doc(financial_model) if financial_model else None
+    )
+    file_name = export_file_name(plan_id, format)
+    stored = await storage.put(content, file_name, MEDIA_TYPES[format])
+    now = datetime.utcnow()
+    await db.exports.insert_one({
+        "plan_id": plan_id,
+        "user_id": user_id,
+        "format": format,
+        "cache_key": cache_key,
+        "bulk_job_id": job_id,
+        "status": "complete",
+        "storage": storage.name,
+        "storage_id": stored["storage_id"],
+        "size": stored["size"],
+        "etag": f'"{stored["sha256"]}"',
+        "media_type": MEDIA_TYPES[format],
+        "file_name": file_name,
+        "download_count": 0,
+        "created_at": now,
+        "completed_at": now
+    })
+    return _zip_entry_name(plan, format), iter_chunks(content)
+
+async def _bulk_export_entries(db, job_id: str, user_id: str, plans: List[Dict], formats: List[str]):
+    """
+    Render every (plan, format) pair with bounded concurrency and yield archive
+    entries in completion order, recording progress on the bulk job document.
+    """
+    storage = get_export_storage(db)
+    job_oid = ObjectId(job_id)
+    # One render per export worker; the bounded queue stops finished renders piling up
+    # in memory when the client reads slowly
+    semaphore = asyncio.Semaphore(get_worker_count())
+    queue: asyncio.Queue = asyncio.Queue(maxsize=get_worker_count())
+    errors = []
+    
+    async def produce(plan, format):
+        async with semaphore:
+            try:
+                entry = await _bulk_export_item(db, storage, job_id, user_id, plan, format)
+                await db.bulk_export_jobs.update_one({"_id": job_oid}, {"$inc": {"completed": 1}})
+            except Exception as e:
+                logger.error(f"Bulk export {job_id}: {format} for plan {plan['_id']} failed: {e}")
+                error = {"plan_id": str(plan["_id"]), "format": format, "error": str(e)}
+                errors.append(error)
+                await db.bulk_export_jobs.update_one(
+                    {"_id": job_oid},
+                    {"$inc": {"failed": 1}, "$push": {"errors": error}}
+                )
+                entry = None
+            await queue.put(entry)
+    
+    tasks = [asyncio.create_task(produce(plan, format)) for plan in plans for format in formats]
+    finished = False
     try:
-        # Get plan sections
-        sections = await db.sections.find({"plan_id": plan_id}).sort("order_index", 1).to_list(100)
-        if not sections:
-            raise HTTPException(status_code=400, detail="No sections found. Generate plan first.")
+        for _ in range(len(tasks)):
+            entry = await queue.get()
+            if entry is not None:
+                yield entry
         
-        # Get financial model
-        financial_model = await db.financial_models.find_one({"plan_id": plan_id})
-        
-        plan_data_serialized = serialize_doc(plan)
-        sections_data_serialized = [serialize_doc(s) for s in sections]
-        financial_data_serialized = serialize_doc(financial_model) if financial_model else None
-        
-        # Generate export based on format
-        if format == "pdf":
-            logger.info(f"Generating PDF for plan {plan_id}")
-            file_path = generate_business_plan_pdf(
-                plan_data=plan_data_serialized,
-                sections_data=sections_data_serialized,
-                financial_data=financial_data_serialized
-            )
-        elif format == "docx":
-            logger.info(f"Generating DOCX for plan {plan_id}")
-            file_path = generate_business_plan_docx(
-                plan_data=plan_data_serialized,
-                sections_data=sections_data_serialized,
-                financial_data=financial_data_serialized
-            )
-        elif format in ["markdown", "md"]:
-            logger.info(f"Generating Markdown for plan {plan_id}")
-            file_path = generate_business_plan_markdown(
-                plan_data=plan_data_serialized,
-                sections_data=sections_data_serialized,
-                financial_data=financial_data_serialized
-            )
-        else:
-            raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
-        
-        # Create export record
-        export_doc = {
-            "plan_id": plan_id,
-            "user_id": user_id,
-            "format": format,
-            "status": "complete",
-            "file_path": file_path,
-            "file_name": os.path.basename(file_path),
-            "download_count": 0,
-            "created_at": datetime.utcnow()
-        }
-        
-        result = await db.exports.insert_one(export_doc)
-        export_doc["_id"] = result.inserted_id
-        
-        # Log activity
-        await AuditLogger.log_activity(
-            db=db,
-            user_id=user_id,
-            activity_type="export_created",
-            entity_type="plan",
-            entity_id=plan_id,
-            details={"format": format, "file_name": export_doc["file_name"]}
+        if errors:
+            report = "\n".join(f"{e['plan_id']} ({e['format']}): {e['error']}" for e in errors)
+            yield "errors.txt", [report.encode("utf-8")]
+        finished = True
+    finally:
+        for task in tasks:
+            task.cancel()
+        await db.bulk_export_jobs.update_one(
+            {"_id": job_oid},
+            {"$set": {"status": "complete" if finished else "cancelled", "completed_at": datetime.utcnow()}}
         )
-        
-        logger.info(f"Export created: {export_doc['file_name']}")
-        
-        return serialize_doc(export_doc)
-        
-    except Exception as e:
-        logger.error(f"Export generation error: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to generate export: {str(e)}")
+
+@router.post("/bulk")
+async def create_bulk_export(
+    bulk_data: BulkExportCreate,
+    user_id: str = Depends(get_current_user_id),
+    db = Depends(get_db)
+):
+    """
+    Export several plans in several formats as one ZIP, streamed while the
+    renders complete. Progress: GET /exports/bulk/{X-Bulk-Export-Id}.
+    """
+    plan_ids = list(dict.fromkeys(bulk_data.plan_ids))
+    formats = list(dict.fromkeys(FORMAT_ALIASES.get(f, f) for f in bulk_data.formats))
+    
+    if not plan_ids or not formats:
+        raise HTTPException(status_code=400, detail="plan_ids and formats are required")
+    
+    if len(plan_ids) > MAX_BULK_PLANS:
+        raise HTTPException(status_code=400, detail=f"Bulk exports are limited to {MAX_BULK_PLANS} plans")
+    
+    invalid = [f for f in formats if f not in EXPORT_FORMATS]
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid format. Supported formats: {', '.join(EXPORT_FORMATS)}"
+        )
+    
+    # Check subscription tier for export access
+    tier = await get_subscription_tier(db, user_id)
+    if not tier:
+        raise HTTPException(status_code=403, detail="No subscription found")
+    if tier == "free":
+        raise HTTPException(
+            status_code=403,
+            detail="Upgrade to export plans. Free tier: preview only."
+        )
+    
+    # Verify plan ownership and that every plan has been generated
+    plans = await db.plans.find({
+        "_id": {"$in": [to_object_id(pid) for pid in plan_ids]},
+        "user_id": user_id
+    }).to_list(len(plan_ids))
+    found = {str(p["_id"]) for p in plans}
+    missing = [pid for pid in plan_ids if pid not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Plans not found: {', '.join(missing)}")
+    
+    incomplete = [str(p["_id"]) for p in plans if p.get("status") != "complete"]
+    if incomplete:
+        raise HTTPException(status_code=400, detail=f"Plans must be generated before exporting: {', '.join(incomplete)}")
+    
+    job_doc = {
+        "user_id": user_id,
+        "plan_ids": plan_ids,
+        "formats": formats,
+        "total": len(plans) * len(formats),
+        "completed": 0,
+        "failed": 0,
+        "errors": [],
+        "status": "processing",
+        "created_at": datetime.utcnow()
+    }
+    result = await db.bulk_export_jobs.insert_one(job_doc)
+    job_id = str(result.inserted_id)
+    
+    await AuditLogger.log_activity(
+        db=db,
+        user_id=user_id,
+        activity_type="bulk_export_created",
+        entity_type="plan",
+        entity_id=job_id,
+        details={"plan_count": len(plans), "formats": formats}
+    )
+    
+    return StreamingResponse(
+        stream_zip(_bulk_export_entries(db, job_id, user_id, plans, formats)),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="business_plans_{datetime.utcnow().strftime("%Y%m%d_%H%M%S")}.zip"',
+            "X-Bulk-Export-Id": job_id,
+            "Access-Control-Expose-Headers": "X-Bulk-Export-Id"
+        }
+    )
+
+@router.get("/bulk/{job_id}")
+async def get_bulk_export_status(job_id: str, user_id: str = Depends(get_current_user_id), db = Depends(get_db)):
+    """Progress of a bulk export (total, completed, failed and status)"""
+    
+    job = await db.bulk_export_jobs.find_one({"_id": to_object_id(job_id), "user_id": user_id})
+    if not job:
+        raise HTTPException(status_code=404, detail="Bulk export not found")
+    
+    return serialize_doc(job)
+
+@router.get("/{export_id}")
+async def get_export_status(export_id: str, user_id: str = Depends(get_current_user_id), db = Depends(get_db)):
+    """Get an export job and its status (pending, processing, complete or failed)"""
+    
+    export = await db.exports.find_one({"_id": to_object_id(export_id), "user_id": user_id}, EXPORT_META_PROJECTION)
+    if not export:
+        raise HTTPException(status_code=404, detail="Export not found")
+    
+    return serialize_doc(export)
 
 @router.get("/{export_id}/download")
-async def download_export(export_id: str, user_id: str = Depends(get_current_user_id), db = Depends(get_db)):
-    """Download an export file"""
+async def download_export(export_id: str, request: Request, user_id: str = Depends(get_current_user_id), db = Depends(get_db)):
+    """Download an export file (supports If-None-Match and Range)"""
     
-    export = await db.exports.find_one({"_id": to_object_id(export_id), "user_id": user_id})
+    export = await db.exports.find_one({"_id": to_object_id(export_id), "user_id": user_id}, EXPORT_META_PROJECTION)
     if not export:
         raise HTTPException(status_code=404, detail="Export not found")
     
-    file_path = export.get("file_path")
-    if not file_path or not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail="Export file not found")
+    if export.get("status") == "expired":
+        raise HTTPException(status_code=410, detail="Export has expired. Please export the plan again.")
     
-    # Increment download count
-    await db.exports.update_one(
-        {"_id": to_object_id(export_id)},
-        {"$inc": {"download_count": 1}}
-    )
+    if export.get("status") != "complete":
+        raise HTTPException(status_code=409, detail=f"Export is {export.get('status', 'pending')}")
+    
+    storage_id = export.get("storage_id")
+    storage = get_export_storage(db)
+    # Touching also confirms the artifact still exists before we start streaming
+    if not storage_id or export.get("storage") != storage.name or not await storage.touch(storage_id):
+        raise HTTPException(status_code=404, detail="Export file not found. Please export the plan again.")
     
-    return FileResponse(
-        path=file_path,
-        filename=export.get("file_name", "business_plan.pdf"),
-        media_type="application/pdf"
+    response = build_stream_response(
+        request,
+        size=export["size"],
+        etag=export["etag"],
+        media_type=export.get("media_type") or MEDIA_TYPES.get(export.get("format"), "application/octet-stream"),
+        filename=export.get("file_name") or "business_plan.pdf",
+        open_stream=lambda start, end: storage.stream(storage_id, start, end)
     )
+    
+    # Increment download count (revalidations that return 304 don't count)
+    if response.status_code != 304:
+        await db.exports.update_one(
+            {"_id": to_object_id(export_id)},
+            {"$inc": {"download_count": 1}}
+        )
+    
+    return response
 
 @router.get("")
-async def list_exports(user_id: str = Depends(get_current_user_id), db = Depends(get_db)):
-    """List all exports for current user"""
+async def list_exports(
+    view: str = view_query("full", "exports"),
+    paging: PageParams = Depends(page_params),
+    user_id: str = Depends(get_current_user_id),
+    db = Depends(get_db)
+):
+    """List exports for current user, newest first"""
     
-    exports = await db.exports.find({"user_id": user_id}).sort("created_at", -1).to_list(50)
-    return {"exports": [serialize_doc(e) for e in exports]}
+    projection = resolve_view("exports", view)
+    page = await paginate(db.exports, {"user_id": user_id}, paging, projection=projection)
+    return {"exports": [serialize_doc(e) for e in page.items], **page.meta()}
@@ -1,21 +1,25 @@
 """Pitch Deck Generator routes - Auto-generate pitch decks from business plans"""
 
-from fastapi import APIRouter, HTTPException, Depends, Response
+from fastapi import APIRouter, HTTPException, Depends, Request
 from pydantic import BaseModel
 from typing import Optional, Dict, List
 from datetime import datetime
+import asyncio
+import hashlib
+import json
 import logging
 import os
-import io
-from pptx import Presentation
-from pptx.util import Inches, Pt
-from pptx.enum.text import PP_ALIGN
-from pptx.enum.shapes import MSO_SHAPE
-from pptx.dml.color import RGBColor
 
 from utils.serializers import serialize_doc, to_object_id
 from utils.dependencies import get_db
 from utils.admin import get_current_user_id
+from utils.plan_loader import load_plan_aggregate
+from utils.plan_revision import bump_plan_revision
+from utils.content_ast import SECTION_AST_PROJECTION
+from utils.export_storage import get_export_storage
+from utils.export_worker import get_export_executor
+from utils.file_responses import build_stream_response
+from utils.pptx_generator import DECK_RENDERER_VERSION, PPTX_MEDIA_TYPE, build_presentation
 from emergentintegrations.llm.chat import LlmChat, UserMessage
 
 router = APIRouter()
@@ -27,6 +31,43 @@ class BrandingConfig(BaseModel):
     secondary_color: Optional[str] = "#3B82F6"
     font_family: Optional[str] = "Arial"
 
+def _plan_fingerprint(plan: Dict, sections: List[Dict], financial_model: Optional[Dict]) -> str:
+    """Hash of everything the slide content is generated from"""
+    payload = {
+        "name": plan.get("name"),
+        "intake_data": plan.get("intake_data", {}),
+        "sections": [
+            [s.get("section_type"), s.get("title"), s.get("content"), s.get("order_index")]
+            for s in sections
+        ],
+        "financial_model": [
+            str(financial_model.get("_id")),
+            financial_model.get("updated_at") or financial_model.get("created_at")
+        ] if financial_model else None
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+def _branding_key(branding: Dict) -> str:
+    """Hash of the branding (and layout version) a stored deck was rendered with"""
+    encoded = json.dumps({"branding": branding, "renderer": DECK_RENDERER_VERSION}, sort_keys=True)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+async def _render_and_store(storage, slides_data: List[Dict], branding: Dict, filename: str) -> Dict:
+    """Render the PPTX in the export pool and persist it. Returns the artifact fields for the deck doc."""
+    loop = asyncio.get_running_loop()
+    deck_bytes = await loop.run_in_executor(get_export_executor(), build_presentation, slides_data, branding)
+    stored = await storage.put(deck_bytes, filename, PPTX_MEDIA_TYPE)
+    return {
+        "storage": storage.name,
+        "storage_id": stored["storage_id"],
+        "size": stored["size"],
+        "etag": f'"{stored["sha256"]}"'
+    }
+
+def _deck_file_name(plan: Dict) -> str:
+    return f"{plan.get('name', 'pitch_deck')}.pptx"
+
 @router.post("/plans/{plan_id}/pitch-deck/generate")
 async def generate_pitch_deck(
     plan_id: str,
@@ -34,322 +75,140 @@ async def generate_pitch_deck(
     user_id: str = Depends(get_current_user_id),
     db = Depends(get_db)
 ):
-    """Generate a pitch deck from a business plan"""
+    """Generate a pitch deck from a business plan and store the rendered PPTX"""
     
-    # Get plan
-    plan = await db.plans.find_one({
-        "_id": to_object_id(plan_id),
-        "user_id": user_id
-    })
+    # Get plan with its sections and financial model
+    aggregate = await load_plan_aggregate(
+        db, plan_id, user_id,
+        sections=SECTION_AST_PROJECTION, financial_model=True
+    )
     
-    if not plan:
+    if not aggregate:
         raise HTTPException(status_code=404, detail="Plan not found")
     
-    # Get plan data
-    sections = await db.sections.find({"plan_id": plan_id}).sort("order_index", 1).to_list(None)
-    financial_model = await db.financial_models.find_one({"plan_id": plan_id})
+    plan = aggregate.plan
+    sections = aggregate.sections
+    financial_model = aggregate.financial_model
     intake_data = plan.get("intake_data", {})
     
-    # Extract key information
-    business_name = intake_data.get("business_name", "Business")
-    industry = intake_data.get("industry", "General")
-    description = intake_data.get("business_description", "")
-    value_prop = intake_data.get("unique_value_proposition", "")
-    target_customers = intake_data.get("target_customers", "")
-    revenue_model = intake_data.get("revenue_model", [])
-    
-    # Get section content
-    exec_summary = next((s for s in sections if s.get("section_type") == "executive_summary"), None)
-    market_analysis = next((s for s in sections if s.get("section_type") == "market_analysis"), None)
-    team_section = next((s for s in sections if s.get("section_type") == "team"), None)
-    
     # Generate slides using AI
     slides_data = await _generate_slides_content(
         plan, sections, financial_model, intake_data
     )
     
-    # Create PowerPoint presentation
-    prs = Presentation()
-    prs.slide_width = Inches(10)
-    prs.slide_height = Inches(7.5)
-    
-    # Set branding colors
-    primary_color = RGBColor(0, 22, 57) if not branding or not branding.primary_color else _hex_to_rgb(branding.primary_color)
-    secondary_color = RGBColor(59, 130, 246) if not branding or not branding.secondary_color else _hex_to_rgb(branding.secondary_color)
-    accent_color = RGBColor(39, 172, 133)  # Green accent
-    background_color = RGBColor(248, 250, 252)  # Light gray background
-    text_color = RGBColor(71, 85, 105)  # Slate gray text
-    
-    # Create slides with professional design
-    for idx, slide_data in enumerate(slides_data):
-        slide = prs.slides.add_slide(prs.slide_layouts[6])  # Blank layout
-        
-        # Add background rectangle for visual appeal
-        if idx == 0:  # Title slide gets special treatment
-            bg_shape = slide.shapes.add_shape(
-                MSO_SHAPE.RECTANGLE,
-                Inches(0), Inches(0), Inches(10), Inches(2.5)
-            )
-            bg_shape.fill.solid()
-            bg_shape.fill.fore_color.rgb = primary_color
-            bg_shape.line.fill.background()
-        else:
-            # Subtle top accent bar for other slides
-            accent_bar = slide.shapes.add_shape(
-                MSO_SHAPE.RECTANGLE,
-                Inches(0), Inches(0), Inches(10), Inches(0.3)
-            )
-            accent_bar.fill.solid()
-            accent_bar.fill.fore_color.rgb = secondary_color
-            accent_bar.line.fill.background()
-        
-        # Add title with better styling
-        if slide_data.get("title"):
-            title_y = Inches(0.6) if idx == 0 else Inches(0.5)
-            title_height = Inches(1.2) if idx == 0 else Inches(0.8)
-            title_box = slide.shapes.add_textbox(Inches(0.75), title_y, Inches(8.5), title_height)
-            title_frame = title_box.text_frame
-            title_frame.text = slide_data["title"]
-            title_para = title_frame.paragraphs[0]
-            title_para.font.size = Pt(44) if idx == 0 else Pt(36)
-            title_para.font.bold = True
-            title_para.font.color.rgb = RGBColor(255, 255, 255) if idx == 0 else primary_color
-            title_para.alignment = PP_ALIGN.LEFT
-            title_para.space_after = Pt(0)
-        
-        # Add content with better formatting
-        if slide_data.get("content"):
-            content_y = Inches(2.8) if idx == 0 else Inches(1.6)
-            content_height = Inches(4.5) if idx == 0 else Inches(5.5)
-            content_box = slide.shapes.add_textbox(Inches(0.75), content_y, Inches(8.5), content_height)
-            content_frame = content_box.text_frame
-            content_frame.word_wrap = True
-            content_frame.margin_left = Inches(0)
-            content_frame.margin_right = Inches(0)
-            content_frame.margin_top = Inches(0)
-            content_frame.margin_bottom = Inches(0)
-            
-            # Parse content into paragraphs - handle both string and list
-            content_text = slide_data["content"]
-            if isinstance(content_text, list):
-                content_text = '\n'.join(str(item) for item in content_text)
-            elif not isinstance(content_text, str):
-                content_text = str(content_text)
-            
-            content_lines = content_text.split('\n')
-            for line_idx, line in enumerate(content_lines):
-                if line.strip():
-                    if line_idx > 0:
-                        p = content_frame.add_paragraph()
-                    else:
-                        p = content_frame.paragraphs[0]
-                    
-                    # Handle bullet points
-                    if line.strip().startswith('•') or line.strip().startswith('-'):
-                        p.text = line.strip().lstrip('•-').strip()
-                        p.level = 0
-                        p.font.size = Pt(20) if idx == 0 else Pt(18)
-                        p.font.color.rgb = RGBColor(255, 255, 255) if idx == 0 else text_color
-                        p.space_after = Pt(14)
-                        p.space_before = Pt(0)
-                    else:
-                        p.text = line.strip()
-                        p.level = 0
-                        p.font.size = Pt(20) if idx == 0 else Pt(18)
-                        p.font.color.rgb = RGBColor(255, 255, 255) if idx == 0 else text_color
-                        p.space_after = Pt(14)
-                        p.space_before = Pt(0)
-        
-        # Add slide number (except on title slide)
-        if idx > 0:
-            slide_num_shape = slide.shapes.add_textbox(Inches(9), Inches(7), Inches(0.8), Inches(0.3))
-            slide_num_frame = slide_num_shape.text_frame
-            slide_num_frame.text = f"{idx}"
-            slide_num_para = slide_num_frame.paragraphs[0]
-            slide_num_para.font.size = Pt(14)
-            slide_num_para.font.color.rgb = RGBColor(148, 163, 184)
-            slide_num_para.alignment = PP_ALIGN.RIGHT
-    
-    # Save to bytes
-    deck_bytes = io.BytesIO()
-    prs.save(deck_bytes)
-    deck_bytes.seek(0)
+    branding_data = branding.dict() if branding else {}
+    storage = get_export_storage(db)
+    try:
+        artifact = await _render_and_store(storage, slides_data, branding_data, _deck_file_name(plan))
+    except Exception as e:
+        logger.error(f"Pitch deck render failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to render pitch deck: {str(e)}")
     
-    # Store deck metadata
+    # Store slides and the rendered deck, keyed by plan content and branding
     deck_doc = {
         "plan_id": plan_id,
         "user_id": user_id,
         "slides": slides_data,
-        "branding": branding.dict() if branding else {},
+        "branding": branding_data,
+        "plan_fingerprint": _plan_fingerprint(plan, sections, financial_model),
+        "branding_key": _branding_key(branding_data),
+        **artifact,
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow()
     }
     
     result = await db.pitch_decks.insert_one(deck_doc)
-    deck_id = result.inserted_id
+    await bump_plan_revision(db, plan_id)
     
     logger.info(f"Pitch deck generated for plan {plan_id}")
     
-    # Store the PPTX file bytes in the document for future retrieval
-    await db.pitch_decks.update_one(
-        {"_id": deck_id},
-        {"$set": {"pptx_bytes": deck_bytes.getvalue()}}
-    )
-    
     return {
         "message": "Pitch deck generated successfully",
-        "deck_id": str(deck_doc["_id"]),
+        "deck_id": str(result.inserted_id),
         "slide_count": len(slides_data)
     }
 
 @router.get("/plans/{plan_id}/pitch-deck/download")
 async def download_pitch_deck(
     plan_id: str,
+    request: Request,
     format: str = "pptx",
     user_id: str = Depends(get_current_user_id),
     db = Depends(get_db)
 ):
-    """Download the generated pitch deck"""
+    """Download the generated pitch deck (regenerated only if the plan changed)"""
     
-    # Get plan
-    plan = await db.plans.find_one({
-        "_id": to_object_id(plan_id),
-        "user_id": user_id
-    })
+    # Get plan with its sections and financial model
+    aggregate = await load_plan_aggregate(
+        db, plan_id, user_id,
+        sections=SECTION_AST_PROJECTION, financial_model=True
+    )
     
-    if not plan:
+    if not aggregate:
         raise HTTPException(status_code=404, detail="Plan not found")
     
-    # Get latest deck
+    plan = aggregate.plan
+    sections = aggregate.sections
+    financial_model = aggregate.financial_model
+    
+    # Get latest deck (legacy decks kept the PPTX inline)
     deck = await db.pitch_decks.find_one({
         "plan_id": plan_id,
         "user_id": user_id
-    }, sort=[("created_at", -1)])
+    }, {"pptx_bytes": 0}, sort=[("created_at", -1)])
     
     if not deck:
         raise HTTPException(status_code=404, detail="Pitch deck not found. Please generate one first.")
     
-    # Regenerate PPTX (for now, we regenerate each time)
-    # In production, you'd store the file and serve it
-    sections = await db.sections.find({"plan_id": plan_id}).sort("order_index", 1).to_list(None)
-    financial_model = await db.financial_models.find_one({"plan_id": plan_id})
-    intake_data = plan.get("intake_data", {})
-    
-    slides_data = await _generate_slides_content(plan, sections, financial_model, intake_data)
-    
-    # Create presentation
-    prs = Presentation()
-    prs.slide_width = Inches(10)
-    prs.slide_height = Inches(7.5)
-    
-    primary_color = RGBColor(0, 22, 57)
-    secondary_color = RGBColor(59, 130, 246)
-    
-    # Use the same improved design as in generate endpoint
-    primary_color = RGBColor(0, 22, 57)
-    secondary_color = RGBColor(59, 130, 246)
-    text_color = RGBColor(71, 85, 105)
+    fingerprint = _plan_fingerprint(plan, sections, financial_model)
+    branding_data = deck.get("branding") or {}
+    storage = get_export_storage(db)
+    
+    plan_changed = deck.get("plan_fingerprint") != fingerprint
+    stored_ok = (
+        not plan_changed
+        and deck.get("branding_key") == _branding_key(branding_data)
+        and deck.get("storage") == storage.name
+        and deck.get("storage_id")
+        and await storage.touch(deck["storage_id"])
+    )
     
-    for idx, slide_data in enumerate(slides_data):
-        slide = prs.slides.add_slide(prs.slide_layouts[6])
-        
-        # Add background rectangle for visual appeal
-        if idx == 0:  # Title slide gets special treatment
-            bg_shape = slide.shapes.add_shape(
-                MSO_SHAPE.RECTANGLE,
-                Inches(0), Inches(0), Inches(10), Inches(2.5)
-            )
-            bg_shape.fill.solid()
-            bg_shape.fill.fore_color.rgb = primary_color
-            bg_shape.line.fill.background()
+    if not stored_ok:
+        # Slide content only needs the LLM when the plan itself changed;
+        # otherwise the stored slides are re-rendered (branding, layout or expired file)
+        if plan_changed or not deck.get("slides"):
+            logger.info(f"Plan {plan_id} changed since its pitch deck was generated, regenerating slides")
+            slides_data = await _generate_slides_content(plan, sections, financial_model, plan.get("intake_data", {}))
         else:
-            # Subtle top accent bar for other slides
-            accent_bar = slide.shapes.add_shape(
-                MSO_SHAPE.RECTANGLE,
-                Inches(0), Inches(0), Inches(10), Inches(0.3)
-            )
-            accent_bar.fill.solid()
-            accent_bar.fill.fore_color.rgb = secondary_color
-            accent_bar.line.fill.background()
+            slides_data = deck["slides"]
         
-        # Add title with better styling
-        if slide_data.get("title"):
-            title_y = Inches(0.6) if idx == 0 else Inches(0.5)
-            title_height = Inches(1.2) if idx == 0 else Inches(0.8)
-            title_box = slide.shapes.add_textbox(Inches(0.75), title_y, Inches(8.5), title_height)
-            title_frame = title_box.text_frame
-            title_frame.text = slide_data["title"]
-            title_para = title_frame.paragraphs[0]
-            title_para.font.size = Pt(44) if idx == 0 else Pt(36)
-            title_para.font.bold = True
-            title_para.font.color.rgb = RGBColor(255, 255, 255) if idx == 0 else primary_color
-            title_para.alignment = PP_ALIGN.LEFT
-            title_para.space_after = Pt(0)
-        
-        # Add content with better formatting
-        if slide_data.get("content"):
-            content_y = Inches(2.8) if idx == 0 else Inches(1.6)
-            content_height = Inches(4.5) if idx == 0 else Inches(5.5)
-            content_box = slide.shapes.add_textbox(Inches(0.75), content_y, Inches(8.5), content_height)
-            content_frame = content_box.text_frame
-            content_frame.word_wrap = True
-            content_frame.margin_left = Inches(0)
-            content_frame.margin_right = Inches(0)
-            content_frame.margin_top = Inches(0)
-            content_frame.margin_bottom = Inches(0)
-            
-            # Parse content into paragraphs - handle both string and list
-            content_text = slide_data["content"]
-            if isinstance(content_text, list):
-                content_text = '\n'.join(str(item) for item in content_text)
-            elif not isinstance(content_text, str):
-                content_text = str(content_text)
-            
-            content_lines = content_text.split('\n')
-            for line_idx, line in enumerate(content_lines):
-                if line.strip():
-                    if line_idx > 0:
-                        p = content_frame.add_paragraph()
-                    else:
-                        p = content_frame.paragraphs[0]
-                    
-                    # Handle bullet points
-                    if line.strip().startswith('•') or line.strip().startswith('-'):
-                        p.text = line.strip().lstrip('•-').strip()
-                        p.level = 0
-                        p.font.size = Pt(20) if idx == 0 else Pt(18)
-                        p.font.color.rgb = RGBColor(255, 255, 255) if idx == 0 else text_color
-                        p.space_after = Pt(14)
-                        p.space_before = Pt(0)
-                    else:
-                        p.text = line.strip()
-                        p.level = 0
-                        p.font.size = Pt(20) if idx == 0 else Pt(18)
-                        p.font.color.rgb = RGBColor(255, 255, 255) if idx == 0 else text_color
-                        p.space_after = Pt(14)
-                        p.space_before = Pt(0)
+        try:
+            artifact = await _render_and_store(storage, slides_data, branding_data, _deck_file_name(plan))
+        except Exception as e:
+            logger.error(f"Pitch deck render failed: {e}")
+            raise HTTPException(status_code=500, detail=f"Failed to render pitch deck: {str(e)}")
         
-        # Add slide number (except on title slide)
-        if idx > 0:
-            slide_num_shape = slide.shapes.add_textbox(Inches(9), Inches(7), Inches(0.8), Inches(0.3))
-            slide_num_frame = slide_num_shape.text_frame
-            slide_num_frame.text = f"{idx}"
-            slide_num_para = slide_num_frame.paragraphs[0]
-            slide_num_para.font.size = Pt(14)
-            slide_num_para.font.color.rgb = RGBColor(148, 163, 184)
-            slide_num_para.alignment = PP_ALIGN.RIGHT
-    
-    # Save to bytes
-    deck_bytes = io.BytesIO()
-    prs.save(deck_bytes)
-    deck_bytes.seek(0)
-    
-    filename = f"{plan.get('name', 'pitch_deck')}.pptx"
-    
-    return Response(
-        content=deck_bytes.getvalue(),
-        media_type="application/vnd.openxmlformats-officedocument.presentationml.presentation",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        update = {
+            "slides": slides_data,
+            "plan_fingerprint": fingerprint,
+            "branding_key": _branding_key(branding_data),
+            **artifact,
+            "updated_at": datetime.utcnow()
+        }
+        await db.pitch_decks.update_one(
+            {"_id": deck["_id"]},
+            {"$set": update, "$unset": {"pptx_bytes": ""}}
+        )
+        deck.update(update)
+    
+    storage_id = deck["storage_id"]
+    return build_stream_response(
+        request,
+        size=deck["size"],
+        etag=deck["etag"],
+        media_type=PPTX_MEDIA_TYPE,
+        filename=_deck_file_name(plan),
+        open_stream=lambda start, end: storage.stream(storage_id, start, end)
     )
 
 async def _generate_slides_content(
@@ -495,11 +354,3 @@ def _create_fallback_slides(intake_data: Dict, financial_model: Optional[Dict])
             "content": f"{business_name}\nContact us to learn more"
         }
     ]
-
-def _hex_to_rgb(hex_color: str) -> RGBColor:
-    """Convert hex color to RGBColor"""
-    hex_color = hex_color.lstrip('#')
-    r = int(hex_color[0:2], 16)
-    g = int(hex_color[2:4], 16)
-    b = int(hex_color[4:6], 16)
-    return RGBColor(r, g, b)
@@ -11,6 +11,8 @@ import os
 from utils.serializers import serialize_doc, to_object_id
 from utils.dependencies import get_db
 from utils.admin import get_current_user_id
+from utils.plan_loader import load_plan_aggregate
+from utils.pagination import PageParams, page_params, paginate
 from emergentintegrations.llm.chat import LlmChat, UserMessage
 
 router = APIRouter()
@@ -29,19 +31,19 @@ async def send_chat_message(
 ):
     """Send a message to the AI plan advisor and get a response"""
     
-    # Get plan
-    plan = await db.plans.find_one({
-        "_id": to_object_id(plan_id),
-        "user_id": user_id
-    })
+    # Get plan and its context in one round trip
+    aggregate = await load_plan_aggregate(
+        db, plan_id, user_id,
+        sections=True, financial_model=True, research_pack=True
+    )
     
-    if not plan:
+    if not aggregate:
         raise HTTPException(status_code=404, detail="Plan not found")
     
-    # Get plan context
-    sections = await db.sections.find({"plan_id": plan_id}).sort("order_index", 1).to_list(None)
-    financial_model = await db.financial_models.find_one({"plan_id": plan_id})
-    research_pack = await db.research_packs.find_one({"plan_id": plan_id})
+    plan = aggregate.plan
+    sections = aggregate.sections
+    financial_model = aggregate.financial_model
+    research_pack = aggregate.research_pack
     
     # Get current section if provided
     current_section = None
@@ -143,9 +145,9 @@ async def get_chat_history(
     plan_id: str,
     user_id: str = Depends(get_current_user_id),
     db = Depends(get_db),
-    limit: int = 50
+    paging: PageParams = Depends(page_params)
 ):
-    """Get chat history for a plan"""
+    """Get chat history for a plan (next_cursor pages back to older messages)"""
     
     # Verify plan access
     plan = await db.plans.find_one({
@@ -156,16 +158,15 @@ async def get_chat_history(
     if not plan:
         raise HTTPException(status_code=404, detail="Plan not found")
     
-    # Get chat history
-    chats = await db.plan_chats.find({
-        "plan_id": plan_id,
-        "user_id": user_id
-    }).sort("created_at", -1).limit(limit).to_list(None)
+    # Get the most recent page of chat history
+    page = await paginate(db.plan_chats, {"plan_id": plan_id, "user_id": user_id}, paging)
+    chats = page.items
     
     # Reverse to show chronological order
     chats.reverse()
     
     return {
         "messages": [serialize_doc(chat) for chat in chats],
-        "total": len(chats)
+        **page.meta(),
+        "total": page.total if page.total is not None else len(chats)
     }
@@ -4,15 +4,24 @@ from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import List, Dict
 from datetime import datetime
+import asyncio
 import logging
 
 from utils.serializers import serialize_doc, to_object_id
 from utils.dependencies import get_db
+from utils.loaders import Loaders, get_loaders
+from utils.plan_metrics import METRICS_FIELD, completion_percent, load_plan_metrics, quality_breakdown, readiness_breakdown
 from utils.admin import get_current_user_id
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Plan fields the comparison reads; scores come from the maintained metrics
+COMPARISON_PLAN_PROJECTION = {
+    "name": 1, "status": 1, "created_at": 1, "updated_at": 1,
+    "intake_data.industry": 1, "intake_data.business_name": 1, METRICS_FIELD: 1
+}
+
 class PlanComparisonRequest(BaseModel):
     plan_ids: List[str]  # 2-4 plan IDs to compare
 
@@ -20,7 +29,8 @@ class PlanComparisonRequest(BaseModel):
 async def compare_plans(
     comparison_request: PlanComparisonRequest,
     user_id: str = Depends(get_current_user_id),
-    db = Depends(get_db)
+    db = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Compare multiple plans side-by-side"""
     
@@ -30,38 +40,39 @@ async def compare_plans(
     if len(comparison_request.plan_ids) > 4:
         raise HTTPException(status_code=400, detail="Maximum 4 plans can be compared at once")
     
-    # Get all plans
+    # Get all plans in one query (ownership enforced by the filter)
+    owned_plans = await db.plans.find({
+        "_id": {"$in": [to_object_id(pid) for pid in comparison_request.plan_ids]},
+        "user_id": user_id
+    }, COMPARISON_PLAN_PROJECTION).to_list(None)
+    plans_by_id = {str(p["_id"]): p for p in owned_plans}
+    
     plans = []
     for plan_id in comparison_request.plan_ids:
-        plan = await db.plans.find_one({
-            "_id": to_object_id(plan_id),
-            "user_id": user_id
-        })
+        plan = plans_by_id.get(plan_id)
         if not plan:
             raise HTTPException(status_code=404, detail=f"Plan {plan_id} not found")
         plans.append(plan)
     
+    # Maintained section totals and the financial models (for revenue and
+    # profit), one query for all plans
+    plan_ids = [str(p["_id"]) for p in plans]
+    all_metrics, financial_models = await asyncio.gather(
+        load_plan_metrics(db, plans),
+        loaders.financial_models_by_plan.load_many(plan_ids)
+    )
+    
     # Get data for each plan
     comparison_data = []
     
-    for plan in plans:
+    for plan, totals, financial_model in zip(plans, all_metrics, financial_models):
         plan_id = str(plan["_id"])
         
-        # Get sections
-        sections = await db.sections.find({"plan_id": plan_id}).to_list(None)
-        total_sections = len(sections)
-        completed_sections = sum(1 for s in sections if s.get("content") and len(s.get("content", "").strip()) > 50)
+        total_sections = totals["sections"]
+        completed_sections = totals["completed"]
         
-        # Get financial model
-        financial_model = await db.financial_models.find_one({"plan_id": plan_id})
         financial_data = financial_model.get("data", {}) if financial_model else {}
         
-        # Get analytics
-        analytics = plan.get("analytics", {})
-        
-        # Get readiness score
-        readiness_score = plan.get("readiness_score", {})
-        
         # Calculate metrics
         pnl = financial_data.get("pnl_monthly", [])
         total_revenue = sum(m.get("revenue", 0) for m in pnl[:12]) if pnl else 0
@@ -79,10 +90,10 @@ async def compare_plans(
                 "completion_rate": (completed_sections / total_sections * 100) if total_sections > 0 else 0
             },
             "analytics": {
-                "completion_score": analytics.get("completion_score", 0),
-                "quality_score": analytics.get("quality_score", 0)
+                "completion_score": completion_percent(totals),
+                "quality_score": sum(quality_breakdown(totals).values())
             },
-            "readiness_score": readiness_score.get("overall_score", 0),
+            "readiness_score": sum(readiness_breakdown(totals).values()),
             "financials": {
                 "year1_revenue": total_revenue,
                 "year1_profit": total_profit,
@@ -9,9 +9,17 @@ import secrets
 from bson import ObjectId
 
 from utils.serializers import serialize_doc, to_object_id
+from utils.json_response import MongoJSONResponse, public_doc, public_docs
 from utils.dependencies import get_db
+from utils.loaders import Loaders, get_loaders, user_summary
+from utils.plan_loader import load_plan_aggregate
+from utils.pagination import PageParams, full_page_params, page_params, paginate
+from utils.persistence import PlanWriteBatch, commit
+from utils.plan_metrics import METRICS_FIELD, section_metrics, section_totals
+from utils.plan_versions import VERSION_LIST_PROJECTION, reconstruct_sections
+from utils.content_ast import SECTION_AST_PROJECTION, content_ast_fields
 from utils.admin import get_current_user_id
-from utils.auth import get_password_hash, verify_password
+from utils.auth import get_password_hash_async, verify_password_async
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -77,7 +85,7 @@ async def create_share_link(
         "share_token": share_token,
         "created_by": user_id,
         "access_level": share_data.access_level,
-        "password_hash": get_password_hash(share_data.password) if share_data.password else None,
+        "password_hash": await get_password_hash_async(share_data.password) if share_data.password else None,
         "expires_at": expires_at,
         "created_at": datetime.utcnow(),
         "is_active": True
@@ -97,6 +105,7 @@ async def create_share_link(
 @router.get("/plans/{plan_id}/shares")
 async def list_share_links(
     plan_id: str,
+    paging: PageParams = Depends(full_page_params),
     user_id: str = Depends(get_current_user_id),
     db = Depends(get_db)
 ):
@@ -111,21 +120,21 @@ async def list_share_links(
     if not plan:
         raise HTTPException(status_code=404, detail="Plan not found")
     
-    # Get all shares
-    shares = await db.plan_shares.find({
-        "plan_id": plan_id,
-        "is_active": True
-    }).sort("created_at", -1).to_list(None)
+    # Get active shares, newest first
+    page = await paginate(
+        db.plan_shares, {"plan_id": plan_id, "is_active": True}, paging,
+        projection={"password_hash": 0}
+    )
     
     shares_list = []
-    for share in shares:
+    for share in page.items:
         share_clean = serialize_doc(share)
         # Remove password hash
         if "password_hash" in share_clean:
             del share_clean["password_hash"]
         shares_list.append(share_clean)
     
-    return {"shares": shares_list}
+    return {"shares": shares_list, **page.meta()}
 
 @router.delete("/plans/{plan_id}/shares/{share_token}")
 async def revoke_share_link(
@@ -185,23 +194,22 @@ async def get_shared_plan(
     if share.get("password_hash"):
         if not password:
             raise HTTPException(status_code=401, detail="Password required")
-        if not verify_password(password, share["password_hash"]):
+        if not await verify_password_async(password, share["password_hash"]):
             raise HTTPException(status_code=401, detail="Invalid password")
     
-    # Get plan
-    plan = await db.plans.find_one({"_id": to_object_id(share["plan_id"])})
-    if not plan:
+    # Get plan and its sections
+    aggregate = await load_plan_aggregate(db, share["plan_id"], sections=SECTION_AST_PROJECTION)
+    if not aggregate:
         raise HTTPException(status_code=404, detail="Plan not found")
+    plan = aggregate.plan
+    sections = aggregate.sections
     
-    # Get sections (limited based on access level)
-    sections = await db.sections.find({"plan_id": share["plan_id"]}).sort("order_index", 1).to_list(None)
-    
-    plan_clean = serialize_doc(plan)
-    plan_clean["sections"] = [serialize_doc(s) for s in sections]
+    plan_clean = public_doc(plan)
+    plan_clean["sections"] = public_docs(sections)
     plan_clean["access_level"] = share["access_level"]
     plan_clean["is_shared"] = True
     
-    return plan_clean
+    return MongoJSONResponse(plan_clean)
 
 # ============================================================================
 # COLLABORATORS
@@ -274,8 +282,10 @@ async def invite_collaborator(
 @router.get("/plans/{plan_id}/collaborators")
 async def list_collaborators(
     plan_id: str,
+    paging: PageParams = Depends(full_page_params),
     user_id: str = Depends(get_current_user_id),
-    db = Depends(get_db)
+    db = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """List all collaborators for a plan"""
     
@@ -293,22 +303,20 @@ async def list_collaborators(
     if not is_owner and not is_collaborator:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Get collaborators
-    collaborators = await db.plan_collaborators.find({"plan_id": plan_id}).to_list(None)
+    # Get collaborators in invitation order
+    page = await paginate(db.plan_collaborators, {"plan_id": plan_id}, paging, direction=1)
+    collaborators = page.items
+    
+    users = await loaders.users.load_many([c["user_id"] for c in collaborators])
     
     collaborators_list = []
-    for collab in collaborators:
-        user = await db.users.find_one({"_id": to_object_id(collab["user_id"])})
+    for collab, user in zip(collaborators, users):
         if user:
             collab_clean = serialize_doc(collab)
-            collab_clean["user"] = {
-                "id": str(user["_id"]),
-                "email": user.get("email", ""),
-                "name": user.get("name", "Unknown")
-            }
+            collab_clean["user"] = user_summary(user)
             collaborators_list.append(collab_clean)
     
-    return {"collaborators": collaborators_list}
+    return {"collaborators": collaborators_list, **page.meta()}
 
 @router.delete("/plans/{plan_id}/collaborators/{collaborator_id}")
 async def remove_collaborator(
@@ -393,10 +401,11 @@ async def add_comment(
 async def list_comments(
     plan_id: str,
     section_id: Optional[str] = Query(None),
+    paging: PageParams = Depends(full_page_params),
     user_id: str = Depends(get_current_user_id),
     db = Depends(get_db)
 ):
-    """List comments for a plan or section"""
+    """List comments for a plan or section, oldest first"""
     
     # Verify access
     plan = await db.plans.find_one({"_id": to_object_id(plan_id)})
@@ -418,9 +427,9 @@ async def list_comments(
         query["section_id"] = section_id
     
     # Get comments
-    comments = await db.plan_comments.find(query).sort("created_at", 1).to_list(None)
+    page = await paginate(db.plan_comments, query, paging, direction=1)
     
-    return {"comments": [serialize_doc(c) for c in comments]}
+    return {"comments": [serialize_doc(c) for c in page.items], **page.meta()}
 
 @router.patch("/plans/{plan_id}/comments/{comment_id}")
 async def update_comment(
@@ -496,8 +505,10 @@ async def delete_comment(
 @router.get("/plans/{plan_id}/versions")
 async def get_version_history(
     plan_id: str,
+    paging: PageParams = Depends(page_params),
     user_id: str = Depends(get_current_user_id),
-    db = Depends(get_db)
+    db = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Get version history for a plan"""
     
@@ -516,19 +527,59 @@ async def get_version_history(
     if not is_owner and not is_collaborator:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Get versions
-    versions = await db.plan_versions.find({"plan_id": plan_id}).sort("created_at", -1).limit(50).to_list(None)
+    # Get versions (metadata only; section content is reconstructed per version on demand)
+    page = await paginate(db.plan_versions, {"plan_id": plan_id}, paging, projection=VERSION_LIST_PROJECTION)
+    versions = page.items
+    
+    # Creator info (one users query for all versions)
+    creators = await loaders.users.load_many([v.get("created_by") for v in versions])
     
     versions_list = []
-    for version in versions:
-        version_clean = serialize_doc(version)
-        # Get creator info
-        creator = await db.users.find_one({"_id": to_object_id(version["created_by"])})
+    for version, creator in zip(versions, creators):
+        version_clean = public_doc(version)
         if creator:
             version_clean["created_by_name"] = creator.get("name", "Unknown")
         versions_list.append(version_clean)
     
-    return {"versions": versions_list}
+    return MongoJSONResponse({"versions": versions_list, **page.meta()})
+
+@router.get("/plans/{plan_id}/versions/{version_id}")
+async def get_version(
+    plan_id: str,
+    version_id: str,
+    user_id: str = Depends(get_current_user_id),
+    db = Depends(get_db)
+):
+    """Get a version with its sections as they were at that point"""
+    
+    # Verify access
+    plan = await db.plans.find_one({"_id": to_object_id(plan_id)}, {"user_id": 1})
+    if not plan:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    
+    is_owner = plan.get("user_id") == user_id
+    is_collaborator = await db.plan_collaborators.find_one({
+        "plan_id": plan_id,
+        "user_id": user_id,
+        "role": {"$in": ["editor", "admin"]}
+    })
+    
+    if not is_owner and not is_collaborator:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    version = await db.plan_versions.find_one({
+        "_id": to_object_id(version_id),
+        "plan_id": plan_id
+    })
+    
+    if not version:
+        raise HTTPException(status_code=404, detail="Version not found")
+    
+    sections = await reconstruct_sections(db, plan_id, version)
+    
+    version_clean = public_doc({k: v for k, v in version.items() if k not in VERSION_LIST_PROJECTION})
+    version_clean["sections"] = sections
+    return MongoJSONResponse(version_clean)
 
 @router.post("/plans/{plan_id}/restore/{version_id}")
 async def restore_version(
@@ -566,17 +617,28 @@ async def restore_version(
     # Create new version from current state before restoring
     # (This is a simplified version - in production, you'd want to save current state first)
     
-    # Restore sections from version
-    if version.get("sections_snapshot"):
-        # Delete current sections
-        await db.sections.delete_many({"plan_id": plan_id})
+    # Restore sections from version: current sections are swapped for the
+    # reconstructed ones in one bulk write (atomically where transactions are available)
+    sections = await reconstruct_sections(db, plan_id, version)
+    if sections:
+        now = datetime.utcnow()
+        for section in sections:
+            # Sections keep their ids, so comments still point at them
+            section["_id"] = to_object_id(section.pop("id"))
+            section.update(content_ast_fields(section.get("content", "")))
+            section[METRICS_FIELD] = section_metrics(section)
+            section["created_at"] = now
+            section["updated_at"] = now
         
-        # Restore sections
-        for section in version["sections_snapshot"]:
-            section["plan_id"] = plan_id
-            section["created_at"] = datetime.utcnow()
-            section["updated_at"] = datetime.utcnow()
-            await db.sections.insert_one(section)
+        batch = PlanWriteBatch(plan_id)
+        batch.replace("sections", sections)
+        batch.invalidate_exports()
+        # Section totals only; the financial ones are unchanged by a restore
+        batch.update_plan({"$set": {
+            "updated_at": now,
+            **{f"{METRICS_FIELD}.{key}": value for key, value in section_totals(sections).items()}
+        }})
+        await commit(db, batch)
     
     logger.info(f"Plan {plan_id} restored to version {version_id} by user {user_id}")
     
@@ -1,50 +1,28 @@
 """Plans routes - Core plan management and generation"""
 
-from fastapi import APIRouter, HTTPException, Depends, Header, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Request
 from pydantic import BaseModel
 from typing import Dict, List, Optional
 from datetime import datetime
 import logging
-from bson import ObjectId
 
 from utils.serializers import serialize_doc, to_object_id
-from utils.auth import decode_token
+from utils.json_response import MongoJSONResponse, public_doc, public_docs
 from utils.audit_logger import AuditLogger
+from utils.export_cache import invalidate_plan_exports
+from utils.persistence import PlanWriteBatch, commit
+from utils.plan_metrics import METRICS_FIELD, plan_metrics, section_metrics
+from utils.plan_revision import get_plan_revision, with_revision_bump
+from utils.content_ast import content_ast_fields
 from utils.dependencies import get_db
+from utils.projections import resolve_view, view_query
+from utils.pagination import PageParams, full_page_params, paginate
+from utils.principal import get_current_user_id
 from agents.orchestrator import PlanOrchestrator
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# ============================================================================
-# DEPENDENCY: Get Current User
-# ============================================================================
-
-async def get_current_user_id(authorization: Optional[str] = Header(None)):
-    """Extract user_id from JWT token"""
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Missing authorization header")
-    
-    try:
-        scheme, token = authorization.split()
-        if scheme.lower() != 'bearer':
-            raise HTTPException(status_code=401, detail="Invalid authentication scheme")
-        
-        payload = decode_token(token)
-        if not payload:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
-        user_id = payload.get("sub")
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token payload")
-        
-        return user_id
-    except ValueError:
-        raise HTTPException(status_code=401, detail="Invalid authorization header format")
-    except Exception as e:
-        logger.error(f"Auth error: {e}")
-        raise HTTPException(status_code=401, detail="Authentication failed")
-
 # ============================================================================
 # MODELS
 # ============================================================================
@@ -63,11 +41,17 @@ class PlanUpdate(BaseModel):
 # ============================================================================
 
 @router.get("")
-async def list_plans(user_id: str = Depends(get_current_user_id), db = Depends(get_db)):
-    """List all plans for a user"""
+async def list_plans(
+    view: str = view_query("summary", "plans"),
+    paging: PageParams = Depends(full_page_params),
+    user_id: str = Depends(get_current_user_id),
+    db = Depends(get_db)
+):
+    """List a user's plans, newest first (summary fields unless view=full)"""
     
-    plans = await db.plans.find({"user_id": user_id}).sort("created_at", -1).to_list(100)
-    return {"plans": [serialize_doc(p) for p in plans]}
+    projection = resolve_view("plans", view)
+    page = await paginate(db.plans, {"user_id": user_id}, paging, projection=projection)
+    return MongoJSONResponse({"plans": public_docs(page.items), **page.meta()})
 
 @router.post("")
 async def create_plan(plan_data: PlanCreate, user_id: str = Depends(get_current_user_id), db = Depends(get_db)):
@@ -110,14 +94,25 @@ async def create_plan(plan_data: PlanCreate, user_id: str = Depends(get_current_
     return serialize_doc(plan_doc)
 
 @router.get("/{plan_id}")
-async def get_plan(plan_id: str, user_id: str = Depends(get_current_user_id), db = Depends(get_db)):
-    """Get a single plan"""
+async def get_plan(
+    plan_id: str,
+    request: Request,
+    view: str = view_query("full", "plans"),
+    user_id: str = Depends(get_current_user_id),
+    db = Depends(get_db)
+):
+    """Get a single plan (304 when If-None-Match carries its current ETag)"""
     
-    plan = await db.plans.find_one({"_id": to_object_id(plan_id), "user_id": user_id})
+    projection = resolve_view("plans", view)
+    revision = await get_plan_revision(request, db, plan_id, user_id)
+    if revision.not_modified:
+        return revision.not_modified_response()
+    
+    plan = await db.plans.find_one({"_id": to_object_id(plan_id), "user_id": user_id}, projection)
     if not plan:
         raise HTTPException(status_code=404, detail="Plan not found")
     
-    return serialize_doc(plan)
+    return revision.respond(public_doc(plan))
 
 @router.patch("/{plan_id}")
 async def update_plan(plan_id: str, plan_update: PlanUpdate, user_id: str = Depends(get_current_user_id), db = Depends(get_db)):
@@ -131,12 +126,15 @@ async def update_plan(plan_id: str, plan_update: PlanUpdate, user_id: str = Depe
     
     result = await db.plans.update_one(
         {"_id": to_object_id(plan_id), "user_id": user_id},
-        {"$set": update_data}
+        with_revision_bump({"$set": update_data})
     )
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Plan not found")
     
+    if "name" in update_data:
+        await invalidate_plan_exports(db, plan_id)
+    
     plan = await db.plans.find_one({"_id": to_object_id(plan_id)})
     return serialize_doc(plan)
 
@@ -171,68 +169,46 @@ async def _run_generation(plan_id: str, user_id: str, intake_data: Dict, plan_pu
         if result["status"] == "failed":
             await db.plans.update_one(
                 {"_id": to_object_id(plan_id)},
-                {"$set": {"status": "failed", "error": result.get("error"), "updated_at": datetime.utcnow()}}
+                with_revision_bump({"$set": {"status": "failed", "error": result.get("error"), "updated_at": datetime.utcnow()}})
             )
             logger.error(f"Plan generation failed for {plan_id}: {result.get('error')}")
             return
         
-        # Store results
-        # 1. Research Pack
-        await db.research_packs.insert_one({
-            "plan_id": plan_id,
-            "data": result["research_pack"],
-            "created_at": datetime.utcnow()
-        })
+        # Store results: one bulk write per collection, replacing the artifacts
+        # of any earlier generation, with the plan flipped to complete last
+        now = datetime.utcnow()
+        batch = PlanWriteBatch(plan_id)
         
-        # 2. Financial Model
-        await db.financial_models.insert_one({
-            "plan_id": plan_id,
-            "data": result["financial_model"],
-            "created_at": datetime.utcnow()
-        })
+        # 1. Research Pack, Financial Model and Compliance Report
+        batch.replace("research_packs", [{"data": result["research_pack"], "created_at": now}])
+        batch.replace("financial_models", [{"data": result["financial_model"], "created_at": now}])
+        batch.replace("compliance_reports", [{"data": result["compliance_report"], "created_at": now}])
         
-        # 3. Sections (sort by order_index to ensure proper ordering)
+        # 2. Sections (sort by order_index to ensure proper ordering)
         sorted_sections = sorted(result["sections"], key=lambda x: x.get("order_index", 999))
         for section in sorted_sections:
-            section["plan_id"] = plan_id
-            section["created_at"] = datetime.utcnow()
-            await db.sections.insert_one(section)
+            section.update(content_ast_fields(section.get("content", "")))
+            section[METRICS_FIELD] = section_metrics(section)
+            section["created_at"] = now
+        batch.replace("sections", sorted_sections)
         
-        # 4. Compliance Report
-        await db.compliance_reports.insert_one({
-            "plan_id": plan_id,
-            "data": result["compliance_report"],
-            "created_at": datetime.utcnow()
-        })
-        
-        # 5. SWOT Analysis
+        # 3. SWOT and Competitor Analysis
         if result.get("swot_analysis"):
-            await db.swot_analyses.insert_one({
-                "plan_id": plan_id,
-                "user_id": user_id,
-                "data": result["swot_analysis"],
-                "created_at": datetime.utcnow()
-            })
-        
-        # 6. Competitor Analysis
+            batch.replace("swot_analyses", [{"user_id": user_id, "data": result["swot_analysis"], "created_at": now}])
         if result.get("competitor_analysis"):
-            await db.competitor_analyses.insert_one({
-                "plan_id": plan_id,
-                "user_id": user_id,
-                "data": result["competitor_analysis"],
-                "created_at": datetime.utcnow()
-            })
+            batch.replace("competitor_analyses", [{"user_id": user_id, "data": result["competitor_analysis"], "created_at": now}])
         
-        # Update plan status
-        await db.plans.update_one(
-            {"_id": to_object_id(plan_id)},
-            {"$set": {
-                "status": "complete",
-                "completed_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow(),
-                "generation_metadata": result["generation_metadata"]
-            }}
-        )
+        # Previous exports were rendered from the old sections/model
+        batch.invalidate_exports()
+        
+        batch.update_plan({"$set": {
+            "status": "complete",
+            "completed_at": now,
+            "updated_at": now,
+            "generation_metadata": result["generation_metadata"],
+            METRICS_FIELD: plan_metrics(sorted_sections, {"data": result["financial_model"]})
+        }})
+        await commit(db, batch)
         
         # Log activity
         await AuditLogger.log_activity(
@@ -250,7 +226,7 @@ async def _run_generation(plan_id: str, user_id: str, intake_data: Dict, plan_pu
         logger.error(f"Generation error for plan {plan_id}: {e}")
         await db.plans.update_one(
             {"_id": to_object_id(plan_id)},
-            {"$set": {"status": "failed", "error": str(e), "updated_at": datetime.utcnow()}}
+            with_revision_bump({"$set": {"status": "failed", "error": str(e), "updated_at": datetime.utcnow()}})
         )
 
 @router.post("/{plan_id}/generate")
@@ -278,7 +254,7 @@ async def generate_plan(
     # Update status to generating
     await db.plans.update_one(
         {"_id": to_object_id(plan_id)},
-        {"$set": {"status": "generating", "updated_at": datetime.utcnow()}}
+        with_revision_bump({"$set": {"status": "generating", "updated_at": datetime.utcnow()}})
     )
     
     # Start generation in background
@@ -304,18 +280,20 @@ async def generate_plan(
     }
 
 @router.get("/{plan_id}/status")
-async def get_generation_status(plan_id: str, user_id: str = Depends(get_current_user_id), db = Depends(get_db)):
-    """Get plan generation status"""
+async def get_generation_status(plan_id: str, request: Request, user_id: str = Depends(get_current_user_id), db = Depends(get_db)):
+    """Get plan generation status (304 when unchanged since the last poll)"""
     
-    plan = await db.plans.find_one({"_id": to_object_id(plan_id), "user_id": user_id})
-    if not plan:
-        raise HTTPException(status_code=404, detail="Plan not found")
+    # One query: the revision check also carries the status fields
+    revision = await get_plan_revision(request, db, plan_id, user_id, fields=["status", "updated_at"])
+    if revision.not_modified:
+        return revision.not_modified_response()
     
-    return {
+    plan = revision.plan
+    return revision.respond({
         "plan_id": plan_id,
         "status": plan.get("status", "unknown"),
-        "updated_at": serialize_doc(plan.get("updated_at", datetime.utcnow()))
-    }
+        "updated_at": plan.get("updated_at", datetime.utcnow())
+    })
 
 @router.post("/{plan_id}/duplicate")
 async def duplicate_plan(plan_id: str, user_id: str = Depends(get_current_user_id), db = Depends(get_db)):
@@ -9,11 +9,19 @@ import os
 from utils.serializers import serialize_doc, to_object_id
 from utils.dependencies import get_db
 from utils.admin import get_current_user_id
+from utils.plan_loader import load_plan_aggregate
+from utils.plan_metrics import load_plan_metrics, readiness_breakdown
+from utils.plan_revision import with_revision_bump
 from emergentintegrations.llm.chat import LlmChat, UserMessage
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Section fields the recommendations prompt reads (the scores come from the plan's metrics)
+READINESS_SECTION_PROJECTION = {
+    "section_type": 1, "title": 1, "content": 1, "data_citations": 1
+}
+
 @router.get("/plans/{plan_id}/readiness-score")
 async def get_readiness_score(
     plan_id: str,
@@ -22,173 +30,28 @@ async def get_readiness_score(
 ):
     """Calculate investment readiness score for a plan"""
     
-    # Get plan
-    plan = await db.plans.find_one({
-        "_id": to_object_id(plan_id),
-        "user_id": user_id
-    })
-    
-    if not plan:
-        raise HTTPException(status_code=404, detail="Plan not found")
-    
-    # Get plan data
-    sections = await db.sections.find({"plan_id": plan_id}).sort("order_index", 1).to_list(None)
-    financial_model = await db.financial_models.find_one({"plan_id": plan_id})
-    research_pack = await db.research_packs.find_one({"plan_id": plan_id})
-    compliance_report = await db.compliance_reports.find_one({"plan_id": plan_id})
-    
-    # Calculate base scores for each category
-    breakdown = {}
-    
-    # 1. Executive Summary (20%)
-    exec_summary = next((s for s in sections if s.get("section_type") == "executive_summary"), None)
-    exec_score = 0
-    if exec_summary:
-        content = exec_summary.get("content", "")
-        word_count = len(content.split())
-        # Check for key elements
-        has_vision = any(word in content.lower() for word in ["vision", "mission", "goal"])
-        has_market = any(word in content.lower() for word in ["market", "opportunity", "demand"])
-        has_financials = any(word in content.lower() for word in ["revenue", "profit", "funding", "investment"])
-        has_team = any(word in content.lower() for word in ["team", "founder", "management"])
-        
-        exec_score = 20  # Base
-        if word_count < 200:
-            exec_score -= 5  # Too short
-        if word_count > 1000:
-            exec_score -= 3  # Too long
-        if not has_vision:
-            exec_score -= 3
-        if not has_market:
-            exec_score -= 3
-        if not has_financials:
-            exec_score -= 3
-        if not has_team:
-            exec_score -= 3
-    breakdown["executive_summary"] = max(0, min(100, exec_score))
-    
-    # 2. Market Analysis (15%)
-    market_section = next((s for s in sections if s.get("section_type") == "market_analysis"), None)
-    market_score = 0
-    if market_section:
-        content = market_section.get("content", "")
-        citations = len(market_section.get("data_citations", []))
-        word_count = len(content.split())
-        
-        market_score = 15  # Base
-        if citations >= 3:
-            market_score += 3  # Good data sources
-        if word_count >= 500:
-            market_score += 2  # Comprehensive
-        if word_count < 300:
-            market_score -= 5  # Too brief
-    breakdown["market_analysis"] = max(0, min(100, market_score))
-    
-    # 3. Financial Projections (25%)
-    financial_score = 0
-    if financial_model:
-        financial_data = financial_model.get("data", {})
-        pnl = financial_data.get("pnl_monthly", [])
-        cashflow = financial_data.get("cashflow_monthly", [])
-        break_even = financial_data.get("break_even", {})
-        
-        financial_score = 25  # Base
-        if len(pnl) >= 12:
-            financial_score += 5  # 12+ months of projections
-        if len(cashflow) >= 12:
-            financial_score += 5  # Cash flow projections
-        if break_even and break_even.get("months_to_break_even"):
-            financial_score += 5  # Break-even analysis
-        if financial_data.get("kpis"):
-            financial_score += 5  # KPIs included
-    breakdown["financial_projections"] = max(0, min(100, financial_score))
-    
-    # 4. Team/Management (10%)
-    team_section = next((s for s in sections if s.get("section_type") == "team"), None)
-    team_score = 0
-    if team_section:
-        content = team_section.get("content", "")
-        word_count = len(content.split())
-        
-        team_score = 10  # Base
-        if word_count >= 300:
-            team_score += 2  # Detailed
-        if any(word in content.lower() for word in ["experience", "background", "qualification"]):
-            team_score += 2  # Mentions experience
-        if word_count < 150:
-            team_score -= 5  # Too brief
-    breakdown["team_management"] = max(0, min(100, team_score))
-    
-    # 5. Competitive Analysis (10%)
-    # Handle multiple section type variations: competitive_analysis, competitor_analysis, competitors_analysis
-    competitive_variations = ["competitive_analysis", "competitor_analysis", "competitors_analysis", "competition_analysis"]
-    competitive_section = next(
-        (s for s in sections 
-         if s.get("section_type", "").lower().strip().replace(" ", "_") in competitive_variations
-         or ("competitor" in s.get("section_type", "").lower() and "analysis" in s.get("section_type", "").lower())),
-        None
+    # Get plan (with its maintained metrics) and the sections the recommendations describe
+    aggregate = await load_plan_aggregate(
+        db, plan_id, user_id,
+        sections=READINESS_SECTION_PROJECTION
     )
-    competitive_score = 0
-    if competitive_section:
-        content = competitive_section.get("content", "")
-        word_count = len(content.split())
-        
-        competitive_score = 10  # Base
-        if word_count >= 400:
-            competitive_score += 3  # Comprehensive
-        if any(word in content.lower() for word in ["competitor", "competitive", "advantage", "differentiator"]):
-            competitive_score += 2  # Mentions competition
-        if word_count < 200:
-            competitive_score -= 5  # Too brief
-    breakdown["competitive_analysis"] = max(0, min(100, competitive_score))
     
-    # 6. Risk Assessment (10%)
-    risk_section = next((s for s in sections if "risk" in s.get("section_type", "").lower() or "risk" in s.get("title", "").lower()), None)
-    risk_score = 0
-    if risk_section:
-        content = risk_section.get("content", "")
-        word_count = len(content.split())
-        
-        risk_score = 10  # Base
-        if word_count >= 300:
-            risk_score += 3  # Detailed risk analysis
-        if any(word in content.lower() for word in ["mitigation", "strategy", "solution"]):
-            risk_score += 2  # Mentions mitigation
-        if word_count < 150:
-            risk_score -= 5  # Too brief
-    else:
-        # Check if risks are mentioned in other sections
-        all_content = " ".join([s.get("content", "") for s in sections])
-        if "risk" in all_content.lower():
-            risk_score = 5  # Partial credit
-    breakdown["risk_assessment"] = max(0, min(100, risk_score))
-    
-    # 7. Presentation Quality (10%)
-    presentation_score = 10  # Base
-    total_sections = len(sections)
-    completed_sections = sum(1 for s in sections if s.get("content") and len(s.get("content", "").strip()) > 50)
-    completion_rate = completed_sections / total_sections if total_sections > 0 else 0
-    
-    if completion_rate >= 0.9:
-        presentation_score += 3  # Nearly complete
-    elif completion_rate >= 0.7:
-        presentation_score += 1  # Mostly complete
-    elif completion_rate < 0.5:
-        presentation_score -= 5  # Incomplete
+    if not aggregate:
+        raise HTTPException(status_code=404, detail="Plan not found")
     
-    # Check for user edits (indicates polish)
-    edited_sections = sum(1 for s in sections if s.get("edited_by_user", False))
-    if edited_sections > 0:
-        presentation_score += 2  # User has polished content
+    plan = aggregate.plan
+    sections = aggregate.sections
     
-    breakdown["presentation"] = max(0, min(100, presentation_score))
+    # Category scores are maintained as sections and financials are written
+    totals = (await load_plan_metrics(db, [plan]))[0]
+    breakdown = readiness_breakdown(totals)
     
     # Calculate overall score
     overall_score = sum(breakdown.values())
     
     # Use AI to generate recommendations
     recommendations = await _generate_recommendations(
-        plan, sections, financial_model, breakdown, overall_score
+        plan, sections, breakdown, overall_score
     )
     
     # Store score
@@ -201,7 +64,7 @@ async def get_readiness_score(
     
     await db.plans.update_one(
         {"_id": to_object_id(plan_id)},
-        {"$set": {"readiness_score": score_data, "updated_at": datetime.utcnow()}}
+        with_revision_bump({"$set": {"readiness_score": score_data, "updated_at": datetime.utcnow()}})
     )
     
     return score_data
@@ -209,7 +72,6 @@ async def get_readiness_score(
 async def _generate_recommendations(
     plan: Dict,
     sections: List[Dict],
-    financial_model: Dict,
     breakdown: Dict,
     overall_score: int
 ) -> List[Dict]:
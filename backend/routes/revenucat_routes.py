@@ -13,6 +13,7 @@ import json
 from utils.serializers import serialize_doc, to_object_id
 from utils.dependencies import get_db
 from utils.admin import get_current_user_id
+from utils.principal import invalidate_principal
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -202,6 +203,7 @@ async def _process_subscription_event(event: Dict, db):
         {"_id": to_object_id(user_id)},
         {"$set": {"subscription_tier": tier, "updated_at": datetime.utcnow()}}
     )
+    invalidate_principal(user_id)
     
     # Log payment transaction (for admin analytics)
     if event_type in ["INITIAL_PURCHASE", "RENEWAL", "PRODUCT_CHANGE"]:
@@ -2,14 +2,14 @@
 
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
-from typing import Optional, Dict, List
+from typing import Optional
 from datetime import datetime
 import logging
 
 from utils.serializers import serialize_doc, to_object_id
 from utils.dependencies import get_db
 from utils.admin import get_current_user_id
-from agents.financial_engine import FinancialEngine
+from agents.scenario_engine import build_scenario, build_scenario_set, calculate_sensitivity
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -49,53 +49,10 @@ async def create_scenarios(
     benchmarks = orchestrator._get_industry_benchmarks(intake_data.get("industry", "generic"))
     
     # Create three scenarios
-    scenarios = {}
-    
-    # 1. Best Case Scenario (+20% revenue, -10% costs)
-    best_case_intake = intake_data.copy()
-    best_case_intake["monthly_revenue_estimate"] = intake_data.get("monthly_revenue_estimate", 0) * 1.2
-    best_case_engine = FinancialEngine(best_case_intake, benchmarks)
-    best_case_model = best_case_engine.generate_financial_model()
-    # generate_financial_model() returns the model directly, not wrapped in "data"
-    if "data" in best_case_model:
-        best_case_data = best_case_model["data"]
-    else:
-        best_case_data = best_case_model
-    best_case_data["revenue_multiplier"] = 1.2
-    best_case_data["cost_multiplier"] = 0.9
-    scenarios["best_case"] = best_case_data
-    
-    # 2. Worst Case Scenario (-30% revenue, +15% costs)
-    worst_case_intake = intake_data.copy()
-    worst_case_intake["monthly_revenue_estimate"] = intake_data.get("monthly_revenue_estimate", 0) * 0.7
-    worst_case_engine = FinancialEngine(worst_case_intake, benchmarks)
-    worst_case_model = worst_case_engine.generate_financial_model()
-    # generate_financial_model() returns the model directly, not wrapped in "data"
-    if "data" in worst_case_model:
-        worst_case_data = worst_case_model["data"]
-    else:
-        worst_case_data = worst_case_model
-    # Adjust costs upward - check for pnl_annual (not pnl_monthly)
-    if worst_case_data.get("pnl_annual"):
-        for year in worst_case_data["pnl_annual"]:
-            if "operating_expenses" in year:
-                year["operating_expenses"] = year["operating_expenses"] * 1.15
-            if "total_expenses" in year:
-                year["total_expenses"] = year["total_expenses"] * 1.15
-            if "net_profit" in year:
-                year["net_profit"] = year.get("revenue", 0) - year.get("total_expenses", 0)
-    worst_case_data["revenue_multiplier"] = 0.7
-    worst_case_data["cost_multiplier"] = 1.15
-    scenarios["worst_case"] = worst_case_data
-    
-    # 3. Realistic Scenario (base projections)
-    realistic_model = financial_data.copy()
-    realistic_model["revenue_multiplier"] = 1.0
-    realistic_model["cost_multiplier"] = 1.0
-    scenarios["realistic"] = realistic_model
+    scenarios = build_scenario_set(intake_data, financial_data, benchmarks)
     
     # Calculate sensitivity analysis
-    sensitivity = _calculate_sensitivity(intake_data, financial_data, benchmarks)
+    sensitivity = calculate_sensitivity(intake_data, financial_data, benchmarks)
     
     # Store scenarios
     scenario_doc = {
@@ -179,92 +136,15 @@ async def analyze_scenario(
     benchmarks = orchestrator._get_industry_benchmarks(intake_data.get("industry", "generic"))
     
     # Create custom scenario
-    custom_intake = intake_data.copy()
-    custom_intake["monthly_revenue_estimate"] = intake_data.get("monthly_revenue_estimate", 0) * scenario_input.revenue_multiplier
-    custom_engine = FinancialEngine(custom_intake, benchmarks)
-    custom_model = custom_engine.generate_financial_model()
-    
-    # generate_financial_model() returns the model directly, not wrapped in "data"
-    if "data" in custom_model:
-        custom_data = custom_model["data"]
-    else:
-        custom_data = custom_model
-    
-    # Adjust costs - check for pnl_annual (not pnl_monthly)
-    if custom_data.get("pnl_annual"):
-        for year in custom_data["pnl_annual"]:
-            if "operating_expenses" in year:
-                year["operating_expenses"] = year["operating_expenses"] * scenario_input.cost_multiplier
-            if "total_expenses" in year:
-                year["total_expenses"] = year["total_expenses"] * scenario_input.cost_multiplier
-            if "net_profit" in year:
-                year["net_profit"] = year.get("revenue", 0) - year.get("total_expenses", 0)
-    
-    custom_data["revenue_multiplier"] = scenario_input.revenue_multiplier
-    custom_data["cost_multiplier"] = scenario_input.cost_multiplier
+    custom_data = build_scenario(
+        intake_data,
+        benchmarks,
+        scenario_input.revenue_multiplier,
+        scenario_input.cost_multiplier
+    )
     
     return {
         "scenario": custom_data,
         "revenue_multiplier": scenario_input.revenue_multiplier,
         "cost_multiplier": scenario_input.cost_multiplier
     }
-
-def _calculate_sensitivity(intake_data: Dict, financial_data: Dict, benchmarks: Dict) -> List[Dict]:
-    """Calculate sensitivity analysis for key variables"""
-    
-    variables = []
-    
-    # Revenue sensitivity
-    base_revenue = intake_data.get("monthly_revenue_estimate", 0)
-    if base_revenue > 0:
-        # Test ±20% revenue change - check for pnl_annual (not pnl_monthly)
-        pnl_data = financial_data.get("pnl_annual") or financial_data.get("pnl_monthly", [{}])
-        if pnl_data and len(pnl_data) > 0:
-            first_period = pnl_data[0]
-            period_revenue = first_period.get("revenue", 0)
-            revenue_impact = (period_revenue * 0.2) / base_revenue * 100 if base_revenue > 0 else 0
-            variables.append({
-                "name": "Monthly Revenue",
-                "impact_score": min(100, abs(revenue_impact)),
-                "effect": "positive" if revenue_impact > 0 else "negative",
-                "description": "20% change in revenue affects profitability significantly"
-            })
-    
-    # Cost sensitivity
-    pnl_data = financial_data.get("pnl_annual") or financial_data.get("pnl_monthly", [])
-    if pnl_data and len(pnl_data) > 0:
-        first_period = pnl_data[0]
-        base_costs = first_period.get("total_expenses", 0)
-        if base_costs > 0:
-            cost_impact = (base_costs * 0.15) / base_costs * 100
-            variables.append({
-                "name": "Operating Costs",
-                "impact_score": min(100, abs(cost_impact)),
-                "effect": "negative",
-                "description": "15% change in costs has significant impact on profitability"
-            })
-    
-    # Price per unit sensitivity
-    price_per_unit = intake_data.get("price_per_unit", 0)
-    if price_per_unit > 0:
-        variables.append({
-            "name": "Price per Unit",
-            "impact_score": 75,
-            "effect": "positive",
-            "description": "Price changes directly affect revenue and margins"
-        })
-    
-    # Units per month sensitivity
-    units_per_month = intake_data.get("units_per_month", 0)
-    if units_per_month > 0:
-        variables.append({
-            "name": "Units per Month",
-            "impact_score": 80,
-            "effect": "positive",
-            "description": "Volume changes significantly impact total revenue"
-        })
-    
-    # Sort by impact score
-    variables.sort(key=lambda x: x["impact_score"], reverse=True)
-    
-    return variables
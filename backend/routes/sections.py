@@ -1,35 +1,30 @@
 """Sections routes - View and edit plan sections"""
 
-from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi import APIRouter, HTTPException, Depends, Request
 from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
 import logging
-from bson import ObjectId
+from pymongo import ReturnDocument
 
-from utils.serializers import serialize_doc, to_object_id
-from utils.auth import decode_token
+from utils.serializers import to_object_id
+from utils.json_response import MongoJSONResponse, public_doc, public_docs
 from utils.audit_logger import AuditLogger
+from utils.export_cache import invalidate_plan_exports
+from utils.content_ast import SECTION_AST_PROJECTION, content_ast_fields
 from utils.dependencies import get_db
+from utils.projections import resolve_view, view_query
+from utils.pagination import PageParams, full_page_params, paginate
+from utils.plan_versions import record_version
+from utils.plan_metrics import (
+    METRICS_FIELD, SECTION_METRICS_PROJECTION, SECTION_SCORING_PROJECTION, record_section_write, section_metrics
+)
+from utils.plan_revision import get_plan_revision
+from utils.principal import get_current_user_id
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-async def get_current_user_id(authorization: Optional[str] = Header(None)):
-    """Extract user_id from JWT token"""
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Missing authorization header")
-    
-    try:
-        scheme, token = authorization.split()
-        payload = decode_token(token)
-        user_id = payload.get("sub")
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return user_id
-    except Exception:
-        raise HTTPException(status_code=401, detail="Authentication failed")
-
 class SectionUpdate(BaseModel):
     content: str
 
@@ -40,32 +35,53 @@ class RegenerationOptions(BaseModel):
     additional_instructions: Optional[str] = None
 
 @router.get("/{plan_id}/sections")
-async def get_sections(plan_id: str, user_id: str = Depends(get_current_user_id), db = Depends(get_db)):
-    """Get all sections for a plan"""
+async def get_sections(
+    plan_id: str,
+    request: Request,
+    view: str = view_query("full", "sections"),
+    paging: PageParams = Depends(full_page_params),
+    user_id: str = Depends(get_current_user_id),
+    db = Depends(get_db)
+):
+    """Get a plan's sections in order (view=outline omits content)"""
     
-    # Verify plan ownership
-    plan = await db.plans.find_one({"_id": to_object_id(plan_id), "user_id": user_id})
-    if not plan:
-        raise HTTPException(status_code=404, detail="Plan not found")
+    projection = resolve_view("sections", view)
+    
+    # Verify plan ownership; 304 if nothing changed since the client's copy
+    revision = await get_plan_revision(request, db, plan_id, user_id)
+    if revision.not_modified:
+        return revision.not_modified_response()
     
-    sections = await db.sections.find({"plan_id": plan_id}).sort("order_index", 1).to_list(100)
+    page = await paginate(
+        db.sections, {"plan_id": plan_id}, paging,
+        sort_field="order_index", direction=1, projection=projection
+    )
     
-    return {"sections": [serialize_doc(s) for s in sections]}
+    return revision.respond({"sections": public_docs(page.items), **page.meta()})
 
 @router.get("/{plan_id}/sections/{section_id}")
-async def get_section(plan_id: str, section_id: str, user_id: str = Depends(get_current_user_id), db = Depends(get_db)):
+async def get_section(
+    plan_id: str,
+    section_id: str,
+    request: Request,
+    view: str = view_query("full", "sections"),
+    user_id: str = Depends(get_current_user_id),
+    db = Depends(get_db)
+):
     """Get a specific section"""
     
-    # Verify plan ownership
-    plan = await db.plans.find_one({"_id": to_object_id(plan_id), "user_id": user_id})
-    if not plan:
-        raise HTTPException(status_code=404, detail="Plan not found")
+    projection = resolve_view("sections", view)
     
-    section = await db.sections.find_one({"_id": to_object_id(section_id), "plan_id": plan_id})
+    # Verify plan ownership; 304 if nothing changed since the client's copy
+    revision = await get_plan_revision(request, db, plan_id, user_id)
+    if revision.not_modified:
+        return revision.not_modified_response()
+    
+    section = await db.sections.find_one({"_id": to_object_id(section_id), "plan_id": plan_id}, projection)
     if not section:
         raise HTTPException(status_code=404, detail="Section not found")
     
-    return serialize_doc(section)
+    return revision.respond(public_doc(section))
 
 @router.patch("/{plan_id}/sections/{section_id}")
 async def update_section(plan_id: str, section_id: str, section_update: SectionUpdate, user_id: str = Depends(get_current_user_id), db = Depends(get_db)):
@@ -82,42 +98,33 @@ async def update_section(plan_id: str, section_id: str, section_update: SectionU
         section_object_id = to_object_id(section_id)
         logger.info(f"Updating section {section_id} (ObjectId: {section_object_id}) for plan {plan_id}")
         
-        # Get current section for version tracking
-        current_section = await db.sections.find_one({"_id": section_object_id, "plan_id": plan_id})
+        # Metrics of the new content (an edit leaves the other scored fields as they are)
+        scored = await db.sections.find_one({"_id": section_object_id, "plan_id": plan_id}, SECTION_SCORING_PROJECTION)
+        metrics = section_metrics({**(scored or {}), "content": section_update.content, "edited_by_user": True})
         
-        # Update section
-        result = await db.sections.update_one(
+        # Update section; the content and metrics it replaces come back from the
+        # same write, for version tracking and the plan's metric totals
+        current_section = await db.sections.find_one_and_update(
             {"_id": section_object_id, "plan_id": plan_id},
             {"$set": {
                 "content": section_update.content,
+                **content_ast_fields(section_update.content),
+                METRICS_FIELD: metrics,
                 "updated_at": datetime.utcnow(),
                 "edited_by_user": True
-            }}
+            }},
+            projection=SECTION_METRICS_PROJECTION,
+            return_document=ReturnDocument.BEFORE
         )
         
-        # Create version snapshot if content changed
+        # Record a version (a delta against the previous one where possible) if content changed
         if current_section and current_section.get("content") != section_update.content:
-            # Get all sections for snapshot
-            all_sections = await db.sections.find({"plan_id": plan_id}).to_list(None)
-            sections_snapshot = [serialize_doc(s) for s in all_sections]
-            
-            # Create version
-            version_number = await db.plan_versions.count_documents({"plan_id": plan_id}) + 1
-            await db.plan_versions.insert_one({
-                "plan_id": plan_id,
-                "version_number": version_number,
-                "created_by": user_id,
-                "changes": [{
-                    "section_id": section_id,
-                    "field": "content",
-                    "old_value": current_section.get("content", "")[:200],  # First 200 chars
-                    "new_value": section_update.content[:200]
-                }],
-                "sections_snapshot": sections_snapshot,
-                "created_at": datetime.utcnow()
-            })
-        
-        if result.matched_count == 0:
+            await record_version(
+                db, plan_id, user_id, section_id,
+                current_section.get("content", ""), section_update.content
+            )
+        
+        if current_section is None:
             logger.warning(f"Section not found: {section_id} for plan {plan_id}")
             # Try to find section to see if it exists but with different plan_id
             section_check = await db.sections.find_one({"_id": section_object_id})
@@ -125,9 +132,13 @@ async def update_section(plan_id: str, section_id: str, section_update: SectionU
                 logger.warning(f"Section exists but plan_id mismatch. Section plan_id: {section_check.get('plan_id')}, requested: {plan_id}")
             raise HTTPException(status_code=404, detail="Section not found")
         
+        if current_section and current_section.get("content") != section_update.content:
+            await invalidate_plan_exports(db, plan_id)
+        await record_section_write(db, plan_id, current_section, {METRICS_FIELD: metrics})
+        
         logger.info(f"Section updated successfully: {section_id}")
-        section = await db.sections.find_one({"_id": section_object_id})
-        return serialize_doc(section)
+        section = await db.sections.find_one({"_id": section_object_id}, SECTION_AST_PROJECTION)
+        return MongoJSONResponse(public_doc(section))
         
     except HTTPException:
         raise
@@ -186,17 +197,27 @@ async def regenerate_section(
         )
         
         # Save regenerated content
-        await db.sections.update_one(
+        metrics = section_metrics({**section, "content": new_section_data.get("content")})
+        before = await db.sections.find_one_and_update(
             {"_id": to_object_id(section_id)},
             {"$set": {
                 "content": new_section_data.get("content"),
+                **content_ast_fields(new_section_data.get("content")),
+                METRICS_FIELD: metrics,
                 "word_count": new_section_data.get("word_count"),
                 "regenerated_at": datetime.utcnow(),
                 "regeneration_count": section.get("regeneration_count", 0) + 1
-            }}
+            }},
+            projection=SECTION_METRICS_PROJECTION,
+            return_document=ReturnDocument.BEFORE
         )
+        if before is None:
+            raise HTTPException(status_code=404, detail="Section not found")
+        await record_section_write(db, plan_id, before, {METRICS_FIELD: metrics})
         
-        updated_section = await db.sections.find_one({"_id": to_object_id(section_id)})
+        await invalidate_plan_exports(db, plan_id)
+        
+        updated_section = await db.sections.find_one({"_id": to_object_id(section_id)}, SECTION_AST_PROJECTION)
         
         # Log activity
         await AuditLogger.log_activity(
@@ -215,11 +236,13 @@ async def regenerate_section(
             }
         )
         
-        return {
+        return MongoJSONResponse({
             "success": True,
-            "section": serialize_doc(updated_section)
-        }
+            "section": public_doc(updated_section)
+        })
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Regeneration error: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to regenerate section: {str(e)}")
@@ -1,8 +1,8 @@
 """Stripe payment integration routes"""
 
-from fastapi import APIRouter, HTTPException, Depends, Header, Request
+from fastapi import APIRouter, HTTPException, Depends, Request
 from pydantic import BaseModel
-from typing import Optional, Dict
+from typing import Dict
 from datetime import datetime
 import logging
 import os
@@ -15,8 +15,8 @@ from emergentintegrations.payments.stripe.checkout import (
 )
 
 from utils.serializers import serialize_doc, to_object_id
-from utils.auth import decode_token
 from utils.dependencies import get_db
+from utils.principal import get_current_user_id, invalidate_principal
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -49,21 +49,6 @@ SUBSCRIPTION_PACKAGES = {
     }
 }
 
-async def get_current_user_id(authorization: Optional[str] = Header(None)):
-    """Extract user_id from JWT token"""
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Missing authorization header")
-    
-    try:
-        scheme, token = authorization.split()
-        payload = decode_token(token)
-        user_id = payload.get("sub")
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return user_id
-    except Exception:
-        raise HTTPException(status_code=401, detail="Authentication failed")
-
 class CheckoutRequest(BaseModel):
     package_id: str
     origin_url: str
@@ -231,6 +216,7 @@ async def get_checkout_status(session_id: str, user_id: str = Depends(get_curren
                     "updated_at": datetime.utcnow()
                 }}
             )
+            invalidate_principal(user_id)
             
             # Mark transaction as processed
             await db.payment_transactions.update_one(
@@ -1,31 +1,15 @@
 """Subscriptions routes - Usage tracking and limits"""
 
-from fastapi import APIRouter, HTTPException, Depends, Header
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends
 import logging
 
 from utils.serializers import serialize_doc
-from utils.auth import decode_token
 from utils.dependencies import get_db
+from utils.principal import get_current_user_id
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-async def get_current_user_id(authorization: Optional[str] = Header(None)):
-    """Extract user_id from JWT token"""
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Missing authorization header")
-    
-    try:
-        scheme, token = authorization.split()
-        payload = decode_token(token)
-        user_id = payload.get("sub")
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return user_id
-    except Exception:
-        raise HTTPException(status_code=401, detail="Authentication failed")
-
 @router.get("/current")
 async def get_current_subscription(user_id: str = Depends(get_current_user_id), db = Depends(get_db)):
     """Get current user subscription"""
@@ -1,49 +1,22 @@
 """SWOT Analysis routes"""
 
-from fastapi import APIRouter, HTTPException, Depends, Header
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends
 from datetime import datetime
 import logging
-from bson import ObjectId
+from pymongo import ReturnDocument
 
 from utils.serializers import serialize_doc, to_object_id
-from utils.auth import decode_token
 from utils.audit_logger import AuditLogger
+from utils.export_cache import invalidate_plan_exports
+from utils.content_ast import content_ast_fields
+from utils.plan_metrics import METRICS_FIELD, SECTION_METRICS_PROJECTION, record_section_write, section_metrics
 from utils.dependencies import get_db
+from utils.principal import get_current_user_id
 from agents.swot_agent import SWOTAgent
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# ============================================================================
-# DEPENDENCY: Get Current User
-# ============================================================================
-
-async def get_current_user_id(authorization: Optional[str] = Header(None)):
-    """Extract user_id from JWT token"""
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Missing authorization header")
-    
-    try:
-        scheme, token = authorization.split()
-        if scheme.lower() != 'bearer':
-            raise HTTPException(status_code=401, detail="Invalid authentication scheme")
-        
-        payload = decode_token(token)
-        if not payload:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
-        user_id = payload.get("sub")
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token payload")
-        
-        return user_id
-    except ValueError:
-        raise HTTPException(status_code=401, detail="Invalid authorization header format")
-    except Exception as e:
-        logger.error(f"Auth error: {e}")
-        raise HTTPException(status_code=401, detail="Authentication failed")
-
 # ============================================================================
 # ROUTES
 # ============================================================================
@@ -142,22 +115,30 @@ async def regenerate_swot(plan_id: str, user_id: str = Depends(get_current_user_
     
     # Also update/create section for backward compatibility
     if swot_section:
-        await db.sections.update_one(
+        metrics = section_metrics({**swot_section, "content": swot_content})
+        before = await db.sections.find_one_and_update(
             {"_id": swot_section["_id"]},
             {"$set": {
                 "content": swot_content,
+                **content_ast_fields(swot_content),
                 "word_count": len(swot_content.split()),
+                METRICS_FIELD: metrics,
                 "metadata.swot_data": swot_data,
                 "metadata.regenerated_at": datetime.utcnow().isoformat(),
                 "updated_at": datetime.utcnow()
-            }}
+            }},
+            projection=SECTION_METRICS_PROJECTION,
+            return_document=ReturnDocument.BEFORE
         )
+        if before:
+            await record_section_write(db, plan_id, before, {METRICS_FIELD: metrics})
     else:
-        await db.sections.insert_one({
+        new_section = {
             "plan_id": plan_id,
             "section_type": "swot_analysis",
             "title": "SWOT Analysis",
             "content": swot_content,
+            **content_ast_fields(swot_content),
             "word_count": len(swot_content.split()),
             "order_index": 10,
             "metadata": {
@@ -166,7 +147,12 @@ async def regenerate_swot(plan_id: str, user_id: str = Depends(get_current_user_
             },
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow()
-        })
+        }
+        new_section[METRICS_FIELD] = section_metrics(new_section)
+        await db.sections.insert_one(new_section)
+        await record_section_write(db, plan_id, None, new_section)
+    
+    await invalidate_plan_exports(db, plan_id)
     
     logger.info(f"SWOT analysis regenerated for plan {plan_id}")
     
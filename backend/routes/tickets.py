@@ -1,16 +1,22 @@
 """Support ticket routes - User and admin ticket management"""
 
-from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Header
 from pydantic import BaseModel, EmailStr
 from typing import Optional, List, Dict
 from datetime import datetime
 from enum import Enum
+import asyncio
 import logging
 from bson import ObjectId
 
 from utils.serializers import serialize_doc, to_object_id
 from utils.dependencies import get_db
+from utils.loaders import Loaders, get_loaders, user_summary
 from utils.admin import get_current_admin_user, get_current_user_id
+from utils.projections import resolve_view, view_query
+from utils.pagination import PageParams, full_page_params, legacy_page_params, paginate
+from utils.mail_outbox import SUPPORT_EMAIL, deliver_pending, enqueue_mail
+from utils.principal import get_principal_user
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -53,6 +59,7 @@ class TicketResponse(BaseModel):
 @router.post("/tickets")
 async def create_ticket(
     ticket_data: TicketCreate,
+    background_tasks: BackgroundTasks,
     user_id: str = Depends(get_current_user_id),
     db = Depends(get_db)
 ):
@@ -86,39 +93,52 @@ async def create_ticket(
     
     logger.info(f"Ticket created: {result.inserted_id} by user: {user_id}")
     
+    # Notify support (delivered after the response)
+    user = await get_principal_user(db, user_id) or {}
+    await enqueue_mail(
+        db,
+        to=SUPPORT_EMAIL,
+        subject=f"New ticket [{ticket_doc['priority']}]: {ticket_doc['subject']}",
+        body=f"{user.get('name', 'User')} <{user.get('email', '')}> opened ticket {result.inserted_id}:\n\n{ticket_doc['description']}",
+        reply_to=user.get("email") or None,
+        kind="ticket_created"
+    )
+    background_tasks.add_task(deliver_pending, db)
+    
     return serialize_doc(ticket_doc)
 
 @router.get("/tickets")
 async def list_user_tickets(
     user_id: str = Depends(get_current_user_id),
     db = Depends(get_db),
-    status: Optional[str] = None
+    loaders: Loaders = Depends(get_loaders),
+    status: Optional[str] = None,
+    view: str = view_query("full", "tickets"),
+    paging: PageParams = Depends(full_page_params)
 ):
-    """List tickets for the current user"""
+    """List tickets for the current user, newest first"""
     
+    projection = resolve_view("tickets", view)
     query = {"user_id": user_id}
     if status:
         query["status"] = status
     
-    tickets = await db.tickets.find(query).sort("created_at", -1).to_list(None)
+    page = await paginate(db.tickets, query, paging, projection=projection)
+    tickets = page.items
+    
+    # Assigned admins for all tickets in one query
+    admins = await loaders.users.load_many([t.get("assigned_to") for t in tickets])
     
     tickets_list = []
-    for ticket in tickets:
+    for ticket, admin in zip(tickets, admins):
         ticket_clean = serialize_doc(ticket)
-        # Get assigned admin name if assigned
-        if ticket.get("assigned_to"):
-            admin = await db.users.find_one({"_id": to_object_id(ticket["assigned_to"])})
-            if admin:
-                ticket_clean["assigned_admin"] = {
-                    "id": str(admin["_id"]),
-                    "name": admin.get("name", "Unknown"),
-                    "email": admin.get("email", "")
-                }
+        if admin:
+            ticket_clean["assigned_admin"] = user_summary(admin)
         tickets_list.append(ticket_clean)
     
     return {
         "tickets": tickets_list,
-        "total": len(tickets_list)
+        **page.meta()
     }
 
 @router.get("/tickets/{ticket_id}")
@@ -220,14 +240,17 @@ async def respond_to_ticket(
 async def list_all_tickets(
     admin_user = Depends(get_current_admin_user),
     db = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders),
     status: Optional[str] = None,
     assigned_to: Optional[str] = None,
     priority: Optional[str] = None,
-    skip: int = 0,
-    limit: int = 50
+    view: str = view_query("full", "tickets"),
+    paging: PageParams = Depends(legacy_page_params)
 ):
     """List all tickets (admin only)"""
     
+    projection = resolve_view("tickets", view)
+    
     logger.info(f"Admin tickets list requested by: {admin_user.get('email')}")
     
     query = {}
@@ -238,42 +261,28 @@ async def list_all_tickets(
     if priority:
         query["priority"] = priority
     
-    # Get total count
-    total = await db.tickets.count_documents(query)
+    page = await paginate(db.tickets, query, paging, projection=projection)
+    tickets = page.items
     
-    # Get tickets
-    tickets = await db.tickets.find(query).sort("created_at", -1).skip(skip).limit(limit).to_list(None)
+    # Ticket owners and assigned admins share one users query
+    users, admins = await asyncio.gather(
+        loaders.users.load_many([t.get("user_id") for t in tickets]),
+        loaders.users.load_many([t.get("assigned_to") for t in tickets])
+    )
     
     tickets_list = []
-    for ticket in tickets:
+    for ticket, user, admin in zip(tickets, users, admins):
         ticket_clean = serialize_doc(ticket)
-        
-        # Get user info
-        user = await db.users.find_one({"_id": to_object_id(ticket["user_id"])})
         if user:
-            ticket_clean["user"] = {
-                "id": str(user["_id"]),
-                "name": user.get("name", "Unknown"),
-                "email": user.get("email", "")
-            }
-        
-        # Get assigned admin info
-        if ticket.get("assigned_to"):
-            admin = await db.users.find_one({"_id": to_object_id(ticket["assigned_to"])})
-            if admin:
-                ticket_clean["assigned_admin"] = {
-                    "id": str(admin["_id"]),
-                    "name": admin.get("name", "Unknown"),
-                    "email": admin.get("email", "")
-                }
-        
+            ticket_clean["user"] = user_summary(user)
+        if admin:
+            ticket_clean["assigned_admin"] = user_summary(admin)
         tickets_list.append(ticket_clean)
     
     return {
         "tickets": tickets_list,
-        "total": total,
-        "skip": skip,
-        "limit": limit
+        "skip": paging.skip,
+        **page.meta()
     }
 
 @router.get("/admin/tickets/{ticket_id}")
@@ -368,6 +377,7 @@ async def update_ticket(
 async def respond_to_ticket_admin(
     ticket_id: str,
     response_data: TicketResponse,
+    background_tasks: BackgroundTasks,
     admin_user = Depends(get_current_admin_user),
     db = Depends(get_db)
 ):
@@ -412,4 +422,17 @@ async def respond_to_ticket_admin(
     
     logger.info(f"Admin response added to ticket {ticket_id} by {admin_user.get('email')}")
     
+    # Let the user know about replies they can see (delivered after the response)
+    if not response_data.is_internal:
+        owner = await get_principal_user(db, ticket["user_id"])
+        if owner and owner.get("email"):
+            await enqueue_mail(
+                db,
+                to=owner["email"],
+                subject=f"Re: {ticket.get('subject', 'Your support ticket')}",
+                body=f"{response_doc['message']}\n\n---\nReply from Strattio support on your ticket {ticket_id}.",
+                kind="ticket_response"
+            )
+            background_tasks.add_task(deliver_pending, db)
+    
     return {"message": "Response added successfully"}
@@ -3,10 +3,12 @@ from fastapi import FastAPI, APIRouter
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
 import os
 import logging
 from pathlib import Path
 from datetime import datetime
+from typing import Dict
 
 # Load environment variables BEFORE imports
 ROOT_DIR = Path(__file__).parent
@@ -53,7 +55,8 @@ else:
         db = None
 
 # Create the main app
-app = FastAPI(title="Strattio API", version="1.0.0")
+from utils.json_response import MongoJSONResponse
+app = FastAPI(title="Strattio API", version="1.0.0", default_response_class=MongoJSONResponse)
 
 # Set app state early (before routes are imported/registered)
 # This ensures db is available when dependencies are resolved
@@ -205,6 +208,14 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Per-request Mongo query counts, slow-query log and N+1 detection
+from utils.db_metrics import db_metrics_middleware
+app.middleware("http")(db_metrics_middleware)
+
+# Event loop lag sampling; names the route behind blocked-loop captures
+from utils.loop_monitor import loop_monitor_middleware
+app.middleware("http")(loop_monitor_middleware)
+
 # Include the router in the main app (AFTER middleware)
 app.include_router(api_router)
 
@@ -212,11 +223,18 @@ app.include_router(api_router)
 # LIFECYCLE EVENTS
 # ============================================================================
 
+# Long-running background loops started with the app, cancelled on shutdown
+# (the event loop only keeps weak references to tasks)
+_background_tasks: Dict[str, asyncio.Task] = {}
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize resources on startup"""
     logger.info("Strattio API starting up...")
     
+    from utils.loop_monitor import start_loop_monitor
+    start_loop_monitor()
+    
     if db is None:
         logger.warning("MongoDB not configured - database features will not work")
         logger.info("Strattio API ready (limited functionality)")
@@ -236,6 +254,14 @@ async def startup_event():
             
             # Create all database indexes
             await create_indexes(db)
+            
+            # Expire export artifacts nobody has used within the TTL (in the background)
+            from utils.export_storage import run_export_sweeper
+            _background_tasks["export_sweeper"] = asyncio.create_task(run_export_sweeper(db))
+            
+            # Deliver queued mail and retry failed sends (see utils/mail_outbox)
+            from utils.mail_outbox import run_mail_sender
+            _background_tasks["mail_sender"] = asyncio.create_task(run_mail_sender(db))
         
         logger.info("Strattio API ready!")
     except Exception as e:
@@ -248,6 +274,17 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("Strattio API shutting down...")
+    from utils.loop_monitor import stop_loop_monitor
+    stop_loop_monitor()
+    for task in _background_tasks.values():
+        task.cancel()
+    await asyncio.gather(*_background_tasks.values(), return_exceptions=True)
+    _background_tasks.clear()
+    try:
+        from utils.export_worker import shutdown_export_pool
+        shutdown_export_pool()
+    except ImportError:
+        pass
     if client is not None:
         client.close()
 # Backend deployment test - Root Directory fix
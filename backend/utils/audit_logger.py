@@ -5,8 +5,17 @@ from datetime import datetime
 import logging
 from bson import ObjectId
 
+from utils.pagination import Page, PageParams, paginate
+
 logger = logging.getLogger(__name__)
 
+
+def _stringify_ids(logs):
+    for log in logs:
+        log["_id"] = str(log["_id"])
+        log["entity_id"] = str(log.get("entity_id", ""))
+
+
 class AuditLogger:
     """Logs user activities and plan changes for audit trail"""
     
@@ -78,24 +87,22 @@ class AuditLogger:
     async def get_user_activities(
         db,
         user_id: str,
-        limit: int = 50,
-        skip: int = 0,
+        params: PageParams,
         activity_type: Optional[str] = None,
         entity_type: Optional[str] = None
-    ):
+    ) -> Page:
         """
-        Get activity logs for a user
+        Get activity logs for a user, newest first
         
         Args:
             db: MongoDB database instance
             user_id: ID of user
-            limit: Maximum number of logs to return
-            skip: Number of logs to skip
+            params: Page size and cursor (see utils/pagination)
             activity_type: Filter by activity type
             entity_type: Filter by entity type
             
         Returns:
-            List of activity log entries
+            Page of activity log entries
         """
         query = {"user_id": user_id}
         
@@ -105,46 +112,34 @@ class AuditLogger:
         if entity_type:
             query["entity_type"] = entity_type
         
-        cursor = db.audit_logs.find(query).sort("timestamp", -1).skip(skip).limit(limit)
-        logs = await cursor.to_list(limit)
-        
-        # Convert ObjectId to string
-        for log in logs:
-            log["_id"] = str(log["_id"])
-            log["entity_id"] = str(log.get("entity_id", ""))
-        
-        return logs
+        page = await paginate(db.audit_logs, query, params, sort_field="timestamp")
+        _stringify_ids(page.items)
+        return page
     
     @staticmethod
     async def get_entity_activities(
         db,
         entity_type: str,
         entity_id: str,
-        limit: int = 50
-    ):
+        params: PageParams
+    ) -> Page:
         """
-        Get activity logs for a specific entity
+        Get activity logs for a specific entity, newest first
         
         Args:
             db: MongoDB database instance
             entity_type: Type of entity
             entity_id: ID of entity
-            limit: Maximum number of logs to return
+            params: Page size and cursor (see utils/pagination)
             
         Returns:
-            List of activity log entries
+            Page of activity log entries
         """
         query = {
             "entity_type": entity_type,
             "entity_id": entity_id
         }
         
-        cursor = db.audit_logs.find(query).sort("timestamp", -1).limit(limit)
-        logs = await cursor.to_list(limit)
-        
-        # Convert ObjectId to string
-        for log in logs:
-            log["_id"] = str(log["_id"])
-            log["entity_id"] = str(log.get("entity_id", ""))
-        
-        return logs
+        page = await paginate(db.audit_logs, query, params, sort_field="timestamp")
+        _stringify_ids(page.items)
+        return page
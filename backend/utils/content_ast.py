@@ -0,0 +1,230 @@
+"""Section content AST - parse section text once, render it in every format
+
+Section content arrives as light HTML (from the rich-text editor) or as
+markdown-ish text (from the writer agent). parse_content turns either into a
+compact list of blocks that the PDF, DOCX, Markdown and pitch deck renderers
+all consume:
+
+    {"type": "heading", "level": 2, "spans": [...]}
+    {"type": "paragraph", "spans": [...]}          # "\n" inside spans = line break
+    {"type": "list", "ordered": False, "items": [[...spans], ...]}
+
+A span is {"text": str} plus "bold"/"italic": True when set.
+
+The AST is stored on the section document (content_ast / content_digest)
+whenever its content is written, so exports reuse it instead of parsing
+again; get_section_ast falls back to an in-process LRU for sections written
+before that.
+"""
+
+import hashlib
+import html
+import re
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Tuple
+
+AST_VERSION = 1
+
+# Fields written alongside section content; excluded from section API reads
+SECTION_AST_PROJECTION = {"content_ast": 0, "content_digest": 0}
+
+_CACHE_SIZE = 512
+_cache: "OrderedDict[str, List[Dict]]" = OrderedDict()
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*)$")
+_BULLET_RE = re.compile(r"^\s*(?:[-*•])\s+(.*)$")
+_ORDERED_RE = re.compile(r"^\s*\d+[.)]\s+(.*)$")
+_BLOCK_TAG_RE = re.compile(r"<(p|div|br|h[1-6]|ul|ol|li)[\s/>]", re.I)
+_HTML_TAG_RE = re.compile(r"</?[a-zA-Z][^>]*>")
+_INLINE_RE = re.compile(r"\*\*(.+?)\*\*|__(.+?)__|(?<![*\w])\*(?!\s)(.+?)(?<!\s)\*(?!\*)")
+
+
+def content_digest(content: str) -> str:
+    """Digest identifying a content revision (and the AST format it was parsed with)"""
+    return hashlib.sha1(f"{AST_VERSION}:{content}".encode("utf-8")).hexdigest()
+
+
+# ============================================================================
+# PARSING
+# ============================================================================
+
+def _expand_list(match) -> str:
+    """<ul>/<ol> -> "- item" / "1. item" lines"""
+    ordered = match.group(1).lower() == "ol"
+    items = re.findall(r"<li[^>]*>(.*?)</li>", match.group(2), flags=re.I | re.S)
+    lines = []
+    for number, item in enumerate(items, 1):
+        item = re.sub(r"</?(p|div)[^>]*>|<br\s*/?>", " ", item, flags=re.I).strip()
+        lines.append(f"{number}. {item}" if ordered else f"- {item}")
+    return "\n\n" + "\n".join(lines) + "\n\n"
+
+
+def _html_to_lines(content: str) -> str:
+    """Normalise editor HTML into the markdown-ish line form parsed below"""
+    text = content
+    if _BLOCK_TAG_RE.search(text):
+        # With block-level markup, source newlines are just whitespace
+        text = re.sub(r"\s*\n\s*", " ", text)
+
+    text = re.sub(r"<(ul|ol)[^>]*>(.*?)</\1>", _expand_list, text, flags=re.I | re.S)
+    text = re.sub(r"<br\s*/?>", "\n", text, flags=re.I)
+    text = re.sub(r"<h([1-6])[^>]*>", lambda m: "\n\n" + "#" * int(m.group(1)) + " ", text, flags=re.I)
+    text = re.sub(r"</h[1-6]>", "\n\n", text, flags=re.I)
+    text = re.sub(r"</?(p|div)(\s[^>]*)?>", "\n\n", text, flags=re.I)
+    text = re.sub(r"</?(strong|b)(\s[^>]*)?>", "**", text, flags=re.I)
+    text = re.sub(r"</?(em|i)(\s[^>]*)?>", "*", text, flags=re.I)
+    text = re.sub(r"<[^>]+>", "", text)
+    return html.unescape(text)
+
+
+def parse_inline(text: str) -> List[Dict]:
+    """Split text into spans on **bold**, __bold__ and *italic* markers"""
+    spans = []
+    pos = 0
+    for match in _INLINE_RE.finditer(text):
+        if match.start() > pos:
+            spans.append({"text": text[pos:match.start()]})
+        if match.group(3) is not None:
+            spans.append({"text": match.group(3), "italic": True})
+        else:
+            inner = match.group(1) or match.group(2)
+            # Allow *italic* inside a bold run
+            for span in parse_inline(inner):
+                span["bold"] = True
+                spans.append(span)
+        pos = match.end()
+    if pos < len(text):
+        spans.append({"text": text[pos:]})
+    return [span for span in spans if span["text"]]
+
+
+def _parse_blocks(text: str) -> List[Dict]:
+    blocks = []
+    paragraph: List[str] = []
+    list_block = None
+
+    def flush_paragraph():
+        nonlocal paragraph
+        if paragraph:
+            blocks.append({"type": "paragraph", "spans": parse_inline("\n".join(paragraph))})
+            paragraph = []
+
+    def flush_list():
+        nonlocal list_block
+        if list_block:
+            blocks.append(list_block)
+            list_block = None
+
+    for raw_line in text.split("\n"):
+        line = raw_line.strip()
+        if not line:
+            flush_paragraph()
+            flush_list()
+            continue
+
+        heading = _HEADING_RE.match(line)
+        bullet = _BULLET_RE.match(line)
+        ordered = _ORDERED_RE.match(line)
+
+        if heading:
+            flush_paragraph()
+            flush_list()
+            blocks.append({
+                "type": "heading",
+                "level": len(heading.group(1)),
+                "spans": parse_inline(heading.group(2).strip().rstrip("#").strip())
+            })
+        elif bullet or ordered:
+            flush_paragraph()
+            is_ordered = ordered is not None and bullet is None
+            if list_block is None or list_block["ordered"] != is_ordered:
+                flush_list()
+                list_block = {"type": "list", "ordered": is_ordered, "items": []}
+            list_block["items"].append(parse_inline((bullet or ordered).group(1).strip()))
+        else:
+            flush_list()
+            paragraph.append(line)
+
+    flush_paragraph()
+    flush_list()
+    return [block for block in blocks if block.get("spans") or block.get("items")]
+
+
+def parse_content(content: str) -> List[Dict]:
+    """Parse section content into AST blocks (memoised by content digest)"""
+    content = content or ""
+    digest = content_digest(content)
+    cached = _cache.get(digest)
+    if cached is not None:
+        _cache.move_to_end(digest)
+        return cached
+
+    text = _html_to_lines(content) if _HTML_TAG_RE.search(content) else content
+    blocks = _parse_blocks(text.replace("\r\n", "\n"))
+
+    _cache[digest] = blocks
+    if len(_cache) > _CACHE_SIZE:
+        _cache.popitem(last=False)
+    return blocks
+
+
+def content_ast_fields(content: str) -> Dict:
+    """Fields to $set next to a section's content so renderers never re-parse it"""
+    return {
+        "content_ast": parse_content(content),
+        "content_digest": content_digest(content or "")
+    }
+
+
+def get_section_ast(section: Dict) -> List[Dict]:
+    """AST for a section, using the stored one when it matches the content"""
+    content = section.get("content") or ""
+    stored = section.get("content_ast")
+    if stored is not None and section.get("content_digest") == content_digest(content):
+        return stored
+    return parse_content(content)
+
+
+# ============================================================================
+# HELPERS FOR RENDERERS
+# ============================================================================
+
+def spans_to_text(spans: List[Dict]) -> str:
+    return "".join(span["text"] for span in spans)
+
+
+def spans_to_markdown(spans: List[Dict]) -> str:
+    out = []
+    for span in spans:
+        text = span["text"]
+        if span.get("italic"):
+            text = f"*{text}*"
+        if span.get("bold"):
+            text = f"**{text}**"
+        out.append(text)
+    return "".join(out)
+
+
+def spans_to_reportlab(spans: List[Dict]) -> str:
+    """ReportLab Paragraph markup (<b>, <i>, <br/>) with text escaped"""
+    out = []
+    for span in spans:
+        text = html.escape(span["text"], quote=False).replace("\n", "<br/>")
+        if span.get("italic"):
+            text = f"<i>{text}</i>"
+        if span.get("bold"):
+            text = f"<b>{text}</b>"
+        out.append(text)
+    return "".join(out)
+
+
+def iter_text_lines(blocks: List[Dict]) -> Iterator[Tuple[str, bool]]:
+    """Flatten blocks to (plain text line, is_bullet) pairs for slide text frames"""
+    for block in blocks:
+        if block["type"] == "list":
+            for item in block["items"]:
+                yield spans_to_text(item), True
+        else:
+            for line in spans_to_text(block["spans"]).split("\n"):
+                if line.strip():
+                    yield line.strip(), False
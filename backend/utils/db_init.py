@@ -1,73 +1,275 @@
 """Database initialization and index creation for Strattio"""
 
+import asyncio
+import hashlib
+import json
 import logging
+import os
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from pymongo import IndexModel
+from pymongo.errors import OperationFailure
 
 logger = logging.getLogger(__name__)
 
-async def create_indexes(db):
-    """Create all necessary indexes for the Strattio database.
+# ============================================================================
+# INDEX MANIFEST
+# ============================================================================
+# Every index the application relies on, per collection. Each entry is
+# {"keys": [(field, direction), ...]} plus optional create_index options
+# (unique, sparse). Add new query patterns here; create_indexes diffs this
+# manifest against the live indexes on startup and builds what is missing.
+# Live indexes the manifest does not list (superseded prefixes, which cost a
+# write on every insert, but also indexes added by hand) are logged, and only
+# dropped with DB_DROP_UNLISTED_INDEXES=1. Paginated lists sort on (field, _id) (see
+# utils/pagination), so their indexes end in _id to serve the keyset range
+# and the sort together; the plain prefix index is then redundant.
+
+INDEX_MANIFEST: Dict[str, List[Dict]] = {
+    "users": [
+        {"keys": [("email", 1)], "unique": True},
+        {"keys": [("created_at", -1), ("_id", -1)]},
+    ],
+    "plans": [
+        {"keys": [("user_id", 1), ("created_at", -1), ("_id", -1)]},
+        {"keys": [("status", 1)]},
+    ],
+    "sections": [
+        {"keys": [("plan_id", 1), ("order_index", 1), ("_id", 1)]},
+        {"keys": [("section_type", 1)]},
+    ],
+    "subscriptions": [
+        {"keys": [("user_id", 1)], "unique": True},
+        {"keys": [("stripe_subscription_id", 1)], "sparse": True},
+    ],
+    "research_packs": [
+        {"keys": [("plan_id", 1)]},
+        {"keys": [("retrieved_at", -1)]},
+    ],
+    "financial_models": [
+        {"keys": [("plan_id", 1)]},
+    ],
+    "compliance_reports": [
+        {"keys": [("plan_id", 1)]},
+    ],
+    "exports": [
+        {"keys": [("user_id", 1), ("created_at", -1), ("_id", -1)]},
+        {"keys": [("plan_id", 1), ("cache_key", 1)]},
+        {"keys": [("storage_id", 1)]},
+    ],
+    # Export artifacts (GridFS bucket metadata)
+    "export_files.files": [
+        # Unique so concurrent uploads of the same bytes keep a single copy
+        {"keys": [("metadata.sha256", 1)], "unique": True},
+        {"keys": [("metadata.last_accessed", 1)]},
+        # Created by the GridFS driver for its own lookups
+        {"keys": [("filename", 1), ("uploadDate", 1)]},
+    ],
+    # PDF section fragments (incremental PDF exports)
+    "pdf_fragments": [
+        {"keys": [("key", 1), ("storage", 1)], "unique": True},
+        {"keys": [("storage_id", 1)]},
+    ],
+    "bulk_export_jobs": [
+        {"keys": [("user_id", 1), ("created_at", -1)]},
+    ],
+    "audit_logs": [
+        {"keys": [("user_id", 1), ("created_at", -1)]},
+        {"keys": [("plan_id", 1)]},
+        {"keys": [("action", 1)]},
+        # Activity feeds and stats filter by user/entity and sort on timestamp
+        {"keys": [("user_id", 1), ("timestamp", -1), ("_id", -1)]},
+        {"keys": [("entity_type", 1), ("entity_id", 1), ("timestamp", -1), ("_id", -1)]},
+    ],
+    "payment_transactions": [
+        {"keys": [("session_id", 1)], "unique": True},
+        {"keys": [("user_id", 1)]},
+        {"keys": [("created_at", -1)]},
+    ],
+    "companies": [
+        {"keys": [("user_id", 1), ("created_at", -1), ("_id", -1)]},
+        {"keys": [("user_id", 1), ("business_name", 1)]},
+    ],
+    # Sharing and collaboration
+    "plan_shares": [
+        {"keys": [("share_token", 1)], "unique": True},
+        {"keys": [("plan_id", 1), ("is_active", 1), ("created_at", -1), ("_id", -1)]},
+    ],
+    "plan_collaborators": [
+        {"keys": [("plan_id", 1), ("user_id", 1)]},
+        {"keys": [("user_id", 1)]},
+        {"keys": [("plan_id", 1), ("created_at", 1), ("_id", 1)]},
+    ],
+    "plan_comments": [
+        {"keys": [("plan_id", 1), ("section_id", 1), ("created_at", 1), ("_id", 1)]},
+        {"keys": [("plan_id", 1), ("created_at", 1), ("_id", 1)]},
+    ],
+    "plan_versions": [
+        {"keys": [("plan_id", 1), ("created_at", -1), ("_id", -1)]},
+        # Delta chains are read by version number range
+        {"keys": [("plan_id", 1), ("version_number", 1)]},
+    ],
+    "plan_chats": [
+        {"keys": [("plan_id", 1), ("user_id", 1), ("created_at", -1), ("_id", -1)]},
+    ],
+    # Plan artifacts
+    "pitch_decks": [
+        {"keys": [("plan_id", 1), ("user_id", 1), ("created_at", -1)]},
+    ],
+    "plan_scenarios": [
+        {"keys": [("plan_id", 1), ("created_at", -1)]},
+    ],
+    "swot_analyses": [
+        {"keys": [("plan_id", 1)]},
+    ],
+    "competitor_analyses": [
+        {"keys": [("plan_id", 1)]},
+    ],
+    "business_model_canvas": [
+        {"keys": [("plan_id", 1)]},
+    ],
+    # Support, gamification and mobile billing
+    "tickets": [
+        {"keys": [("user_id", 1), ("created_at", -1), ("_id", -1)]},
+        {"keys": [("status", 1), ("created_at", -1), ("_id", -1)]},
+        {"keys": [("created_at", -1), ("_id", -1)]},
+    ],
+    "user_achievements": [
+        {"keys": [("user_id", 1)]},
+    ],
+    "revenucat_user_mappings": [
+        {"keys": [("revenucat_user_id", 1)]},
+    ],
+    # Background mail delivery
+    "mail_outbox": [
+        {"keys": [("status", 1), ("next_attempt_at", 1)]},
+    ],
+}
+
+
+def _manifest_version() -> str:
+    """Digest of the manifest; changes whenever an index is added or altered"""
+    encoded = json.dumps(INDEX_MANIFEST, sort_keys=True)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+SCHEMA_VERSION = _manifest_version()
+
+
+def _index_options(spec: Dict) -> Dict:
+    return {k: v for k, v in spec.items() if k != "keys"}
+
+
+# create_index options compared against the live index (a change rebuilds it)
+COMPARED_OPTIONS = ("unique", "sparse")
+
+# Drop (rather than only log) live indexes of manifest collections that the manifest does not list
+DB_DROP_UNLISTED_INDEXES = os.environ.get("DB_DROP_UNLISTED_INDEXES", "0").lower() in ("1", "true", "yes")
+
+
+def _live_key(info: Dict) -> tuple:
+    return tuple((field, direction if isinstance(direction, str) else int(direction)) for field, direction in info["key"])
+
+
+async def _diff_indexes(db, collection: str, specs: List[Dict]) -> Tuple[List[Dict], List[Tuple[str, Dict]]]:
+    """Manifest entries with no live index on the same key pattern, and
+    (live index name, entry) pairs whose options differ from the entry"""
+    try:
+        existing = await db[collection].index_information()
+    except Exception:
+        # Collection does not exist yet
+        existing = {}
+    live = {_live_key(info): (name, info) for name, info in existing.items()}
+
+    missing, changed = [], []
+    for spec in specs:
+        name, info = live.get(tuple(spec["keys"]), (None, None))
+        if info is None:
+            missing.append(spec)
+        elif any(bool(info.get(option)) != bool(spec.get(option)) for option in COMPARED_OPTIONS):
+            changed.append((name, spec))
+    return missing, changed
+
+
+async def _rebuild_index(db, collection: str, old_name: str, spec: Dict) -> bool:
+    """Replace a live index whose options changed: the new index is built
+    under its own name before the old one is dropped. When the build fails
+    (e.g. a unique build over duplicates, or a server that refuses two
+    indexes on one key pattern) the old index stays and the mismatch is logged."""
+    try:
+        await db[collection].create_indexes([
+            IndexModel(spec["keys"], **{**_index_options(spec), "name": f"{old_name}_{SCHEMA_VERSION}"})
+        ])
+    except OperationFailure as e:
+        logger.warning(
+            f"Index {collection}.{old_name} does not match INDEX_MANIFEST {_index_options(spec)} "
+            f"and could not be rebuilt ({e}); keeping it"
+        )
+        return False
+    await db[collection].drop_index(old_name)
+    logger.info(f"Rebuilt index {collection}.{old_name} with {_index_options(spec)}")
+    return True
+
+
+async def _unlisted_indexes(db, collection: str, specs: List[Dict]) -> List[str]:
+    """Live indexes not in the manifest (never the _id index)"""
+    try:
+        existing = await db[collection].index_information()
+    except Exception:
+        return []
+    listed = {tuple(spec["keys"]) for spec in specs}
+    return [name for name, info in existing.items() if name != "_id_" and _live_key(info) not in listed]
+
+
+async def _sync_collection(db, collection: str, specs: List[Dict]) -> int:
+    missing, changed = await _diff_indexes(db, collection, specs)
+    if missing:
+        await db[collection].create_indexes([
+            IndexModel(spec["keys"], **_index_options(spec)) for spec in missing
+        ])
+        logger.info(f"✓ Created {len(missing)} indexes for '{collection}' collection")
+    rebuilt = [await _rebuild_index(db, collection, name, spec) for name, spec in changed]
+
+    # Only after the replacements exist, so queries never lose their index
+    for name in await _unlisted_indexes(db, collection, specs):
+        if DB_DROP_UNLISTED_INDEXES:
+            await db[collection].drop_index(name)
+            logger.info(f"Dropped index {collection}.{name} (not in INDEX_MANIFEST)")
+        else:
+            logger.warning(f"Index {collection}.{name} is not in INDEX_MANIFEST (DB_DROP_UNLISTED_INDEXES=1 drops it)")
+    return len(missing) + sum(rebuilt)
+
+
+async def create_indexes(db, force: bool = False):
+    """Bring the database indexes in line with INDEX_MANIFEST.
     
-    Based on Backend_Database_Documentation.md
+    Skips all work when schema_meta records the current SCHEMA_VERSION
+    (a warm database); otherwise diffs each collection against its live
+    indexes, builds only the missing ones and rebuilds those whose options
+    changed. Indexes the manifest does not list are logged (dropped with
+    DB_DROP_UNLISTED_INDEXES=1). Collections outside the manifest are not
+    touched.
     """
-    logger.info("Creating database indexes...")
-    
     try:
-        # Users Collection
-        await db.users.create_index("email", unique=True)
-        await db.users.create_index([("created_at", -1)])
-        logger.info("✓ Created indexes for 'users' collection")
-        
-        # Plans Collection
-        await db.plans.create_index([("user_id", 1), ("created_at", -1)])
-        await db.plans.create_index("status")
-        logger.info("✓ Created indexes for 'plans' collection")
-        
-        # Sections Collection
-        await db.sections.create_index([("plan_id", 1), ("order_index", 1)])
-        await db.sections.create_index("section_type")
-        logger.info("✓ Created indexes for 'sections' collection")
-        
-        # Subscriptions Collection
-        await db.subscriptions.create_index("user_id", unique=True)
-        await db.subscriptions.create_index("stripe_subscription_id", sparse=True)
-        logger.info("✓ Created indexes for 'subscriptions' collection")
-        
-        # Research Packs Collection
-        await db.research_packs.create_index("plan_id")
-        await db.research_packs.create_index([("retrieved_at", -1)])
-        logger.info("✓ Created indexes for 'research_packs' collection")
-        
-        # Financial Models Collection
-        await db.financial_models.create_index("plan_id")
-        logger.info("✓ Created indexes for 'financial_models' collection")
-        
-        # Compliance Reports Collection
-        await db.compliance_reports.create_index("plan_id")
-        logger.info("✓ Created indexes for 'compliance_reports' collection")
-        
-        # Exports Collection
-        await db.exports.create_index("plan_id")
-        await db.exports.create_index([("user_id", 1), ("created_at", -1)])
-        logger.info("✓ Created indexes for 'exports' collection")
-        
-        # Audit Logs Collection
-        await db.audit_logs.create_index([("user_id", 1), ("created_at", -1)])
-        await db.audit_logs.create_index("plan_id")
-        await db.audit_logs.create_index("action")
-        logger.info("✓ Created indexes for 'audit_logs' collection")
-        
-        # Payment Transactions Collection (for Stripe)
-        await db.payment_transactions.create_index("session_id", unique=True)
-        await db.payment_transactions.create_index("user_id")
-        await db.payment_transactions.create_index([("created_at", -1)])
-        logger.info("✓ Created indexes for 'payment_transactions' collection")
+        if not force:
+            meta = await db.schema_meta.find_one({"_id": "indexes"})
+            if meta and meta.get("version") == SCHEMA_VERSION:
+                logger.info(f"Database indexes up to date (schema {SCHEMA_VERSION})")
+                return True
         
-        # Companies Collection
-        await db.companies.create_index([("user_id", 1), ("created_at", -1)])
-        await db.companies.create_index([("user_id", 1), ("business_name", 1)])
-        logger.info("✓ Created indexes for 'companies' collection")
+        logger.info("Syncing database indexes...")
+        created = await asyncio.gather(*[
+            _sync_collection(db, collection, specs)
+            for collection, specs in INDEX_MANIFEST.items()
+        ])
         
-        logger.info("All database indexes created successfully!")
+        await db.schema_meta.update_one(
+            {"_id": "indexes"},
+            {"$set": {"version": SCHEMA_VERSION, "applied_at": datetime.utcnow()}},
+            upsert=True
+        )
+        logger.info(f"All database indexes in place ({sum(created)} created, schema {SCHEMA_VERSION})")
         return True
         
     except Exception as e:
@@ -0,0 +1,397 @@
+"""Database instrumentation - per-request query counts, slow queries and N+1 detection
+
+get_db hands routes an InstrumentedDatabase: a thin proxy over the Motor
+database that times every collection operation and records it against the
+current request (a contextvar set by db_metrics_middleware). For each request
+we keep the number of queries, total database time, collections and
+operation types touched, and the filter *shape* of each query (the keys and
+operators, never the values).
+
+- Queries slower than DB_SLOW_QUERY_MS are logged with their shape.
+- The same shape repeated DB_N_PLUS_ONE_THRESHOLD times in one request is
+  logged as a likely N+1 (a query issued inside a loop).
+- With DB_METRICS_HEADERS on (default outside production) the counts are
+  returned as X-DB-* response headers; per-route aggregates are always kept
+  and served by the admin db-stats endpoint.
+- Each route's distinct query shapes (collection, operation, filter shape and
+  cursor sort) are kept too and served by GET /admin/db-stats/shapes, so
+  audit_query_plans.py can explain the queries routes actually issue.
+"""
+
+import json
+import logging
+import os
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DB_METRICS_ENABLED = os.environ.get("DB_METRICS", "1").lower() not in ("0", "false", "no")
+DB_SLOW_QUERY_MS = float(os.environ.get("DB_SLOW_QUERY_MS", "100"))
+DB_N_PLUS_ONE_THRESHOLD = int(os.environ.get("DB_N_PLUS_ONE_THRESHOLD", "5"))
+# Distinct query shapes remembered per route
+DB_SHAPES_PER_ROUTE = int(os.environ.get("DB_SHAPES_PER_ROUTE", "100"))
+
+
+def _headers_default() -> str:
+    return "0" if os.environ.get("VERCEL_ENV") == "production" else "1"
+
+
+DB_METRICS_HEADERS = os.environ.get("DB_METRICS_HEADERS", _headers_default()).lower() in ("1", "true", "yes")
+
+# Collection methods that issue a round trip (find/aggregate return cursors, handled separately)
+_TIMED_METHODS = {
+    "find_one", "insert_one", "insert_many", "update_one", "update_many",
+    "replace_one", "delete_one", "delete_many", "count_documents",
+    "estimated_document_count", "distinct", "find_one_and_update",
+    "find_one_and_replace", "find_one_and_delete", "bulk_write",
+    "create_index", "create_indexes", "index_information"
+}
+_CURSOR_METHODS = {"find", "aggregate"}
+
+
+# ============================================================================
+# QUERY SHAPES
+# ============================================================================
+
+def query_shape(value: Any) -> Any:
+    """Structure of a filter/pipeline with every literal replaced by "?" """
+    if isinstance(value, dict):
+        return {key: query_shape(inner) for key, inner in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        # $in lists and pipelines: keep structure, not length
+        shapes = [query_shape(item) for item in value]
+        if all(shape == "?" for shape in shapes):
+            return ["?"] if shapes else []
+        return shapes
+    return "?"
+
+
+def sort_spec(args: tuple, kwargs: Dict) -> Optional[List]:
+    """Cursor.sort() arguments as [[field, direction], ...]"""
+    key = args[0] if args else kwargs.get("key_or_list")
+    if key is None:
+        return None
+    if isinstance(key, str):
+        direction = args[1] if len(args) > 1 else kwargs.get("direction", 1)
+        return [[key, direction]]
+    if isinstance(key, dict):
+        return [[field, direction] for field, direction in key.items()]
+    return [[field, direction] for field, direction in key]
+
+
+def _shape_key(collection: str, operation: str, shape: Any, sort: Optional[List] = None) -> str:
+    key = f"{collection}.{operation} {json.dumps(shape, sort_keys=True, default=str)}"
+    return f"{key} sort={json.dumps(sort)}" if sort else key
+
+
+# ============================================================================
+# PER-REQUEST STATS
+# ============================================================================
+
+class RequestQueryStats:
+    """Queries issued while serving one request"""
+
+    def __init__(self, route: str):
+        self.route = route
+        self.count = 0
+        self.total_ms = 0.0
+        self.collections: Counter = Counter()
+        self.operations: Counter = Counter()
+        self.shapes: Counter = Counter()
+        # Shape key -> (collection, operation, filter shape, sort)
+        self.shape_specs: Dict[str, tuple] = {}
+        self.closed = False
+
+    def record(self, collection: str, operation: str, shape: Any, duration_ms: float, sort: Optional[List] = None):
+        if self.closed:
+            # Background work spawned by the request outlives it
+            return
+        self.count += 1
+        self.total_ms += duration_ms
+        self.collections[collection] += 1
+        self.operations[operation] += 1
+        key = _shape_key(collection, operation, shape, sort)
+        self.shapes[key] += 1
+        self.shape_specs.setdefault(key, (collection, operation, shape, sort))
+
+    def n_plus_one(self) -> List[str]:
+        """Query shapes repeated often enough to suggest a query inside a loop"""
+        return [key for key, count in self.shapes.items() if count >= DB_N_PLUS_ONE_THRESHOLD]
+
+
+_current_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("db_query_stats", default=None)
+
+
+def _record(collection: str, operation: str, spec: Any, started: float, sort: Optional[List] = None):
+    duration_ms = (time.perf_counter() - started) * 1000
+    shape = query_shape(spec) if spec is not None else None
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(collection, operation, shape, duration_ms, sort)
+    if duration_ms >= DB_SLOW_QUERY_MS:
+        route = stats.route if stats else "background"
+        logger.warning(
+            f"Slow query {duration_ms:.0f}ms on {route}: {collection}.{operation} "
+            f"{json.dumps(shape, sort_keys=True, default=str)}"
+        )
+
+
+# ============================================================================
+# AGGREGATED STATS (served by GET /admin/db-stats)
+# ============================================================================
+
+class _RouteTotals:
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.db_ms = 0.0
+        self.max_queries = 0
+        self.n_plus_one = 0
+        self.collections: Counter = Counter()
+        self.operations: Counter = Counter()
+        # Shape key -> {"collection", "operation", "filter", "sort", "count"}
+        self.shapes: Dict[str, Dict] = {}
+
+
+_route_totals: Dict[str, _RouteTotals] = defaultdict(_RouteTotals)
+
+
+def finish_request(stats: RequestQueryStats):
+    """Fold a finished request into the per-route totals and log N+1 patterns"""
+    stats.closed = True
+    totals = _route_totals[stats.route]
+    totals.requests += 1
+    totals.queries += stats.count
+    totals.db_ms += stats.total_ms
+    totals.max_queries = max(totals.max_queries, stats.count)
+    totals.collections.update(stats.collections)
+    totals.operations.update(stats.operations)
+    for key, count in stats.shapes.items():
+        entry = totals.shapes.get(key)
+        if entry is None:
+            if len(totals.shapes) >= DB_SHAPES_PER_ROUTE:
+                continue
+            collection, operation, shape, sort = stats.shape_specs[key]
+            entry = totals.shapes[key] = {
+                "collection": collection, "operation": operation, "filter": shape, "sort": sort, "count": 0
+            }
+        entry["count"] += count
+
+    repeated = stats.n_plus_one()
+    if repeated:
+        totals.n_plus_one += 1
+        for key in repeated:
+            logger.warning(f"Possible N+1 on {stats.route}: {stats.shapes[key]}x {key}")
+
+
+def get_db_stats(limit: int = 50) -> List[Dict]:
+    """Routes ordered by total database time"""
+    rows = []
+    for route, totals in _route_totals.items():
+        rows.append({
+            "route": route,
+            "requests": totals.requests,
+            "queries": totals.queries,
+            "avg_queries": round(totals.queries / totals.requests, 2) if totals.requests else 0,
+            "max_queries": totals.max_queries,
+            "db_ms": round(totals.db_ms, 1),
+            "avg_db_ms": round(totals.db_ms / totals.requests, 2) if totals.requests else 0,
+            "n_plus_one_requests": totals.n_plus_one,
+            "collections": dict(totals.collections.most_common(10)),
+            "operations": dict(totals.operations)
+        })
+    rows.sort(key=lambda row: row["db_ms"], reverse=True)
+    return rows[:limit]
+
+
+def get_query_shapes() -> List[Dict]:
+    """Every distinct query shape seen, with the route that issued it"""
+    return [
+        {"route": route, **entry}
+        for route, totals in sorted(_route_totals.items())
+        for entry in totals.shapes.values()
+    ]
+
+
+def reset_db_stats():
+    _route_totals.clear()
+
+
+# ============================================================================
+# PROXIES
+# ============================================================================
+
+class InstrumentedCursor:
+    """Wraps a Motor cursor; the round trips happen in to_list / iteration"""
+
+    def __init__(self, cursor, collection: str, operation: str, spec: Any):
+        self._cursor = cursor
+        self._collection = collection
+        self._operation = operation
+        self._spec = spec
+        self._sort: Optional[List] = None
+        self._iterator = None
+        self._iter_started: Optional[float] = None
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        if not callable(attr):
+            return attr
+
+        def chained(*args, **kwargs):
+            if name == "sort":
+                self._sort = sort_spec(args, kwargs)
+            result = attr(*args, **kwargs)
+            # sort/skip/limit/... return the cursor itself; keep it wrapped
+            return self if result is self._cursor else result
+        return chained
+
+    async def to_list(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await self._cursor.to_list(*args, **kwargs)
+        finally:
+            _record(self._collection, self._operation, self._spec, started, self._sort)
+
+    def __aiter__(self):
+        self._iterator = self._cursor.__aiter__()
+        self._iter_started = time.perf_counter()
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self._iterator.__anext__()
+        except StopAsyncIteration:
+            if self._iter_started is not None:
+                _record(self._collection, self._operation, self._spec, self._iter_started, self._sort)
+                self._iter_started = None
+            raise
+
+
+class InstrumentedCollection:
+    """Times every operation on a Motor collection"""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self._name = collection.name
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+
+        if name in _CURSOR_METHODS:
+            def open_cursor(*args, **kwargs):
+                spec = args[0] if args else kwargs.get("filter", kwargs.get("pipeline"))
+                if name == "aggregate" and spec is not None:
+                    # Pipelines are identified by their stage operators
+                    spec = [next(iter(stage), "?") for stage in spec]
+                return InstrumentedCursor(attr(*args, **kwargs), self._name, name, spec)
+            return open_cursor
+
+        if name in _TIMED_METHODS:
+            async def timed(*args, **kwargs):
+                spec = args[0] if args and isinstance(args[0], dict) else kwargs.get("filter")
+                started = time.perf_counter()
+                try:
+                    return await attr(*args, **kwargs)
+                finally:
+                    _record(self._name, name, spec, started)
+            return timed
+
+        return attr
+
+    def __getitem__(self, name):
+        # Sub-collections such as "export_files.files"
+        return InstrumentedCollection(self._collection[name])
+
+
+class InstrumentedDatabase:
+    """Motor database proxy handing out instrumented collections"""
+
+    def __init__(self, db):
+        self._db = db
+        self._collections: Dict[str, InstrumentedCollection] = {}
+
+    @property
+    def raw(self):
+        """The underlying Motor database (for APIs such as GridFS that need the real handle)"""
+        return self._db
+
+    def _collection(self, name: str) -> InstrumentedCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = InstrumentedCollection(self._db[name])
+        return collection
+
+    def __getitem__(self, name: str) -> InstrumentedCollection:
+        return self._collection(name)
+
+    def get_collection(self, name: str, **kwargs):
+        if kwargs:
+            return InstrumentedCollection(self._db.get_collection(name, **kwargs))
+        return self._collection(name)
+
+    async def command(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await self._db.command(*args, **kwargs)
+        finally:
+            _record("$cmd", "command", None, started)
+
+    def __getattr__(self, name):
+        # Database methods and properties (client, list_collection_names, ...) pass
+        # through; any other attribute is a collection, as on the Motor database
+        if name.startswith("_") or hasattr(type(self._db), name):
+            return getattr(self._db, name)
+        return self._collection(name)
+
+
+def instrument_database(db):
+    """Wrap a Motor database for query metrics (no-op when disabled or already wrapped)"""
+    if db is None or not DB_METRICS_ENABLED or isinstance(db, InstrumentedDatabase):
+        return db
+    return InstrumentedDatabase(db)
+
+
+def raw_database(db):
+    """Unwrap an instrumented database handle"""
+    return db.raw if isinstance(db, InstrumentedDatabase) else db
+
+
+# ============================================================================
+# MIDDLEWARE
+# ============================================================================
+
+def route_name(request) -> str:
+    route = request.scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return f"{request.method} {route.path}"
+    return f"{request.method} {request.url.path}"
+
+
+async def db_metrics_middleware(request, call_next):
+    """Collect query stats for one request (register with app.middleware("http"))"""
+    if not DB_METRICS_ENABLED:
+        return await call_next(request)
+
+    stats = RequestQueryStats(f"{request.method} {request.url.path}")
+    token = _current_stats.set(stats)
+    try:
+        response = await call_next(request)
+    finally:
+        _current_stats.reset(token)
+        # The router has resolved the route by now; aggregate by its template
+        stats.route = route_name(request)
+        finish_request(stats)
+
+    if DB_METRICS_HEADERS:
+        response.headers["X-DB-Query-Count"] = str(stats.count)
+        response.headers["X-DB-Query-Time-Ms"] = f"{stats.total_ms:.1f}"
+        if stats.collections:
+            response.headers["X-DB-Collections"] = ",".join(sorted(stats.collections))
+        repeated = stats.n_plus_one()
+        if repeated:
+            response.headers["X-DB-N-Plus-One"] = str(len(repeated))
+    return response
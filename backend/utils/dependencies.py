@@ -6,6 +6,8 @@ from fastapi import Request, HTTPException
 from typing import Optional
 import logging
 
+from utils.db_metrics import instrument_database
+
 logger = logging.getLogger(__name__)
 
 
@@ -13,6 +15,8 @@ def get_db(request: Request):
     """
     Dependency to get database from app state.
     Use this in route functions: db = Depends(get_db)
+    
+    The handle is wrapped for per-request query metrics (see utils/db_metrics).
     """
     # Get db from app state (use getattr to avoid AttributeError)
     db = getattr(request.app.state, 'db', None)
@@ -21,7 +25,12 @@ def get_db(request: Request):
             status_code=503,
             detail="Database not available. Please check MongoDB configuration."
         )
-    return db
+    
+    instrumented = getattr(request.app.state, 'instrumented_db', None)
+    if instrumented is None or getattr(instrumented, 'raw', instrumented) is not db:
+        instrumented = instrument_database(db)
+        request.app.state.instrumented_db = instrumented
+    return instrumented
 
 
 def get_logger(request: Request):
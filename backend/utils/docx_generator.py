@@ -6,35 +6,35 @@ from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.oxml.ns import qn
 from docx.oxml import OxmlElement
 from datetime import datetime
-import os
-import re
+from io import BytesIO
 import logging
-from pathlib import Path
+
+from utils.content_ast import get_section_ast
 
 logger = logging.getLogger(__name__)
 
-# Use /tmp for exports in Vercel (writable), or local exports directory for development
-# Vercel serverless functions have a read-only filesystem except for /tmp
-# Vercel automatically sets VERCEL=1 environment variable
-def get_exports_dir():
-    """Get the exports directory path, using /tmp in Vercel"""
-    if os.environ.get("VERCEL") or os.environ.get("VERCEL_ENV"):
-        return Path("/tmp/exports")
-    else:
-        BACKEND_DIR = Path(__file__).parent.parent
-        return BACKEND_DIR / "exports"
+def _add_spans(paragraph, spans):
+    """Add AST spans to a paragraph as formatted runs"""
+    for span in spans:
+        run = paragraph.add_run(span['text'])
+        run.bold = span.get('bold', False)
+        run.italic = span.get('italic', False)
 
-# Create exports directory lazily (only when needed, not at import time)
-def ensure_exports_dir():
-    """Ensure exports directory exists"""
-    exports_dir = get_exports_dir()
-    try:
-        exports_dir.mkdir(exist_ok=True, parents=True)
-    except (OSError, PermissionError):
-        # If we can't create the directory, try /tmp as fallback
-        exports_dir = Path("/tmp/exports")
-        exports_dir.mkdir(exist_ok=True, parents=True)
-    return exports_dir
+def append_blocks(doc, blocks):
+    """Append content AST blocks to a python-docx Document"""
+    for block in blocks:
+        if block['type'] == 'heading':
+            # Section titles use level 1; content headings nest below them
+            heading = doc.add_heading(level=min(block.get('level', 2) + 1, 4))
+            _add_spans(heading, block['spans'])
+        elif block['type'] == 'list':
+            style = 'List Number' if block.get('ordered') else 'List Bullet'
+            for item in block['items']:
+                _add_spans(doc.add_paragraph(style=style), item)
+        else:
+            para = doc.add_paragraph()
+            _add_spans(para, block['spans'])
+            para.paragraph_format.space_after = Pt(12)
 
 def generate_business_plan_docx(plan_data, sections_data, financial_data=None):
     """
@@ -46,17 +46,9 @@ def generate_business_plan_docx(plan_data, sections_data, financial_data=None):
         financial_data: Financial model data (optional)
     
     Returns:
-        str: Path to generated DOCX file
+        bytes: The rendered DOCX
     """
     
-    # Ensure exports directory exists and get path
-    exports_dir = ensure_exports_dir()
-    
-    # Generate filename
-    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    filename = f"business_plan_{plan_data.get('id', 'unknown')}_{timestamp}.docx"
-    filepath = exports_dir / filename
-    
     # Create document
     doc = Document()
     
@@ -105,28 +97,13 @@ def generate_business_plan_docx(plan_data, sections_data, financial_data=None):
         # Section heading
         heading = doc.add_heading(f"{idx + 1}. {section.get('title', 'Section')}", level=1)
         
-        # Section content
-        content = section.get('content', '')
-        
-        if not content or content.strip() == "":
-            content = f"[{section.get('title')} content to be added]"
-        
-        # Convert HTML to plain text and format
-        # Remove HTML tags
-        content = re.sub(r'<[^>]+>', '', content)
-        # Convert markdown-style formatting
-        content = re.sub(r'\*\*([^*]+)\*\*', r'\1', content)  # Remove bold markers
-        content = re.sub(r'\*([^*]+)\*', r'\1', content)  # Remove italic markers
+        # Section content (parsed once per revision, see utils/content_ast)
+        blocks = get_section_ast(section)
         
-        # Split into paragraphs
-        paragraphs = content.split('\n\n')
-        if not paragraphs:
-            paragraphs = content.split('\n')
+        if not blocks:
+            blocks = [{"type": "paragraph", "spans": [{"text": f"[{section.get('title')} content to be added]"}]}]
         
-        for para_text in paragraphs:
-            if para_text.strip():
-                para = doc.add_paragraph(para_text.strip())
-                para.paragraph_format.space_after = Pt(12)
+        append_blocks(doc, blocks)
         
         # Add spacing after section
         doc.add_paragraph()
@@ -190,8 +167,9 @@ def generate_business_plan_docx(plan_data, sections_data, financial_data=None):
             for i, year in enumerate(pnl[:5], 1):
                 row.cells[i].text = f"£{year.get('net_profit', 0):,.0f}"
     
-    # Save document
-    doc.save(str(filepath))
+    # Save document into memory
+    buffer = BytesIO()
+    doc.save(buffer)
     
-    logger.info(f"Generated DOCX: {filepath}")
-    return str(filepath)
+    logger.info(f"Generated DOCX for plan {plan_data.get('id', 'unknown')} ({buffer.tell()} bytes)")
+    return buffer.getvalue()
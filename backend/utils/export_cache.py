@@ -0,0 +1,82 @@
+"""Export artifact cache - reuse a rendered export while its plan is unchanged
+
+Each export is stored with a cache_key: a SHA-256 over everything that shapes
+the rendered document (plan metadata, ordered section contents, financial
+model version, format and renderer version). A new request with the same key
+returns the existing artifact instead of rendering again.
+"""
+
+import hashlib
+import json
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from utils.export_worker import RENDERER_VERSION
+
+logger = logging.getLogger(__name__)
+
+# "md" and "markdown" produce the same artifact
+FORMAT_ALIASES = {"md": "markdown"}
+
+
+def _financial_model_version(financial_model: Optional[Dict]) -> Optional[str]:
+    """Identify a financial model revision (a regenerated model is a new document)"""
+    if not financial_model:
+        return None
+    changed_at = financial_model.get("updated_at") or financial_model.get("created_at")
+    return f"{financial_model.get('_id') or financial_model.get('id')}:{changed_at}"
+
+
+def compute_export_key(plan: Dict, sections: List[Dict], financial_model: Optional[Dict], format: str) -> str:
+    """Content hash identifying the artifact a render would produce"""
+    ordered_sections = sorted(sections, key=lambda s: s.get("order_index", 999))
+    payload = {
+        "plan": {
+            "id": str(plan.get("_id") or plan.get("id")),
+            "name": plan.get("name"),
+            "plan_purpose": plan.get("plan_purpose")
+        },
+        "sections": [
+            [s.get("title"), s.get("content"), s.get("order_index")]
+            for s in ordered_sections
+        ],
+        "financial_model": _financial_model_version(financial_model),
+        "format": FORMAT_ALIASES.get(format, format),
+        "renderer": RENDERER_VERSION
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+async def find_cached_export(db, storage, plan_id: str, cache_key: str) -> Optional[Dict]:
+    """Most recent complete export with this key whose artifact is still in storage"""
+    export = await db.exports.find_one(
+        {"plan_id": plan_id, "cache_key": cache_key, "status": "complete", "storage": storage.name},
+        {"content": 0},
+        sort=[("created_at", -1)]
+    )
+    if not export:
+        return None
+
+    # Reusing an artifact postpones its expiry
+    if not await storage.touch(export["storage_id"]):
+        return None
+
+    return export
+
+
+async def invalidate_plan_exports(db, plan_id: str):
+    """Drop cache entries for a plan after its sections, metadata or model change"""
+    try:
+        result = await db.exports.update_many(
+            {"plan_id": plan_id, "cache_key": {"$ne": None}},
+            {
+                "$set": {"cache_key": None, "cache_invalidated_at": datetime.utcnow()}
+            }
+        )
+        if result.modified_count:
+            logger.info(f"Invalidated {result.modified_count} cached exports for plan {plan_id}")
+    except Exception as e:
+        # The content hash still changes with the plan, so a missed invalidation is not fatal
+        logger.warning(f"Failed to invalidate export cache for plan {plan_id}: {e}")
@@ -0,0 +1,285 @@
+"""Export storage - pluggable backends for rendered export artifacts
+
+GridFS is the default so any API instance can serve any download. A local
+directory backend is available for development (EXPORT_STORAGE=local).
+
+Artifacts are content-addressed: identical bytes are stored once and shared
+by every export that produced them (GridFS enforces it with a unique index on
+metadata.sha256). Each artifact records when it was last used;
+sweep_expired_exports removes artifacts unused for EXPORT_TTL_DAYS and marks
+the exports that pointed at them as expired. run_export_sweeper runs it every
+EXPORT_SWEEP_INTERVAL; a lease in `job_leases` makes that once per interval
+across all workers, so serverless cold starts do not each run a full sweep.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+GRIDFS_BUCKET = "export_files"
+CHUNK_SIZE = 255 * 1024  # GridFS default chunk size
+
+EXPORT_TTL_DAYS = int(os.environ.get("EXPORT_TTL_DAYS", "30"))
+# How often the TTL sweep runs, fleet-wide (seconds)
+EXPORT_SWEEP_INTERVAL = float(os.environ.get("EXPORT_SWEEP_INTERVAL", str(6 * 3600)))
+
+# Shared lease record: one sweep per interval however many workers start
+SWEEP_LEASE_ID = "export_sweep"
+
+
+class StoredFileNotFound(Exception):
+    """The artifact was expired or removed from storage"""
+
+
+def get_exports_dir() -> Path:
+    """Local export directory, using /tmp on Vercel (read-only filesystem elsewhere)"""
+    if os.environ.get("VERCEL") or os.environ.get("VERCEL_ENV"):
+        return Path("/tmp/exports")
+    return Path(__file__).parent.parent / "exports"
+
+
+class ExportStorage:
+    """Interface shared by all storage backends"""
+
+    name = "base"
+
+    async def put(self, data: bytes, filename: str, content_type: str) -> Dict:
+        """Store an artifact, reusing an identical one. Returns {storage_id, sha256, size}."""
+        raise NotImplementedError
+
+    async def stream(self, storage_id: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Yield bytes start..end (inclusive) in chunks"""
+        raise NotImplementedError
+        yield b""  # pragma: no cover
+
+    async def touch(self, storage_id: str) -> bool:
+        """Record that an artifact was used, postponing its expiry. False if it is gone."""
+        raise NotImplementedError
+
+    async def delete_unused_since(self, cutoff: datetime) -> list:
+        """Delete artifacts last used before `cutoff`. Returns their storage ids."""
+        raise NotImplementedError
+
+
+class GridFSExportStorage(ExportStorage):
+    """Artifacts in a GridFS bucket, deduplicated by metadata.sha256"""
+
+    name = "gridfs"
+
+    def __init__(self, db):
+        from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+        from utils.db_metrics import raw_database
+
+        # GridFS needs the Motor database itself, not the metrics proxy
+        db = raw_database(db)
+        self.db = db
+        self.files = db[f"{GRIDFS_BUCKET}.files"]
+        self.bucket = AsyncIOMotorGridFSBucket(db, bucket_name=GRIDFS_BUCKET, chunk_size_bytes=CHUNK_SIZE)
+
+    async def _reuse(self, digest: str) -> Optional[Dict]:
+        existing = await self.files.find_one_and_update(
+            {"metadata.sha256": digest},
+            {"$set": {"metadata.last_accessed": datetime.utcnow()}},
+            projection={"_id": 1, "length": 1}
+        )
+        if existing:
+            return {"storage_id": str(existing["_id"]), "sha256": digest, "size": existing["length"]}
+        return None
+
+    async def put(self, data: bytes, filename: str, content_type: str) -> Dict:
+        from pymongo.errors import DuplicateKeyError
+
+        digest = hashlib.sha256(data).hexdigest()
+        stored = await self._reuse(digest)
+        if stored:
+            return stored
+
+        grid_in = self.bucket.open_upload_stream(
+            filename,
+            metadata={"sha256": digest, "content_type": content_type, "last_accessed": datetime.utcnow()}
+        )
+        view = memoryview(data)
+        for offset in range(0, len(data), CHUNK_SIZE):
+            await grid_in.write(bytes(view[offset:offset + CHUNK_SIZE]))
+        try:
+            await grid_in.close()
+        except DuplicateKeyError:
+            # A concurrent put stored the same bytes first (metadata.sha256 is
+            # unique): drop our chunks and share its artifact
+            await self.db[f"{GRIDFS_BUCKET}.chunks"].delete_many({"files_id": grid_in._id})
+            stored = await self._reuse(digest)
+            if stored:
+                return stored
+            raise
+
+        return {"storage_id": str(grid_in._id), "sha256": digest, "size": len(data)}
+
+    async def stream(self, storage_id: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        from bson import ObjectId
+        from gridfs.errors import NoFile
+
+        try:
+            grid_out = await self.bucket.open_download_stream(ObjectId(storage_id))
+        except NoFile:
+            raise StoredFileNotFound(storage_id)
+
+        stop = grid_out.length if end is None else end + 1
+        grid_out.seek(start)
+        remaining = stop - start
+        while remaining > 0:
+            chunk = await grid_out.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+    async def touch(self, storage_id: str) -> bool:
+        from bson import ObjectId
+
+        result = await self.files.update_one(
+            {"_id": ObjectId(storage_id)},
+            {"$set": {"metadata.last_accessed": datetime.utcnow()}}
+        )
+        return result.matched_count > 0
+
+    async def delete_unused_since(self, cutoff: datetime) -> list:
+        deleted = []
+        async for file_doc in self.files.find({"metadata.last_accessed": {"$lt": cutoff}}, {"_id": 1}):
+            await self.bucket.delete(file_doc["_id"])
+            deleted.append(str(file_doc["_id"]))
+        return deleted
+
+
+class LocalExportStorage(ExportStorage):
+    """Artifacts as <sha256> files in a local directory; mtime is the last-used time"""
+
+    name = "local"
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = root or get_exports_dir()
+
+    def _path(self, storage_id: str) -> Path:
+        return self.root / storage_id
+
+    async def put(self, data: bytes, filename: str, content_type: str) -> Dict:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+
+        def _write():
+            self.root.mkdir(parents=True, exist_ok=True)
+            if path.exists():
+                os.utime(path)
+                return
+            tmp_path = path.with_suffix(".part")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        await asyncio.to_thread(_write)
+        return {"storage_id": digest, "sha256": digest, "size": len(data)}
+
+    async def stream(self, storage_id: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        path = self._path(storage_id)
+        try:
+            f = await asyncio.to_thread(open, path, "rb")
+        except FileNotFoundError:
+            raise StoredFileNotFound(storage_id)
+
+        try:
+            size = os.fstat(f.fileno()).st_size
+            stop = size if end is None else end + 1
+            f.seek(start)
+            remaining = stop - start
+            while remaining > 0:
+                chunk = await asyncio.to_thread(f.read, min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            f.close()
+
+    async def touch(self, storage_id: str) -> bool:
+        try:
+            await asyncio.to_thread(os.utime, self._path(storage_id))
+            return True
+        except FileNotFoundError:
+            return False
+
+    async def delete_unused_since(self, cutoff: datetime) -> list:
+        def _sweep():
+            deleted = []
+            if not self.root.exists():
+                return deleted
+            cutoff_ts = (cutoff - datetime(1970, 1, 1)).total_seconds()
+            for path in self.root.iterdir():
+                if path.is_file() and path.stat().st_mtime < cutoff_ts:
+                    path.unlink(missing_ok=True)
+                    deleted.append(path.name)
+            return deleted
+
+        return await asyncio.to_thread(_sweep)
+
+
+def get_export_storage(db) -> ExportStorage:
+    """Storage backend selected by EXPORT_STORAGE (gridfs or local)"""
+    backend = os.environ.get("EXPORT_STORAGE", "gridfs").lower()
+    if backend == "local":
+        return LocalExportStorage()
+    return GridFSExportStorage(db)
+
+
+async def sweep_expired_exports(db, ttl_days: int = EXPORT_TTL_DAYS) -> int:
+    """Delete artifacts unused for `ttl_days` and mark their exports expired"""
+    storage = get_export_storage(db)
+    cutoff = datetime.utcnow() - timedelta(days=ttl_days)
+
+    try:
+        deleted = await storage.delete_unused_since(cutoff)
+        if deleted:
+            await db.exports.update_many(
+                {"storage_id": {"$in": deleted}},
+                {"$set": {"status": "expired", "cache_key": None, "expired_at": datetime.utcnow()}}
+            )
+            await db.pdf_fragments.delete_many({"storage_id": {"$in": deleted}})
+            logger.info(f"Expired {len(deleted)} export artifacts from {storage.name} storage")
+        return len(deleted)
+    except Exception as e:
+        logger.error(f"Export storage sweep failed: {e}")
+        return 0
+
+
+async def _claim_sweep(db, interval: float) -> bool:
+    """Take the fleet-wide sweep lease if the last sweep is `interval` old"""
+    from pymongo.errors import DuplicateKeyError
+
+    now = datetime.utcnow()
+    try:
+        await db.job_leases.update_one(
+            {"_id": SWEEP_LEASE_ID, "next_run_at": {"$lte": now}},
+            {"$set": {"next_run_at": now + timedelta(seconds=interval), "claimed_at": now}},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        # The lease exists and is not due: another worker swept recently
+        return False
+
+
+async def run_export_sweeper(db, interval: float = EXPORT_SWEEP_INTERVAL):
+    """Background loop: sweep expired artifacts once per `interval`, fleet-wide"""
+    while True:
+        try:
+            if await _claim_sweep(db, interval):
+                await sweep_expired_exports(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Export sweeper pass failed: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,141 @@
+"""Export worker pool - renders PDF/DOCX/Markdown exports off the event loop
+
+reportlab and python-docx are CPU-bound and hold the GIL, so renders run in a
+bounded process pool. Workers are started with the "spawn" method (forking a
+process that owns a running event loop and Motor's background threads is not
+safe) and warmed on start-up: renderer modules are imported and the PDF
+styles and DOCX default template are loaded once per worker.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ["pdf", "docx", "markdown", "md"]
+
+# Bump whenever renderer output changes so cached exports are not reused
+RENDERER_VERSION = "4"
+
+MEDIA_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "markdown": "text/markdown; charset=utf-8",
+    "md": "text/markdown; charset=utf-8"
+}
+
+FILE_EXTENSIONS = {"pdf": "pdf", "docx": "docx", "markdown": "md", "md": "md"}
+
+_executor: Optional[Executor] = None
+
+
+def get_worker_count() -> int:
+    """Pool size from EXPORT_WORKERS, defaulting to the number of cores (max 4)"""
+    configured = os.environ.get("EXPORT_WORKERS")
+    if configured:
+        return max(1, int(configured))
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+def _warm_worker():
+    """Pool initializer: import renderers and build reusable styles once"""
+    try:
+        from utils.pdf_generator import get_pdf_styles
+        from utils.docx_generator import generate_business_plan_docx  # noqa: F401
+        from utils.markdown_generator import generate_business_plan_markdown  # noqa: F401
+        from docx import Document
+
+        get_pdf_styles()
+        Document()
+    except Exception as e:
+        # A cold worker still renders correctly, just slower on its first job
+        logger.warning(f"Export worker warm-up failed: {e}")
+
+
+def export_file_name(plan_id: str, format: str) -> str:
+    """Download file name for an export rendered now"""
+    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    return f"business_plan_{plan_id}_{timestamp}.{FILE_EXTENSIONS.get(format, format)}"
+
+
+def render_export(format: str, plan_data: Dict, sections_data: List[Dict], financial_data: Optional[Dict] = None) -> bytes:
+    """Render one export in the worker process. Returns the document bytes."""
+    if format == "pdf":
+        from utils.pdf_generator import generate_business_plan_pdf
+        return generate_business_plan_pdf(plan_data, sections_data, financial_data)
+    if format == "docx":
+        from utils.docx_generator import generate_business_plan_docx
+        return generate_business_plan_docx(plan_data, sections_data, financial_data)
+    if format in ["markdown", "md"]:
+        from utils.markdown_generator import generate_business_plan_markdown
+        return generate_business_plan_markdown(plan_data, sections_data, financial_data)
+    raise ValueError(f"Unsupported format: {format}")
+
+
+def render_pdf_incremental(
+    plan_data: Dict,
+    sections_data: List[Dict],
+    financial_data: Optional[Dict],
+    cached_fragments: Dict[str, bytes]
+) -> Tuple[bytes, Dict[str, bytes]]:
+    """Assemble a PDF from cached fragments in the worker process (see utils/pdf_fragments)"""
+    from utils.pdf_fragments import build_pdf_incremental
+    return build_pdf_incremental(plan_data, sections_data, financial_data, cached_fragments)
+
+
+def get_export_executor() -> Executor:
+    """Return the shared export pool, creating it on first use"""
+    global _executor
+    if _executor is None:
+        workers = get_worker_count()
+        try:
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_worker
+            )
+            logger.info(f"Export process pool started with {workers} workers")
+        except (OSError, NotImplementedError) as e:
+            # Some serverless runtimes have no /dev/shm for process semaphores;
+            # a thread pool still keeps the render off the event loop
+            logger.warning(f"Process pool unavailable ({e}), using threads for exports")
+            _executor = ThreadPoolExecutor(
+                max_workers=workers,
+                thread_name_prefix="export",
+                initializer=_warm_worker
+            )
+    return _executor
+
+
+async def run_export(format: str, plan_data: Dict, sections_data: List[Dict], financial_data: Optional[Dict] = None) -> bytes:
+    """Render an export in the pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_export_executor(), render_export, format, plan_data, sections_data, financial_data
+    )
+
+
+async def run_pdf_export(
+    plan_data: Dict,
+    sections_data: List[Dict],
+    financial_data: Optional[Dict],
+    cached_fragments: Dict[str, bytes]
+) -> Tuple[bytes, Dict[str, bytes]]:
+    """Incremental PDF render in the pool. Returns (pdf bytes, new fragments)."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_export_executor(), render_pdf_incremental, plan_data, sections_data, financial_data, cached_fragments
+    )
+
+
+def shutdown_export_pool():
+    """Stop the pool on application shutdown"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,140 @@
+"""HTTP helpers for serving stored files - ETag revalidation, Range requests and streaming"""
+
+import hashlib
+from typing import AsyncIterator, Callable, Iterator, Optional, Tuple, Union
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    """Requested byte range lies outside the file"""
+
+
+def compute_etag(data: bytes) -> str:
+    """Strong ETag from the content hash"""
+    return f'"{hashlib.sha256(data).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True when an If-None-Match header covers the given ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison: W/"x" matches "x"
+    return any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in candidates)
+
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single "bytes=" range into inclusive (start, end).
+    Returns None when the header is absent or not something we serve partially
+    (multiple ranges, other units) so the caller sends the whole file.
+    """
+    if not range_header or not range_header.startswith("bytes="):
+        return None
+
+    spec = range_header[len("bytes="):].strip()
+    if "," in spec or "-" not in spec:
+        return None
+
+    start_str, end_str = spec.split("-", 1)
+    try:
+        if start_str == "":
+            # Suffix range: last N bytes
+            suffix = int(end_str)
+            if suffix <= 0:
+                raise RangeNotSatisfiable()
+            return max(0, size - suffix), size - 1
+
+        start = int(start_str)
+        end = int(end_str) if end_str else size - 1
+    except ValueError:
+        return None
+
+    if start >= size or start > end:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+def iter_chunks(data: bytes, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+    """Yield data[start:end + 1] in CHUNK_SIZE pieces without copying the whole buffer"""
+    view = memoryview(data)
+    stop = len(data) if end is None else end + 1
+    for offset in range(start, stop, CHUNK_SIZE):
+        yield bytes(view[offset:min(offset + CHUNK_SIZE, stop)])
+
+
+def build_stream_response(
+    request: Request,
+    size: int,
+    etag: str,
+    media_type: str,
+    filename: str,
+    open_stream: Callable[[int, Optional[int]], Union[Iterator[bytes], AsyncIterator[bytes]]]
+) -> Response:
+    """
+    Stream a stored file as a download with Content-Length and ETag.
+    Honours If-None-Match (304) and single byte ranges (206/416).
+    `open_stream(start, end)` yields the bytes from start to end inclusive
+    (end None = to the end of the file).
+    """
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": f'attachment; filename="{filename}"'
+    }
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    # If-Range: only serve a partial response if the client still has this version
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() != etag:
+        range_header = None
+
+    try:
+        byte_range = parse_range(range_header, size)
+    except RangeNotSatisfiable:
+        return Response(
+            status_code=416,
+            headers={**headers, "Content-Range": f"bytes */{size}"}
+        )
+
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(open_stream(0, None), media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    headers["Content-Length"] = str(end - start + 1)
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(
+        open_stream(start, end),
+        status_code=206,
+        media_type=media_type,
+        headers=headers
+    )
+
+
+def build_file_response(
+    request: Request,
+    data: bytes,
+    media_type: str,
+    filename: str,
+    etag: Optional[str] = None
+) -> Response:
+    """Stream in-memory bytes as a download (see build_stream_response)"""
+    return build_stream_response(
+        request,
+        size=len(data),
+        etag=etag or compute_etag(data),
+        media_type=media_type,
+        filename=filename,
+        open_stream=lambda start, end: iter_chunks(data, start, end)
+    )
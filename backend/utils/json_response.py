@@ -0,0 +1,60 @@
+"""Fast JSON responses for Mongo documents
+
+The default path encodes every document twice in pure Python: serialize_doc
+copies it to turn ObjectIds and datetimes into strings, then FastAPI's
+jsonable_encoder walks the copy again before json.dumps. For section lists
+and version snapshots that was a large share of request CPU.
+
+MongoJSONResponse renders with orjson, which encodes datetimes natively and
+calls back into Python only for ObjectIds. Routes that return a Response skip
+jsonable_encoder entirely, so a hot route becomes a single encoding pass over
+the documents as Motor decoded them:
+
+    return MongoJSONResponse({"sections": public_docs(page.items), **page.meta()})
+
+public_doc only exposes `_id` as "id" (a shallow copy); every other value is
+left for the encoder. The output matches serialize_doc for our documents,
+whose embedded objects carry no `_id` of their own. MongoJSONResponse is also
+the app's default response class, so routes still returning dicts get the
+faster final encode too.
+"""
+
+from typing import Any, Dict, List, Optional
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+# Non-string dict keys (e.g. year numbers) are stringified like json.dumps does
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """orjson encoding with ObjectId support"""
+    return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+
+
+class MongoJSONResponse(JSONResponse):
+    """JSONResponse rendered by orjson; accepts ObjectIds and datetimes as-is"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def public_doc(doc: Optional[Dict]) -> Optional[Dict]:
+    """`doc` with `_id` exposed as "id" (string); other values untouched"""
+    if doc is None or "_id" not in doc:
+        return doc
+    return {("id" if key == "_id" else key): (str(value) if key == "_id" else value) for key, value in doc.items()}
+
+
+def public_docs(docs: List[Dict]) -> List[Dict]:
+    return [public_doc(doc) for doc in docs]
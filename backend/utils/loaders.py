@@ -0,0 +1,191 @@
+"""Batch loaders - coalesce keyed lookups into one $in query per collection
+
+Routes that need a related document per item (the creator of each version,
+the user behind each ticket) used to issue one find_one per item. A
+BatchLoader collects every key requested in the same event-loop tick and
+fetches them with a single `{field: {"$in": keys}}` query; results are
+memoised for the rest of the request, so asking twice for the same user
+costs nothing.
+
+    loaders = Depends(get_loaders)
+    users = await loaders.users.load_many([v["created_by"] for v in versions])
+
+get_loaders is a request-scoped dependency: FastAPI resolves it once per
+request, so every loader (and its memo) lives exactly as long as the request.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from fastapi import Depends
+
+from utils.dependencies import get_db
+from utils.serializers import to_object_id
+
+logger = logging.getLogger(__name__)
+
+
+class BatchLoader:
+    """
+    Load documents from one collection by `key_field`.
+
+    many=False: load(key) returns the first matching document or None.
+    many=True:  load(key) returns the list of matching documents ([] if none).
+    """
+
+    def __init__(self, collection, key_field: str = "_id", many: bool = False, projection: Optional[Dict] = None):
+        self.collection = collection
+        self.key_field = key_field
+        self.many = many
+        self.projection = projection
+        if projection and any(value for value in projection.values()):
+            # Inclusion projection: results are grouped by the key, so always return it
+            self.projection = {**projection, key_field: 1}
+        self._memo: Dict[str, asyncio.Future] = {}
+        self._pending: List[str] = []
+        self._dispatch_task: Optional[asyncio.Task] = None
+
+    async def load(self, key: Any):
+        """Document(s) for one key; concurrent calls share a single query"""
+        if key is None:
+            return [] if self.many else None
+
+        cache_key = str(key)
+        future = self._memo.get(cache_key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._memo[cache_key] = loop.create_future()
+            self._pending.append(cache_key)
+            if len(self._pending) == 1:
+                # Dispatch once everything requested in this tick has been queued
+                loop.call_soon(self._schedule_dispatch)
+        return await future
+
+    async def load_many(self, keys: Iterable[Any]) -> List:
+        """Results aligned with `keys`, fetched in one query"""
+        return list(await asyncio.gather(*[self.load(key) for key in keys]))
+
+    def _schedule_dispatch(self):
+        # Keep a reference so the batch task is not garbage collected mid-query
+        self._dispatch_task = asyncio.ensure_future(self._dispatch())
+
+    def prime(self, key: Any, value):
+        """Seed the memo with a document the route already has"""
+        cache_key = str(key)
+        if cache_key not in self._memo:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(value)
+            self._memo[cache_key] = future
+
+    def _query_values(self, keys: List[str]) -> List:
+        if self.key_field == "_id":
+            return [to_object_id(key) for key in keys]
+        return list(keys)
+
+    async def _fetch(self, keys: List[str]) -> Dict[str, Any]:
+        """Query once and group results by key"""
+        docs = await self.collection.find(
+            {self.key_field: {"$in": self._query_values(keys)}},
+            self.projection
+        ).to_list(None)
+
+        grouped: Dict[str, Any] = {}
+        for doc in docs:
+            doc_key = str(doc.get(self.key_field))
+            if self.many:
+                grouped.setdefault(doc_key, []).append(doc)
+            else:
+                grouped.setdefault(doc_key, doc)
+        return grouped
+
+    async def _dispatch(self):
+        keys, self._pending = self._pending, []
+        if not keys:
+            return
+        try:
+            results = await self._fetch(keys)
+        except Exception as e:
+            logger.error(f"Batch load from {self.collection.name} failed: {e}")
+            for key in keys:
+                future = self._memo.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        default = [] if self.many else None
+        for key in keys:
+            future = self._memo[key]
+            if not future.done():
+                future.set_result(results.get(key, default))
+
+
+class CountLoader(BatchLoader):
+    """Count documents per key with one $group aggregation"""
+
+    async def _fetch(self, keys: List[str]) -> Dict[str, Any]:
+        pipeline = [
+            {"$match": {self.key_field: {"$in": self._query_values(keys)}}},
+            {"$group": {"_id": f"${self.key_field}", "count": {"$sum": 1}}}
+        ]
+        rows = await self.collection.aggregate(pipeline).to_list(None)
+        counts = {str(row["_id"]): row["count"] for row in rows}
+        return {key: counts.get(key, 0) for key in keys}
+
+
+# Public user fields embedded in other resources
+USER_SUMMARY_PROJECTION = {"name": 1, "email": 1}
+
+
+class Loaders:
+    """Request-scoped registry of loaders; each is created on first use"""
+
+    def __init__(self, db):
+        self.db = db
+        self._loaders: Dict[tuple, BatchLoader] = {}
+
+    def get(self, collection: str, key_field: str = "_id", many: bool = False,
+            projection: Optional[Dict] = None, count: bool = False) -> BatchLoader:
+        registry_key = (collection, key_field, many, count, tuple(sorted((projection or {}).items())))
+        loader = self._loaders.get(registry_key)
+        if loader is None:
+            loader_class = CountLoader if count else BatchLoader
+            loader = loader_class(self.db[collection], key_field, many=many, projection=projection)
+            self._loaders[registry_key] = loader
+        return loader
+
+    @property
+    def users(self) -> BatchLoader:
+        """User name/email by id"""
+        return self.get("users", projection=USER_SUMMARY_PROJECTION)
+
+    @property
+    def subscriptions_by_user(self) -> BatchLoader:
+        return self.get("subscriptions", "user_id")
+
+    @property
+    def financial_models_by_plan(self) -> BatchLoader:
+        return self.get("financial_models", "plan_id")
+
+    def sections_by_plan(self, projection: Optional[Dict] = None) -> BatchLoader:
+        return self.get("sections", "plan_id", many=True, projection=projection)
+
+    @property
+    def plan_counts_by_user(self) -> BatchLoader:
+        return self.get("plans", "user_id", count=True)
+
+
+def get_loaders(db=Depends(get_db)) -> Loaders:
+    """Dependency: loaders memoised for the current request"""
+    return Loaders(db)
+
+
+def user_summary(user: Optional[Dict]) -> Optional[Dict]:
+    """{id, name, email} for embedding a user in another resource"""
+    if not user:
+        return None
+    return {
+        "id": str(user["_id"]),
+        "name": user.get("name", "Unknown"),
+        "email": user.get("email", "")
+    }
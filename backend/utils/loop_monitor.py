@@ -0,0 +1,281 @@
+"""Event loop monitoring - lag sampling and blocked-loop stack capture
+
+Everything in this app shares one event loop per worker, so a synchronous
+hot spot (document rendering, the financial engine, a stray blocking client)
+delays every other request on the instance. This module makes that visible:
+
+- Always on: a sampler coroutine sleeps LOOP_LAG_INTERVAL seconds and records
+  how late it wakes up. That delay is the loop lag every request saw at that
+  moment. Recent samples (mean / p50 / p99 / max) and a count of samples over
+  LOOP_BLOCK_THRESHOLD_MS are served by GET /admin/loop-stats.
+- LOOP_BLOCK_DEBUG=1: a watchdog thread checks a heartbeat the loop updates
+  every few milliseconds. When the heartbeat stalls for longer than
+  LOOP_BLOCK_THRESHOLD_MS, it captures the stack of the loop thread (the code
+  holding the loop right now) and the route of the request that task is
+  serving. Blocks are grouped by route and stack, logged, and listed by total
+  blocked time, which gives a running list of the code paths that block the
+  worker.
+
+The route comes from loop_monitor_middleware. In debug mode a task factory
+records the request each new task was spawned under, so the watchdog can name
+the request behind whichever task holds the loop, including child tasks
+(gather, call_next).
+"""
+
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import deque
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from utils.db_metrics import route_name
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG_INTERVAL = float(os.environ.get("LOOP_LAG_INTERVAL", "0.5"))
+LOOP_LAG_WINDOW = int(os.environ.get("LOOP_LAG_WINDOW", "1200"))  # samples kept (10 min at 0.5s)
+LOOP_BLOCK_THRESHOLD_MS = float(os.environ.get("LOOP_BLOCK_THRESHOLD_MS", "100"))
+LOOP_BLOCK_DEBUG = os.environ.get("LOOP_BLOCK_DEBUG", "0").lower() in ("1", "true", "yes")
+LOOP_BLOCK_STACK_DEPTH = int(os.environ.get("LOOP_BLOCK_STACK_DEPTH", "12"))
+
+_current_request: ContextVar = ContextVar("loop_monitor_request", default=None)
+# Task -> request it serves (debug mode), readable from the watchdog thread
+_task_requests: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def _install_task_factory(loop: asyncio.AbstractEventLoop):
+    """Remember the in-flight request of every task created on `loop`"""
+    previous = loop.get_task_factory()
+
+    def factory(loop, coro, **kwargs):
+        if previous is not None:
+            task = previous(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        context = kwargs.get("context")
+        request = context.get(_current_request) if context is not None else _current_request.get()
+        if request is not None:
+            _task_requests[task] = request
+        return task
+
+    loop.set_task_factory(factory)
+
+
+def _frame_label(frame: traceback.FrameSummary) -> str:
+    path = Path(frame.filename)
+    return f"{path.parent.name}/{path.name}:{frame.lineno} in {frame.name}"
+
+
+class _BlockTotals:
+    def __init__(self, route: str, stack: List[str]):
+        self.route = route
+        self.stack = stack
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_seen: Optional[float] = None
+
+
+class LoopMonitor:
+    """Lag sampler for the running loop, with an optional blocked-loop watchdog"""
+
+    def __init__(
+        self,
+        interval: float = LOOP_LAG_INTERVAL,
+        debug: bool = LOOP_BLOCK_DEBUG,
+        threshold_ms: float = LOOP_BLOCK_THRESHOLD_MS
+    ):
+        self.interval = interval
+        self.debug = debug
+        self.threshold = threshold_ms / 1000
+        self.samples: deque = deque(maxlen=LOOP_LAG_WINDOW)
+        self.over_threshold = 0
+        self.blocks: Dict[Tuple, _BlockTotals] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat = time.perf_counter()
+        self._tasks: List[asyncio.Task] = []
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Start sampling the running loop (call from inside it)"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.perf_counter()
+        self._stopped.clear()
+        self._tasks.append(self._loop.create_task(self._sample()))
+        if self.debug:
+            _install_task_factory(self._loop)
+            self._tasks.append(self._loop.create_task(self._beat()))
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    def stop(self):
+        self._stopped.set()
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+
+    # ------------------------------------------------------------------
+    # Lag sampling
+    # ------------------------------------------------------------------
+
+    async def _sample(self):
+        while True:
+            due = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - due)
+            self.samples.append(lag)
+            if lag >= self.threshold:
+                self.over_threshold += 1
+
+    # ------------------------------------------------------------------
+    # Blocked-loop capture (debug)
+    # ------------------------------------------------------------------
+
+    async def _beat(self):
+        tick = min(self.threshold / 4, 0.025)
+        while True:
+            self._heartbeat = time.perf_counter()
+            await asyncio.sleep(tick)
+
+    def _capture(self) -> Tuple[str, List[str]]:
+        """Route and stack of whatever holds the loop thread right now"""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.extract_stack(frame)[-LOOP_BLOCK_STACK_DEPTH:] if frame else []
+
+        route = "callback"
+        task = asyncio.current_task(self._loop)
+        if task is not None:
+            request = _task_requests.get(task)
+            route = route_name(request) if request is not None else "background"
+        return route, [_frame_label(f) for f in stack]
+
+    def _watch(self):
+        check = self.threshold / 2
+        episode = None  # (route, stack, longest stall seen)
+        while not self._stopped.wait(check):
+            stalled = time.perf_counter() - self._heartbeat
+            if stalled >= self.threshold:
+                if episode is None:
+                    route, stack = self._capture()
+                    episode = [route, stack, stalled]
+                else:
+                    episode[2] = stalled
+            elif episode is not None:
+                self._record_block(*episode)
+                episode = None
+
+    def _record_block(self, route: str, stack: List[str], stalled: float):
+        blocked_ms = stalled * 1000
+        key = (route, tuple(stack[-5:]))
+        with self._lock:
+            totals = self.blocks.get(key)
+            if totals is None:
+                totals = self.blocks[key] = _BlockTotals(route, stack)
+            totals.count += 1
+            totals.total_ms += blocked_ms
+            totals.max_ms = max(totals.max_ms, blocked_ms)
+            totals.last_seen = time.time()
+        where = stack[-1] if stack else "unknown"
+        logger.warning(f"Event loop blocked ~{blocked_ms:.0f}ms on {route} at {where}\n  " + "\n  ".join(stack))
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def stats(self, limit: int = 20) -> Dict:
+        samples = sorted(self.samples)
+        lag = {}
+        if samples:
+            lag = {
+                "last_ms": round(self.samples[-1] * 1000, 2),
+                "mean_ms": round(statistics.fmean(samples) * 1000, 2),
+                "p50_ms": round(samples[len(samples) // 2] * 1000, 2),
+                "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000, 2),
+                "max_ms": round(samples[-1] * 1000, 2)
+            }
+        with self._lock:
+            blocks = sorted(self.blocks.values(), key=lambda b: b.total_ms, reverse=True)[:limit]
+            block_rows = [{
+                "route": b.route,
+                "count": b.count,
+                "total_ms": round(b.total_ms, 1),
+                "max_ms": round(b.max_ms, 1),
+                "last_seen": b.last_seen,
+                "stack": b.stack
+            } for b in blocks]
+        return {
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "samples": len(samples),
+            "lag": lag,
+            "over_threshold": self.over_threshold,
+            "debug": self.debug,
+            "blocks": block_rows
+        }
+
+    def reset(self):
+        self.samples.clear()
+        self.over_threshold = 0
+        with self._lock:
+            self.blocks.clear()
+
+
+# ============================================================================
+# PROCESS-WIDE MONITOR (served by GET /admin/loop-stats)
+# ============================================================================
+
+_monitor: Optional[LoopMonitor] = None
+
+
+def start_loop_monitor() -> LoopMonitor:
+    """Start the process monitor on the running loop (app startup)"""
+    global _monitor
+    if _monitor is None:
+        _monitor = LoopMonitor()
+        _monitor.start()
+        logger.info(f"Loop monitor started (debug={'on' if _monitor.debug else 'off'})")
+    return _monitor
+
+
+def stop_loop_monitor():
+    global _monitor
+    if _monitor is not None:
+        _monitor.stop()
+        _monitor = None
+
+
+def get_loop_stats(limit: int = 20) -> Dict:
+    if _monitor is None:
+        return {"running": False}
+    return {"running": True, **_monitor.stats(limit)}
+
+
+def reset_loop_stats():
+    if _monitor is not None:
+        _monitor.reset()
+
+
+async def loop_monitor_middleware(request, call_next):
+    """Tag the request's tasks so blocked-loop captures name its route"""
+    token = _current_request.set(request)
+    _task_requests[asyncio.current_task()] = request
+    try:
+        return await call_next(request)
+    finally:
+        _current_request.reset(token)
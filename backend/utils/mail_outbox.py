@@ -0,0 +1,284 @@
+"""Outbound mail - Mongo outbox, delivered in the background
+
+Routes used to open an SMTP connection inside the request, so a slow mail
+server held the worker and the user waited on it (and a failure lost the
+message). Mail now goes through the `mail_outbox` collection:
+
+    await enqueue_mail(db, to=SUPPORT_EMAIL, subject="...", body="...")
+    background_tasks.add_task(deliver_pending, db)
+
+enqueue_mail is one insert. deliver_pending claims due messages in batches of
+MAIL_BATCH_SIZE and sends them over one reused async SMTP session
+(aiosmtplib); a failed message is retried with exponential backoff up to
+MAIL_MAX_ATTEMPTS times before it is marked failed (a message that cannot even
+be built counts as a failed attempt; enqueue_mail folds line breaks out of
+header values, which come from form fields). run_mail_sender (started
+with the app) repeats the pass every MAIL_POLL_INTERVAL seconds to pick up
+retries and anything a request didn't deliver.
+
+Claims are atomic and carry a lease (MAIL_CLAIM_LEASE seconds), so several
+instances can deliver concurrently and a message whose sender died is picked
+up again once its lease expires. Delivery is therefore at-least-once.
+
+SMTP_SERVER / SMTP_PORT / SMTP_USER / SMTP_PASSWORD configure the relay;
+login is skipped without a user, so a local sink (e.g. `python -m aiosmtpd -n`)
+works for development. Without any SMTP settings, messages are logged and
+kept pending.
+"""
+
+import asyncio
+import logging
+import os
+import re
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import Dict, List, Optional, Union
+
+import aiosmtplib
+from pymongo import ReturnDocument, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+SMTP_SERVER = os.environ.get("SMTP_SERVER", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", "587"))
+SMTP_USER = os.environ.get("SMTP_USER", "")
+SMTP_PASSWORD = os.environ.get("SMTP_PASSWORD", "")
+SMTP_TIMEOUT = float(os.environ.get("SMTP_TIMEOUT", "30"))
+MAIL_FROM = os.environ.get("MAIL_FROM") or SMTP_USER or "noreply@strattio.com"
+SUPPORT_EMAIL = os.environ.get("SUPPORT_EMAIL", "support@strattio.com")
+
+MAIL_BATCH_SIZE = int(os.environ.get("MAIL_BATCH_SIZE", "20"))
+MAIL_MAX_ATTEMPTS = int(os.environ.get("MAIL_MAX_ATTEMPTS", "5"))
+MAIL_RETRY_BASE = float(os.environ.get("MAIL_RETRY_BASE", "30"))  # seconds, doubled per attempt
+MAIL_CLAIM_LEASE = float(os.environ.get("MAIL_CLAIM_LEASE", "300"))
+MAIL_POLL_INTERVAL = float(os.environ.get("MAIL_POLL_INTERVAL", "30"))
+SMTP_IDLE_TIMEOUT = float(os.environ.get("SMTP_IDLE_TIMEOUT", "60"))
+
+OUTBOX = "mail_outbox"
+
+
+def smtp_configured() -> bool:
+    """A relay with credentials, or an explicitly configured server (local sink)"""
+    return bool(SMTP_USER and SMTP_PASSWORD) or "SMTP_SERVER" in os.environ
+
+
+# ============================================================================
+# SMTP CONNECTION
+# ============================================================================
+
+class SMTPConnection:
+    """One SMTP session reused across messages, reconnected when dropped or idle"""
+
+    def __init__(
+        self,
+        hostname: str = SMTP_SERVER,
+        port: int = SMTP_PORT,
+        username: str = SMTP_USER,
+        password: str = SMTP_PASSWORD,
+        timeout: float = SMTP_TIMEOUT
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.connects = 0
+        self._smtp: Optional[aiosmtplib.SMTP] = None
+        self._last_used = 0.0
+        # An SMTP session carries one transaction at a time
+        self._lock = asyncio.Lock()
+
+    async def _connect(self):
+        await self.close()
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            timeout=self.timeout,
+            use_tls=self.port == 465,
+            # None: upgrade with STARTTLS whenever the server offers it
+            start_tls=None
+        )
+        await smtp.connect()
+        if self.username:
+            await smtp.login(self.username, self.password)
+        self._smtp = smtp
+        self.connects += 1
+
+    async def _ensure_connected(self):
+        loop = asyncio.get_running_loop()
+        idle = loop.time() - self._last_used
+        if self._smtp is None or not self._smtp.is_connected or idle > SMTP_IDLE_TIMEOUT:
+            await self._connect()
+
+    async def send_batch(self, messages: List[EmailMessage]) -> List[Optional[Exception]]:
+        """Send messages over the shared session; one result (None or the error) per message"""
+        results: List[Optional[Exception]] = []
+        async with self._lock:
+            for message in messages:
+                try:
+                    await self._ensure_connected()
+                    try:
+                        await self._smtp.send_message(message)
+                    except aiosmtplib.SMTPServerDisconnected:
+                        # The server closed an idle session under us: reconnect once
+                        await self._connect()
+                        await self._smtp.send_message(message)
+                    results.append(None)
+                except Exception as e:
+                    results.append(e)
+                self._last_used = asyncio.get_running_loop().time()
+        return results
+
+    async def close(self):
+        smtp, self._smtp = self._smtp, None
+        if smtp is not None and smtp.is_connected:
+            try:
+                await smtp.quit()
+            except Exception:
+                smtp.close()
+
+
+_connection: Optional[SMTPConnection] = None
+_connection_loop = None
+
+
+def get_smtp_connection() -> SMTPConnection:
+    """The process-wide SMTP session (one per event loop)"""
+    global _connection, _connection_loop
+    loop = asyncio.get_running_loop()
+    if _connection is None or _connection_loop is not loop:
+        _connection, _connection_loop = SMTPConnection(), loop
+    return _connection
+
+
+# ============================================================================
+# OUTBOX
+# ============================================================================
+
+def _header_value(value: str) -> str:
+    # Subjects and addresses come from form fields: a CR/LF would make the
+    # message unbuildable (or inject headers), so fold them into spaces
+    return re.sub(r"[\r\n]+", " ", value).strip()
+
+
+def build_message(mail: Dict) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = mail.get("from") or MAIL_FROM
+    message["To"] = ", ".join(mail["to"])
+    message["Subject"] = mail["subject"]
+    if mail.get("reply_to"):
+        message["Reply-To"] = mail["reply_to"]
+    message.set_content(mail["body"])
+    return message
+
+
+async def enqueue_mail(
+    db,
+    to: Union[str, List[str]],
+    subject: str,
+    body: str,
+    *,
+    reply_to: Optional[str] = None,
+    kind: str = "generic"
+) -> str:
+    """Store a message for background delivery; returns its outbox id"""
+    now = datetime.utcnow()
+    mail = {
+        "to": [_header_value(address) for address in ([to] if isinstance(to, str) else to)],
+        "from": MAIL_FROM,
+        "subject": _header_value(subject),
+        "body": body,
+        "reply_to": _header_value(reply_to) if reply_to else None,
+        "kind": kind,
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": now,
+        "last_error": None,
+        "created_at": now,
+        "sent_at": None
+    }
+    result = await db[OUTBOX].insert_one(mail)
+    if not smtp_configured():
+        logger.info(f"Mail queued (SMTP not configured) [{kind}] to {mail['to']}: {mail['subject']}\n{body}")
+    return str(result.inserted_id)
+
+
+async def claim_batch(db, limit: int = MAIL_BATCH_SIZE) -> List[Dict]:
+    """Atomically claim up to `limit` due messages for this sender"""
+    claimed = []
+    for _ in range(limit):
+        now = datetime.utcnow()
+        # While sending, next_attempt_at is the lease expiry: an abandoned claim becomes due again
+        mail = await db[OUTBOX].find_one_and_update(
+            {"status": {"$in": ["pending", "sending"]}, "next_attempt_at": {"$lte": now}},
+            {"$set": {"status": "sending", "next_attempt_at": now + timedelta(seconds=MAIL_CLAIM_LEASE)}},
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+        if mail is None:
+            break
+        claimed.append(mail)
+    return claimed
+
+
+def _outcome(mail: Dict, error: Optional[Exception]) -> UpdateOne:
+    now = datetime.utcnow()
+    if error is None:
+        return UpdateOne({"_id": mail["_id"]}, {"$set": {"status": "sent", "sent_at": now, "last_error": None}})
+
+    attempts = mail.get("attempts", 0) + 1
+    update = {"attempts": attempts, "last_error": str(error)[:500]}
+    if attempts >= MAIL_MAX_ATTEMPTS:
+        update["status"] = "failed"
+        logger.error(f"Giving up on mail {mail['_id']} after {attempts} attempts: {error}")
+    else:
+        update["status"] = "pending"
+        update["next_attempt_at"] = now + timedelta(seconds=MAIL_RETRY_BASE * 2 ** (attempts - 1))
+        logger.warning(f"Mail {mail['_id']} failed (attempt {attempts}), will retry: {error}")
+    return UpdateOne({"_id": mail["_id"]}, {"$set": update})
+
+
+async def deliver_pending(db) -> int:
+    """Send every due outbox message; returns how many were sent"""
+    if not smtp_configured():
+        return 0
+
+    sent = 0
+    connection = get_smtp_connection()
+    while True:
+        batch = await claim_batch(db)
+        if not batch:
+            return sent
+        # A message that cannot be built fails (and is retried) on its own,
+        # like a rejected send, instead of stranding the whole batch
+        results: List[Optional[Exception]] = [None] * len(batch)
+        built = []
+        for index, mail in enumerate(batch):
+            try:
+                built.append((index, build_message(mail)))
+            except Exception as e:
+                results[index] = e
+        send_results = await connection.send_batch([message for _, message in built])
+        for (index, _), error in zip(built, send_results):
+            results[index] = error
+        await db[OUTBOX].bulk_write(
+            [_outcome(mail, error) for mail, error in zip(batch, results)],
+            ordered=False
+        )
+        sent += sum(1 for error in results if error is None)
+        if len(batch) < MAIL_BATCH_SIZE:
+            return sent
+
+
+async def run_mail_sender(db, interval: float = MAIL_POLL_INTERVAL):
+    """Background loop: deliver due messages every `interval` seconds"""
+    while True:
+        try:
+            sent = await deliver_pending(db)
+            if sent:
+                logger.info(f"Mail sender delivered {sent} messages")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Mail sender pass failed: {e}")
+        await asyncio.sleep(interval)
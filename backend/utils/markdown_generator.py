@@ -1,34 +1,29 @@
 """Markdown Generator for Business Plans"""
 
 from datetime import datetime
-import os
 import logging
-from pathlib import Path
 
-logger = logging.getLogger(__name__)
+from utils.content_ast import get_section_ast, spans_to_markdown
 
-# Use /tmp for exports in Vercel (writable), or local exports directory for development
-# Vercel serverless functions have a read-only filesystem except for /tmp
-# Vercel automatically sets VERCEL=1 environment variable
-def get_exports_dir():
-    """Get the exports directory path, using /tmp in Vercel"""
-    if os.environ.get("VERCEL") or os.environ.get("VERCEL_ENV"):
-        return Path("/tmp/exports")
-    else:
-        BACKEND_DIR = Path(__file__).parent.parent
-        return BACKEND_DIR / "exports"
+logger = logging.getLogger(__name__)
 
-# Create exports directory lazily (only when needed, not at import time)
-def ensure_exports_dir():
-    """Ensure exports directory exists"""
-    exports_dir = get_exports_dir()
-    try:
-        exports_dir.mkdir(exist_ok=True, parents=True)
-    except (OSError, PermissionError):
-        # If we can't create the directory, try /tmp as fallback
-        exports_dir = Path("/tmp/exports")
-        exports_dir.mkdir(exist_ok=True, parents=True)
-    return exports_dir
+def blocks_to_markdown(blocks):
+    """Render content AST blocks as Markdown"""
+    out = []
+    for block in blocks:
+        if block['type'] == 'heading':
+            # Section titles are ##; content headings nest below them
+            level = min(block.get('level', 2) + 1, 6)
+            out.append(f"{'#' * level} {spans_to_markdown(block['spans'])}\n\n")
+        elif block['type'] == 'list':
+            for number, item in enumerate(block['items'], 1):
+                marker = f"{number}." if block.get('ordered') else '-'
+                out.append(f"{marker} {spans_to_markdown(item)}\n")
+            out.append("\n")
+        else:
+            # Markdown hard line breaks for single newlines
+            out.append(spans_to_markdown(block['spans']).replace('\n', '  \n') + "\n\n")
+    return ''.join(out)
 
 def generate_business_plan_markdown(plan_data, sections_data, financial_data=None):
     """
@@ -40,17 +35,9 @@ def generate_business_plan_markdown(plan_data, sections_data, financial_data=Non
         financial_data: Financial model data (optional)
     
     Returns:
-        str: Path to generated Markdown file
+        bytes: The rendered Markdown, UTF-8 encoded
     """
     
-    # Ensure exports directory exists and get path
-    exports_dir = ensure_exports_dir()
-    
-    # Generate filename
-    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    filename = f"business_plan_{plan_data.get('id', 'unknown')}_{timestamp}.md"
-    filepath = exports_dir / filename
-    
     markdown_content = []
     
     # Title
@@ -74,24 +61,13 @@ def generate_business_plan_markdown(plan_data, sections_data, financial_data=Non
         # Section heading
         markdown_content.append(f"\n## {idx + 1}. {section.get('title', 'Section')}\n\n")
         
-        # Section content
-        content = section.get('content', '')
-        
-        if not content or content.strip() == "":
-            content = f"[{section.get('title')} content to be added]"
-        
-        # Convert HTML to Markdown
-        import re
-        # Remove HTML tags but preserve structure
-        content = re.sub(r'<strong>(.*?)</strong>', r'**\1**', content)
-        content = re.sub(r'<em>(.*?)</em>', r'*\1*', content)
-        content = re.sub(r'<h[1-6]>(.*?)</h[1-6]>', r'### \1', content)
-        content = re.sub(r'<p>(.*?)</p>', r'\1\n\n', content)
-        content = re.sub(r'<br\s*/?>', r'\n', content)
-        content = re.sub(r'<[^>]+>', '', content)  # Remove any remaining HTML tags
+        # Section content (parsed once per revision, see utils/content_ast)
+        blocks = get_section_ast(section)
         
-        markdown_content.append(content)
-        markdown_content.append("\n\n")
+        if not blocks:
+            markdown_content.append(f"[{section.get('title')} content to be added]\n\n")
+        else:
+            markdown_content.append(blocks_to_markdown(blocks))
     
     # Financial Summary (if available)
     if financial_data and financial_data.get('data'):
@@ -134,9 +110,7 @@ def generate_business_plan_markdown(plan_data, sections_data, financial_data=Non
                 np_row += f" £{year.get('net_profit', 0):,.0f} |"
             markdown_content.append(np_row + "\n")
     
-    # Write to file
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(''.join(markdown_content))
+    content = ''.join(markdown_content).encode('utf-8')
     
-    logger.info(f"Generated Markdown: {filepath}")
-    return str(filepath)
+    logger.info(f"Generated Markdown for plan {plan_data.get('id', 'unknown')} ({len(content)} bytes)")
+    return content
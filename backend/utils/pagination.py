@@ -0,0 +1,185 @@
+"""Keyset (cursor) pagination for list endpoints
+
+skip/limit pagination makes Mongo walk and discard every skipped document, so
+page N costs N pages of work. Keyset pagination instead remembers where the
+last page ended - the (sort field, _id) of its final document - and asks for
+documents strictly after it, which an index on (filter..., sort field, _id)
+answers directly, whatever the depth.
+
+    page = await paginate(db.plans, {"user_id": user_id}, params)
+    return {"plans": [serialize_doc(p) for p in page.items], **page.meta()}
+
+Cursors are opaque to clients (base64 JSON of the boundary values) and bound
+to the sort they were issued for. Every page is capped at MAX_PAGE_SIZE
+documents, so a request never holds an unbounded result set in memory.
+"""
+
+import asyncio
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from fastapi import HTTPException, Query
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+
+@dataclass
+class PageParams:
+    """Pagination query parameters of one request"""
+    limit: int = DEFAULT_PAGE_SIZE
+    cursor: Optional[str] = None
+    include_total: bool = False
+    # Legacy offset, honoured only when no cursor is given
+    skip: int = 0
+
+
+def _page_params_dependency(default_limit: int):
+    def dependency(
+        limit: int = Query(default_limit, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+        cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+        include_total: bool = Query(False, description="Also count all matching documents")
+    ) -> PageParams:
+        return PageParams(limit=limit, cursor=cursor, include_total=include_total)
+    return dependency
+
+
+# Dependency: cursor pagination parameters
+page_params = _page_params_dependency(DEFAULT_PAGE_SIZE)
+
+# Dependency for lists clients used to receive whole (or up to 100 items) in
+# one response: the first page stays as large as before
+full_page_params = _page_params_dependency(MAX_PAGE_SIZE)
+
+
+def legacy_page_params(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    include_total: bool = Query(True, description="Also count all matching documents"),
+    skip: int = Query(0, ge=0, description="Deprecated offset; use cursor")
+) -> PageParams:
+    """Dependency for endpoints that historically took skip/limit and returned a total"""
+    return PageParams(limit=limit, cursor=cursor, include_total=include_total, skip=skip)
+
+
+@dataclass
+class Page:
+    items: List[Dict]
+    limit: int
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+    @property
+    def has_more(self) -> bool:
+        return self.next_cursor is not None
+
+    def meta(self) -> Dict[str, Any]:
+        """Pagination fields merged into a list response"""
+        meta = {"next_cursor": self.next_cursor, "has_more": self.has_more, "limit": self.limit}
+        if self.total is not None:
+            meta["total"] = self.total
+        return meta
+
+
+# ============================================================================
+# CURSORS
+# ============================================================================
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    if isinstance(value, ObjectId):
+        return {"$oid": str(value)}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "$date" in value:
+            return datetime.fromisoformat(value["$date"])
+        if "$oid" in value:
+            return ObjectId(value["$oid"])
+    return value
+
+
+def encode_cursor(doc: Dict, sort_field: str) -> str:
+    payload = {"f": sort_field, "v": _encode_value(doc.get(sort_field)), "id": _encode_value(doc["_id"])}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_field: str):
+    """(sort value, _id) of the last document of the previous page"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if payload["f"] != sort_field:
+            raise ValueError("cursor issued for a different sort")
+        return _decode_value(payload["v"]), _decode_value(payload["id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def keyset_filter(sort_field: str, direction: int, value: Any, last_id: Any) -> Dict:
+    """Documents strictly after (value, last_id) in (sort_field, _id) order"""
+    after = "$gt" if direction > 0 else "$lt"
+    if sort_field == "_id":
+        return {"_id": {after: last_id}}
+    if value is None:
+        # Missing sort values sort lowest: ascending continues into the
+        # present values, descending only has the remaining nulls left
+        tie = {sort_field: None, "_id": {after: last_id}}
+        if direction > 0:
+            return {"$or": [tie, {sort_field: {"$ne": None}}]}
+        return tie
+    return {"$or": [
+        {sort_field: {after: value}},
+        {sort_field: value, "_id": {after: last_id}}
+    ]}
+
+
+# ============================================================================
+# PAGINATE
+# ============================================================================
+
+async def paginate(
+    collection,
+    query: Dict,
+    params: PageParams,
+    *,
+    sort_field: str = "created_at",
+    direction: int = -1,
+    projection: Optional[Dict] = None
+) -> Page:
+    """One page of `query` ordered by (sort_field, _id)"""
+    find_query = query
+    if params.cursor:
+        value, last_id = decode_cursor(params.cursor, sort_field)
+        boundary = keyset_filter(sort_field, direction, value, last_id)
+        find_query = {"$and": [query, boundary]} if query else boundary
+
+    if projection and any(projection.values()) and sort_field not in projection:
+        # Inclusion projections must return the sort field for the next cursor
+        projection = {**projection, sort_field: 1}
+
+    sort = [("_id", direction)] if sort_field == "_id" else [(sort_field, direction), ("_id", direction)]
+    cursor = collection.find(find_query, projection).sort(sort)
+    if params.skip and not params.cursor:
+        cursor = cursor.skip(params.skip)
+    # One extra document tells us whether another page exists
+    fetch = cursor.limit(params.limit + 1).to_list(params.limit + 1)
+    if params.include_total:
+        docs, total = await asyncio.gather(fetch, collection.count_documents(query))
+    else:
+        docs, total = await fetch, None
+
+    next_cursor = None
+    if len(docs) > params.limit:
+        docs = docs[:params.limit]
+        next_cursor = encode_cursor(docs[-1], sort_field)
+
+    return Page(items=docs, limit=params.limit, next_cursor=next_cursor, total=total)
@@ -0,0 +1,189 @@
+"""Incremental PDF builds - render sections once, stitch cached fragments
+
+Each section (and the financial summary) is rendered as a standalone PDF
+fragment keyed by its content revision. An export renders only the fragments
+whose key has no stored artifact, then assembles the document: the title page
+and table of contents are regenerated with the real page numbers, and a
+"Page N of M" footer is stamped over the stitched pages.
+
+Fragments live in export storage (see utils/export_storage) and are indexed
+by the `pdf_fragments` collection: {key, storage, storage_id, size}.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+
+from utils.content_ast import content_digest
+from utils.export_storage import StoredFileNotFound
+from utils.export_worker import RENDERER_VERSION
+
+logger = logging.getLogger(__name__)
+
+# Re-render the front matter until its page count settles (a longer TOC
+# shifts every section's page number)
+_MAX_FRONT_MATTER_PASSES = 3
+
+
+def _ordered_sections(sections: List[Dict]) -> List[Dict]:
+    return sorted(sections, key=lambda s: s.get("order_index", 999))
+
+
+def section_fragment_key(section: Dict, number: int) -> str:
+    """Key for a section fragment: content revision, heading and renderer version"""
+    digest = section.get("content_digest") or content_digest(section.get("content") or "")
+    payload = f"section:{RENDERER_VERSION}:{number}:{section.get('title')}:{digest}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def financial_fragment_key(financial_data: Optional[Dict]) -> Optional[str]:
+    """Key for the financial summary fragment (None when there is nothing to render)"""
+    fin = (financial_data or {}).get("data")
+    if not fin:
+        return None
+    payload = json.dumps(
+        {"kpis": fin.get("kpis"), "pnl_annual": (fin.get("pnl_annual") or [])[:5]},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(f"financial:{RENDERER_VERSION}:{payload}".encode("utf-8")).hexdigest()
+
+
+def fragment_keys(sections: List[Dict], financial_data: Optional[Dict]) -> List[str]:
+    """All fragment keys a plan's PDF is assembled from, in document order"""
+    keys = [section_fragment_key(s, idx + 1) for idx, s in enumerate(_ordered_sections(sections))]
+    financial_key = financial_fragment_key(financial_data)
+    if financial_key:
+        keys.append(financial_key)
+    return keys
+
+
+# ============================================================================
+# ASSEMBLY (runs in the export worker)
+# ============================================================================
+
+def build_pdf_incremental(
+    plan_data: Dict,
+    sections_data: List[Dict],
+    financial_data: Optional[Dict],
+    cached: Dict[str, bytes]
+) -> Tuple[bytes, Dict[str, bytes]]:
+    """
+    Assemble a plan PDF from fragments, rendering only those missing from `cached`.
+    Returns (pdf bytes, newly rendered fragments by key).
+    """
+    from utils.pdf_generator import (
+        generate_business_plan_pdf,
+        render_financial_fragment,
+        render_front_matter,
+        render_page_number_overlay,
+        render_section_fragment
+    )
+
+    try:
+        from pypdf import PdfReader, PdfWriter
+    except ImportError:
+        logger.warning("pypdf not installed, rendering the PDF in one pass")
+        return generate_business_plan_pdf(plan_data, sections_data, financial_data), {}
+
+    sorted_sections = _ordered_sections(sections_data)
+    rendered: Dict[str, bytes] = {}
+
+    def fragment(key, render):
+        data = cached.get(key)
+        if data is None:
+            data = rendered[key] = render()
+        return PdfReader(BytesIO(data))
+
+    # Body fragments with their TOC titles (the financial summary is not listed)
+    body = []
+    for idx, section in enumerate(sorted_sections):
+        number = idx + 1
+        reader = fragment(
+            section_fragment_key(section, number),
+            lambda: render_section_fragment(section, number)
+        )
+        body.append((f"{number}. {section.get('title', 'Section')}", reader))
+
+    financial_key = financial_fragment_key(financial_data)
+    if financial_key:
+        body.append((None, fragment(financial_key, lambda: render_financial_fragment(financial_data))))
+
+    # Front matter: page numbers depend on its own length, so iterate until stable
+    front_pages = 2
+    for _ in range(_MAX_FRONT_MATTER_PASSES):
+        toc_entries = []
+        page = front_pages + 1
+        for title, reader in body:
+            if title:
+                toc_entries.append((title, page))
+            page += len(reader.pages)
+        front = PdfReader(BytesIO(render_front_matter(plan_data, toc_entries)))
+        if len(front.pages) == front_pages:
+            break
+        front_pages = len(front.pages)
+
+    writer = PdfWriter()
+    for reader in [front] + [reader for _, reader in body]:
+        for pdf_page in reader.pages:
+            writer.add_page(pdf_page)
+
+    overlay = PdfReader(BytesIO(render_page_number_overlay(len(writer.pages))))
+    for pdf_page, overlay_page in zip(writer.pages, overlay.pages):
+        pdf_page.merge_page(overlay_page)
+
+    buffer = BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue(), rendered
+
+
+# ============================================================================
+# FRAGMENT STORE
+# ============================================================================
+
+async def _read_fragment(storage, storage_id: str) -> Optional[bytes]:
+    try:
+        if not await storage.touch(storage_id):
+            return None
+        return b"".join([chunk async for chunk in storage.stream(storage_id)])
+    except StoredFileNotFound:
+        return None
+
+
+async def load_cached_fragments(db, storage, keys: List[str]) -> Dict[str, bytes]:
+    """Stored fragments for `keys`; missing or expired ones are simply absent"""
+    if not keys:
+        return {}
+    try:
+        docs = await db.pdf_fragments.find(
+            {"key": {"$in": keys}, "storage": storage.name},
+            {"key": 1, "storage_id": 1}
+        ).to_list(len(keys))
+        contents = await asyncio.gather(*[_read_fragment(storage, doc["storage_id"]) for doc in docs])
+    except Exception as e:
+        # A cold fragment cache only costs a full render
+        logger.warning(f"Failed to load PDF fragments: {e}")
+        return {}
+    return {doc["key"]: data for doc, data in zip(docs, contents) if data is not None}
+
+
+async def store_fragments(db, storage, fragments: Dict[str, bytes]):
+    """Persist newly rendered fragments for later exports"""
+    for key, data in fragments.items():
+        try:
+            stored = await storage.put(data, f"fragment_{key}.pdf", "application/pdf")
+            await db.pdf_fragments.update_one(
+                {"key": key, "storage": storage.name},
+                {"$set": {
+                    "storage_id": stored["storage_id"],
+                    "size": stored["size"],
+                    "updated_at": datetime.utcnow()
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Failed to store PDF fragment {key}: {e}")
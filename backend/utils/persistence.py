@@ -0,0 +1,131 @@
+"""Batched, transactional writes of plan artifacts
+
+Generation results and version restores touch several collections at once:
+sections, research pack, financial model, compliance report, SWOT, competitor
+analysis, the export cache and finally the plan's status. Writing them one
+document at a time took 20+ sequential round trips and let readers observe a
+half-written plan.
+
+A PlanWriteBatch collects those writes as one bulk_write per collection
+(delete the old artifacts + insert the new ones + any updates) and commit()
+applies them:
+
+- in a multi-document transaction when the deployment supports one (replica
+  set or sharded cluster - a single-node replica set is enough locally), with
+  the plan update last, so readers see either the old plan or the new one;
+- otherwise as concurrent bulk writes followed by the plan update, so the
+  status still only flips once every artifact is in place.
+
+    batch = PlanWriteBatch(plan_id)
+    batch.replace("sections", sections)
+    batch.update_plan({"$set": {"status": "complete"}})
+    await commit(db, batch)
+
+PERSISTENCE_TRANSACTIONS=off skips transactions even where supported.
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pymongo import DeleteMany, InsertOne, UpdateMany
+
+from utils.db_metrics import raw_database
+from utils.plan_revision import with_revision_bump
+from utils.serializers import to_object_id
+
+logger = logging.getLogger(__name__)
+
+PERSISTENCE_TRANSACTIONS = os.environ.get("PERSISTENCE_TRANSACTIONS", "auto").lower()
+
+# Transaction support per client, probed once
+_transaction_support: Dict[int, bool] = {}
+
+
+class PlanWriteBatch:
+    """Writes to a plan and its child collections, applied together by commit()"""
+
+    def __init__(self, plan_id: str):
+        self.plan_id = plan_id
+        self.operations: Dict[str, List] = {}
+        self.plan_update: Optional[Dict] = None
+
+    def _ops(self, collection: str) -> List:
+        return self.operations.setdefault(collection, [])
+
+    def insert(self, collection: str, docs: List[Dict]):
+        """Insert child documents (plan_id is set on each)"""
+        for doc in docs:
+            doc["plan_id"] = self.plan_id
+            self._ops(collection).append(InsertOne(doc))
+
+    def replace(self, collection: str, docs: List[Dict]):
+        """Swap the plan's documents in `collection` for `docs`"""
+        self._ops(collection).append(DeleteMany({"plan_id": self.plan_id}))
+        self.insert(collection, docs)
+
+    def update_many(self, collection: str, query: Dict, update: Dict):
+        self._ops(collection).append(UpdateMany({"plan_id": self.plan_id, **query}, update))
+
+    def invalidate_exports(self):
+        """Drop the plan's export cache entries (see utils/export_cache)"""
+        self.update_many(
+            "exports",
+            {"cache_key": {"$ne": None}},
+            {"$set": {"cache_key": None, "cache_invalidated_at": datetime.utcnow()}}
+        )
+
+    def update_plan(self, update: Dict):
+        """Update applied to the plan document after every other write (with the revision bump)"""
+        self.plan_update = update
+
+
+async def supports_transactions(db) -> bool:
+    """Whether the deployment behind `db` can run multi-document transactions"""
+    if PERSISTENCE_TRANSACTIONS in ("0", "off", "false", "no"):
+        return False
+    client = raw_database(db).client
+    supported = _transaction_support.get(id(client))
+    if supported is None:
+        try:
+            hello = await raw_database(db).command("hello")
+            supported = bool(hello.get("setName")) or hello.get("msg") == "isdbgrid"
+        except Exception as e:
+            logger.warning(f"Could not detect transaction support: {e}")
+            supported = False
+        _transaction_support[id(client)] = supported
+        logger.info(f"Multi-document transactions {'enabled' if supported else 'unavailable'} for plan writes")
+    return supported
+
+
+async def _apply(db, batch: PlanWriteBatch, session=None):
+    if session is not None:
+        # Operations in one session run one at a time
+        for collection, operations in batch.operations.items():
+            await db[collection].bulk_write(operations, ordered=True, session=session)
+    else:
+        await asyncio.gather(*[
+            db[collection].bulk_write(operations, ordered=True)
+            for collection, operations in batch.operations.items()
+        ])
+
+    # Always touches the plan: the revision bump tells pollers the artifacts changed
+    await db.plans.update_one(
+        {"_id": to_object_id(batch.plan_id)},
+        with_revision_bump(batch.plan_update or {}),
+        session=session
+    )
+
+
+async def commit(db, batch: PlanWriteBatch):
+    """Apply a batch, atomically where the deployment allows"""
+    if await supports_transactions(db):
+        client = raw_database(db).client
+        async with await client.start_session() as session:
+            # with_transaction retries transient errors and unknown commit results
+            await session.with_transaction(lambda s: _apply(db, batch, s))
+        return
+
+    await _apply(db, batch)
@@ -0,0 +1,166 @@
+"""Plan aggregate loader - a plan and its related artifacts in one round trip
+
+Plan-scoped routes need the plan plus some of: its sections, financial model,
+research pack and compliance report. Fetching them one after another costs
+4-5 sequential round trips before any real work. load_plan_aggregate fetches
+the plan and the requested artifacts with a single aggregation ($lookup on
+plan_id, which child collections store as the plan's id string).
+
+Each artifact argument is False (skip), True (whole documents) or a
+projection dict for that use case:
+
+    aggregate = await load_plan_aggregate(
+        db, plan_id, user_id,
+        sections={"title": 1, "content": 1, "section_type": 1},
+        financial_model=True
+    )
+    if not aggregate:
+        raise HTTPException(status_code=404, detail="Plan not found")
+
+PLAN_LOADER_MODE=concurrent issues the queries in parallel instead (for
+servers without $lookup sub-pipelines); the aggregation also falls back to
+that if it fails.
+"""
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Union
+
+from utils.serializers import to_object_id
+
+logger = logging.getLogger(__name__)
+
+PLAN_LOADER_MODE = os.environ.get("PLAN_LOADER_MODE", "lookup").lower()
+
+Include = Union[bool, Dict]
+
+# attribute -> (collection, one document or many, sort)
+RELATED = {
+    "sections": ("sections", True, [("order_index", 1)]),
+    "financial_model": ("financial_models", False, None),
+    "research_pack": ("research_packs", False, None),
+    "compliance_report": ("compliance_reports", False, None),
+}
+
+
+@dataclass
+class PlanAggregate:
+    """A plan with the related artifacts that were requested"""
+    plan: Dict
+    sections: List[Dict] = field(default_factory=list)
+    financial_model: Optional[Dict] = None
+    research_pack: Optional[Dict] = None
+    compliance_report: Optional[Dict] = None
+
+    @property
+    def plan_id(self) -> str:
+        return str(self.plan["_id"])
+
+
+def _plan_filter(plan_id: str, user_id: Optional[str]) -> Dict:
+    query = {"_id": to_object_id(plan_id)}
+    if user_id is not None:
+        query["user_id"] = user_id
+    return query
+
+
+def _lookup_stage(name: str, include: Include) -> Dict:
+    collection, many, sort = RELATED[name]
+    pipeline = [{"$match": {"$expr": {"$eq": ["$plan_id", "$$plan_id"]}}}]
+    if sort:
+        pipeline.append({"$sort": dict(sort)})
+    if not many:
+        pipeline.append({"$limit": 1})
+    if isinstance(include, dict) and include:
+        pipeline.append({"$project": include})
+    return {"$lookup": {
+        "from": collection,
+        "let": {"plan_id": {"$toString": "$_id"}},
+        "pipeline": pipeline,
+        "as": f"__{name}"
+    }}
+
+
+async def _load_with_lookup(db, query: Dict, plan_projection: Optional[Dict], includes: Dict[str, Include]) -> Optional[PlanAggregate]:
+    pipeline = [{"$match": query}, {"$limit": 1}]
+    if plan_projection:
+        pipeline.append({"$project": plan_projection})
+    pipeline += [_lookup_stage(name, include) for name, include in includes.items()]
+
+    docs = await db.plans.aggregate(pipeline).to_list(1)
+    if not docs:
+        return None
+
+    plan = docs[0]
+    related = {}
+    for name in includes:
+        rows = plan.pop(f"__{name}", [])
+        related[name] = rows if RELATED[name][1] else (rows[0] if rows else None)
+    return PlanAggregate(plan=plan, **related)
+
+
+async def _load_concurrently(db, query: Dict, plan_projection: Optional[Dict], includes: Dict[str, Include]) -> Optional[PlanAggregate]:
+    plan_id = str(query["_id"])
+
+    def fetch(name: str, include: Include):
+        collection, many, sort = RELATED[name]
+        projection = include if isinstance(include, dict) and include else None
+        if many:
+            cursor = db[collection].find({"plan_id": plan_id}, projection)
+            if sort:
+                cursor = cursor.sort(sort)
+            return cursor.to_list(None)
+        return db[collection].find_one({"plan_id": plan_id}, projection)
+
+    # The plan and its artifacts are fetched together; the artifacts are
+    # discarded if the plan turns out not to exist (or not to be the user's)
+    results = await asyncio.gather(
+        db.plans.find_one(query, plan_projection),
+        *[fetch(name, include) for name, include in includes.items()]
+    )
+    plan = results[0]
+    if not plan:
+        return None
+    return PlanAggregate(plan=plan, **dict(zip(includes, results[1:])))
+
+
+async def load_plan_aggregate(
+    db,
+    plan_id: str,
+    user_id: Optional[str] = None,
+    *,
+    plan_projection: Optional[Dict] = None,
+    sections: Include = False,
+    financial_model: Include = False,
+    research_pack: Include = False,
+    compliance_report: Include = False
+) -> Optional[PlanAggregate]:
+    """
+    Load a plan (owned by `user_id` when given) with the requested artifacts.
+    Returns None when the plan does not exist or belongs to someone else.
+    """
+    includes = {
+        name: include
+        for name, include in (
+            ("sections", sections),
+            ("financial_model", financial_model),
+            ("research_pack", research_pack),
+            ("compliance_report", compliance_report),
+        )
+        if include
+    }
+    query = _plan_filter(plan_id, user_id)
+
+    if not includes:
+        plan = await db.plans.find_one(query, plan_projection)
+        return PlanAggregate(plan=plan) if plan else None
+
+    if PLAN_LOADER_MODE != "concurrent":
+        try:
+            return await _load_with_lookup(db, query, plan_projection, includes)
+        except Exception as e:
+            logger.warning(f"Plan aggregate $lookup failed, loading concurrently: {e}")
+
+    return await _load_concurrently(db, query, plan_projection, includes)
@@ -0,0 +1,360 @@
+"""Materialized plan metrics - analytics maintained on write
+
+Analytics, achievements, plan comparison and the readiness breakdown all
+derive from the same few numbers: how many sections a plan has, how many are
+complete, their words, citations and user edits, a handful of per-section
+readiness factors and the shape of the financial model. These used to be
+recounted from every section's content on each read, and the analytics GET
+wrote its result back into the plan every time.
+
+Now each section carries its own `metrics`, computed when the section is
+created or edited, and the plan keeps running totals under `metrics`:
+
+- section edits and inserts fold the difference between the section's old
+  and new metrics into the totals with one $inc (section_write_update;
+  record_section_write applies it together with the plan revision bump).
+  The old metrics are the ones the write itself replaced (find_one_and_update
+  returning the document before), never an earlier read. A readiness
+  category takes the score of its first section: the totals record that
+  section's order_index, and a write only sets the score when it is at or
+  before it (readiness_updates);
+- writes that replace every section (generation, version restores) set the
+  totals recomputed from the new sections (plan_metrics / section_totals);
+- plans written before the totals existed are backfilled once, on their
+  first read (load_plan_metrics).
+
+Readers fetch the totals with a projection and score them in Python:
+
+    totals = (await load_plan_metrics(db, [plan]))[0]
+    quality = sum(quality_breakdown(totals).values())
+
+Incremental updates only apply to totals at METRICS_VERSION; bump it when a
+formula changes and every plan is recomputed on its next read (section
+metrics carry the version too, and older ones are recomputed from content).
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from utils.plan_revision import bump_plan_revision, with_revision_bump
+from utils.serializers import to_object_id
+
+METRICS_FIELD = "metrics"
+METRICS_VERSION = 2
+
+# Section fields the metrics are computed from
+SECTION_METRICS_PROJECTION = {
+    "section_type": 1, "title": 1, "content": 1, "data_citations": 1,
+    "edited_by_user": 1, "created_at": 1, "order_index": 1, METRICS_FIELD: 1
+}
+
+# The same fields without content, which is all a content edit leaves unchanged
+SECTION_SCORING_PROJECTION = {"section_type": 1, "title": 1, "data_citations": 1, "edited_by_user": 1}
+
+# Per-section counts that are summed into the plan totals
+COUNTED = ("words", "citations", "completed", "edited", "mentions_risk")
+
+COMPETITIVE_TYPES = ("competitive_analysis", "competitor_analysis", "competitors_analysis", "competition_analysis")
+
+
+# ============================================================================
+# PER-SECTION METRICS
+# ============================================================================
+
+def readiness_categories(section: Dict) -> List[str]:
+    """Readiness categories the section scores for (from its type and title).
+    Any section with "risk" in its type or title also counts as the risk
+    section, next to the category of its type."""
+    section_type = section.get("section_type") or ""
+    categories = []
+    normalized = section_type.lower().strip().replace(" ", "_")
+    if section_type == "executive_summary":
+        categories.append("executive_summary")
+    elif section_type == "market_analysis":
+        categories.append("market_analysis")
+    elif section_type == "team":
+        categories.append("team_management")
+    elif normalized in COMPETITIVE_TYPES or ("competitor" in normalized and "analysis" in normalized):
+        categories.append("competitive_analysis")
+    if "risk" in section_type.lower() or "risk" in (section.get("title") or "").lower():
+        categories.append("risk_assessment")
+    return categories
+
+
+def _category_score(category: str, section: Dict, content: str, words: int) -> int:
+    lowered = content.lower()
+
+    if category == "executive_summary":
+        score = 20
+        if words < 200:
+            score -= 5  # Too short
+        if words > 1000:
+            score -= 3  # Too long
+        for keywords in (("vision", "mission", "goal"), ("market", "opportunity", "demand"),
+                         ("revenue", "profit", "funding", "investment"), ("team", "founder", "management")):
+            if not any(word in lowered for word in keywords):
+                score -= 3
+    elif category == "market_analysis":
+        score = 15
+        if len(section.get("data_citations") or []) >= 3:
+            score += 3  # Good data sources
+        if words >= 500:
+            score += 2  # Comprehensive
+        if words < 300:
+            score -= 5  # Too brief
+    elif category == "team_management":
+        score = 10
+        if words >= 300:
+            score += 2  # Detailed
+        if any(word in lowered for word in ("experience", "background", "qualification")):
+            score += 2  # Mentions experience
+        if words < 150:
+            score -= 5  # Too brief
+    elif category == "competitive_analysis":
+        score = 10
+        if words >= 400:
+            score += 3  # Comprehensive
+        if any(word in lowered for word in ("competitor", "competitive", "advantage", "differentiator")):
+            score += 2  # Mentions competition
+        if words < 200:
+            score -= 5  # Too brief
+    else:  # risk_assessment
+        score = 10
+        if words >= 300:
+            score += 3  # Detailed risk analysis
+        if any(word in lowered for word in ("mitigation", "strategy", "solution")):
+            score += 2  # Mentions mitigation
+        if words < 150:
+            score -= 5  # Too brief
+    return score
+
+
+def section_metrics(section: Dict) -> Dict:
+    """Metrics to store on a section, from its content, citations and edit flag"""
+    content = section.get("content") or ""
+    words = len(content.split())
+    return {
+        "v": METRICS_VERSION,
+        "words": words,
+        "citations": len(section.get("data_citations") or []),
+        "completed": int(len(content.strip()) > 50),
+        "edited": int(bool(section.get("edited_by_user"))),
+        "mentions_risk": int("risk" in content.lower()),
+        # Score per readiness category the section scores for
+        "readiness": {
+            category: _category_score(category, section, content, words)
+            for category in readiness_categories(section)
+        }
+    }
+
+
+def financial_metrics(financial_model: Optional[Dict]) -> Dict:
+    """Shape of the plan's financial model, as the quality and readiness scores read it"""
+    if not financial_model:
+        return {"present": False}
+    data = financial_model.get("data") or {}
+    return {
+        "present": True,
+        "pnl_months": len(data.get("pnl_monthly") or []),
+        "cashflow_months": len(data.get("cashflow_monthly") or []),
+        "break_even": bool((data.get("break_even") or {}).get("months_to_break_even")),
+        "kpis": bool(data.get("kpis"))
+    }
+
+
+# ============================================================================
+# PLAN TOTALS
+# ============================================================================
+
+def _order(section: Dict) -> float:
+    # Sections without an order_index sort first, as they do in Mongo
+    order_index = section.get("order_index")
+    return order_index if isinstance(order_index, (int, float)) else -1
+
+
+def section_totals(sections: List[Dict]) -> Dict:
+    """Totals over a plan's sections (in order); each must carry its `metrics`"""
+    totals = {
+        "sections": len(sections), **{key: 0 for key in COUNTED},
+        "readiness": {}, "readiness_order": {}, "first_section_at": None
+    }
+    for section in sections:
+        metrics = section[METRICS_FIELD]
+        for key in COUNTED:
+            totals[key] += metrics[key]
+        for category, score in metrics["readiness"].items():
+            # The first section of a category is the one scored; its
+            # order_index tells later writes whether they replace it
+            if category not in totals["readiness"]:
+                totals["readiness"][category] = score
+                totals["readiness_order"][category] = _order(section)
+        created_at = section.get("created_at")
+        if isinstance(created_at, datetime) and (totals["first_section_at"] is None or created_at < totals["first_section_at"]):
+            totals["first_section_at"] = created_at
+    totals["updated_at"] = datetime.utcnow()
+    return totals
+
+
+def plan_metrics(sections: List[Dict], financial_model: Optional[Dict]) -> Dict:
+    """Complete totals document for a plan"""
+    return {"v": METRICS_VERSION, **section_totals(sections), "financial": financial_metrics(financial_model)}
+
+
+def _metrics_of(section: Dict) -> Dict:
+    # Sections written before metrics existed (or under an older formula) are
+    # scored from their content
+    metrics = section.get(METRICS_FIELD)
+    if metrics and metrics.get("v") == METRICS_VERSION:
+        return metrics
+    return section_metrics(section)
+
+
+def section_write_update(before: Optional[Dict], after: Dict) -> Dict:
+    """Plan update folding a section edit (`before` -> `after`) or insert
+    (`before` None) into the totals. `after` carries its new `metrics`."""
+    new = after[METRICS_FIELD]
+    old = _metrics_of(before) if before else None
+
+    inc = {f"{METRICS_FIELD}.{key}": new[key] - (old[key] if old else 0) for key in COUNTED}
+    inc[f"{METRICS_FIELD}.sections"] = 0 if before else 1
+    update = {"$inc": inc, "$set": {f"{METRICS_FIELD}.updated_at": datetime.utcnow()}}
+    if not before and isinstance(after.get("created_at"), datetime):
+        update["$min"] = {f"{METRICS_FIELD}.first_section_at": after["created_at"]}
+    return update
+
+
+def readiness_updates(section: Dict, metrics: Dict) -> List[Tuple[Dict, Dict]]:
+    """(plan filter, update) pairs setting the section's readiness scores in
+    the categories where it is the first section (order_index at or before
+    the current one's); `section` is the written section, for its position"""
+    order = _order(section)
+    return [
+        ({f"{METRICS_FIELD}.readiness_order.{category}": {"$not": {"$lt": order}}},
+         {"$set": {f"{METRICS_FIELD}.readiness.{category}": score,
+                   f"{METRICS_FIELD}.readiness_order.{category}": order}})
+        for category, score in metrics["readiness"].items()
+    ]
+
+
+async def record_section_write(db, plan_id: str, before: Optional[Dict], after: Dict):
+    """Apply section_write_update to the plan's totals, with the revision bump.
+    `before` must be the section as the write replaced it (find_one_and_update
+    with ReturnDocument.BEFORE), so overlapping writes each fold in their own
+    difference; inserts pass the new section as `after`."""
+    plan_filter = {"_id": to_object_id(plan_id), f"{METRICS_FIELD}.v": METRICS_VERSION}
+    result = await db.plans.update_one(plan_filter, with_revision_bump(section_write_update(before, after)))
+    if result.matched_count == 0:
+        # No totals yet: they are backfilled on the next read
+        await bump_plan_revision(db, plan_id)
+        return
+    # Each update only matches when this section leads its category, so
+    # no other section needs to be read
+    for leader_filter, update in readiness_updates(before or after, after[METRICS_FIELD]):
+        await db.plans.update_one({**plan_filter, **leader_filter}, update)
+
+
+async def backfill_plan_metrics(db, plan_id: str) -> Dict:
+    """Compute and store the totals of a plan that has none (or outdated ones)"""
+    sections, financial_model = await asyncio.gather(
+        db.sections.find({"plan_id": plan_id}, SECTION_METRICS_PROJECTION).sort("order_index", 1).to_list(None),
+        db.financial_models.find_one({"plan_id": plan_id}, {"data": 1})
+    )
+    for section in sections:
+        section[METRICS_FIELD] = _metrics_of(section)
+    totals = plan_metrics(sections, financial_model)
+    await db.plans.update_one({"_id": to_object_id(plan_id)}, {"$set": {METRICS_FIELD: totals}})
+    return totals
+
+
+async def load_plan_metrics(db, plans: List[Dict]) -> List[Dict]:
+    """Totals for each plan (fetched with its `metrics`), backfilling where missing"""
+    stale = [p for p in plans if (p.get(METRICS_FIELD) or {}).get("v") != METRICS_VERSION]
+    if stale:
+        backfilled = await asyncio.gather(*[backfill_plan_metrics(db, str(p["_id"])) for p in stale])
+        for plan, totals in zip(stale, backfilled):
+            plan[METRICS_FIELD] = totals
+    return [p[METRICS_FIELD] for p in plans]
+
+
+# ============================================================================
+# SCORES
+# ============================================================================
+
+def completion_percent(totals: Dict) -> int:
+    sections = totals.get("sections", 0)
+    return int(totals.get("completed", 0) / sections * 100) if sections > 0 else 0
+
+
+def quality_breakdown(totals: Dict) -> Dict[str, int]:
+    """Quality factors, 0-25 points each"""
+    sections = totals.get("sections", 0)
+    financial = totals.get("financial") or {}
+
+    if not financial.get("present"):
+        financial_completeness = 0
+    elif financial["pnl_months"] >= 12 and financial["cashflow_months"] >= 12:
+        financial_completeness = 25
+    elif financial["pnl_months"] >= 6 and financial["cashflow_months"] >= 6:
+        financial_completeness = 15
+    else:
+        financial_completeness = 5
+
+    if sections == 0:
+        return {"section_length": 0, "financial_completeness": financial_completeness, "detail_level": 0, "user_engagement": 0}
+
+    return {
+        # Target: 500 words per section average
+        "section_length": min(25, int((totals["words"] / sections / 500) * 25)),
+        "financial_completeness": financial_completeness,
+        # Target: 3 citations per section
+        "detail_level": min(25, int((totals["citations"] / sections / 3) * 25)),
+        "user_engagement": int(totals["edited"] / sections * 25)
+    }
+
+
+def readiness_breakdown(totals: Dict) -> Dict[str, int]:
+    """Deterministic investment readiness factors (see routes/readiness_score)"""
+    readiness = totals.get("readiness") or {}
+    financial = totals.get("financial") or {}
+    breakdown = {}
+
+    breakdown["executive_summary"] = readiness.get("executive_summary", 0)
+    breakdown["market_analysis"] = readiness.get("market_analysis", 0)
+
+    financial_score = 0
+    if financial.get("present"):
+        financial_score = 25
+        if financial["pnl_months"] >= 12:
+            financial_score += 5  # 12+ months of projections
+        if financial["cashflow_months"] >= 12:
+            financial_score += 5  # Cash flow projections
+        if financial["break_even"]:
+            financial_score += 5  # Break-even analysis
+        if financial["kpis"]:
+            financial_score += 5  # KPIs included
+    breakdown["financial_projections"] = financial_score
+
+    breakdown["team_management"] = readiness.get("team_management", 0)
+    breakdown["competitive_analysis"] = readiness.get("competitive_analysis", 0)
+
+    risk_score = readiness.get("risk_assessment")
+    if risk_score is None:
+        # Partial credit when risks are mentioned in other sections
+        risk_score = 5 if totals.get("mentions_risk", 0) > 0 else 0
+    breakdown["risk_assessment"] = risk_score
+
+    presentation_score = 10
+    sections = totals.get("sections", 0)
+    completion_rate = totals.get("completed", 0) / sections if sections > 0 else 0
+    if completion_rate >= 0.9:
+        presentation_score += 3  # Nearly complete
+    elif completion_rate >= 0.7:
+        presentation_score += 1  # Mostly complete
+    elif completion_rate < 0.5:
+        presentation_score -= 5  # Incomplete
+    if totals.get("edited", 0) > 0:
+        presentation_score += 2  # User has polished content
+    breakdown["presentation"] = presentation_score
+
+    return {category: max(0, min(100, score)) for category, score in breakdown.items()}
@@ -0,0 +1,111 @@
+"""Plan revisions - ETags and 304s for plan-scoped reads
+
+The frontend polls a plan, its sections, financials, charts and generation
+status, and used to receive (and make us build) the full payload every time.
+Each plan now carries a `revision` counter that every write to the plan or
+its content bumps:
+
+- writes to the plan document add the increment to the same update
+  (with_revision_bump);
+- writes to its generated artifacts call bump_plan_revision, section writes
+  bump it with their metric totals (utils/plan_metrics.record_section_write);
+- PlanWriteBatch commits (generation, restores) bump it with the plan update.
+
+Plan-scoped GETs start with get_plan_revision, one _id lookup that returns only
+the revision (and doubles as the ownership check). The ETag is derived from
+the revision and the request's path and query, so every view or page has its
+own tag. A matching If-None-Match gets an empty 304 before anything else is
+read:
+
+    revision = await get_plan_revision(request, db, plan_id, user_id)
+    if revision.not_modified:
+        return revision.not_modified_response()
+    ...
+    return revision.respond(content)
+
+The revision is read before the content, so a concurrent write can only make
+a response newer than its tag. The client refetches once and never keeps a
+stale copy.
+"""
+
+import hashlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException, Request, Response
+
+from utils.json_response import MongoJSONResponse
+from utils.serializers import to_object_id
+
+REVISION_FIELD = "revision"
+
+# Clients must revalidate on every poll; the 304 makes that cheap
+CACHE_CONTROL = "private, no-cache"
+
+
+def with_revision_bump(update: Dict) -> Dict:
+    """`update` for the plan document, plus the revision increment"""
+    return {**update, "$inc": {**update.get("$inc", {}), REVISION_FIELD: 1}}
+
+
+async def bump_plan_revision(db, plan_id: str):
+    """Record a write to the plan's sections or generated artifacts"""
+    await db.plans.update_one({"_id": to_object_id(plan_id)}, {"$inc": {REVISION_FIELD: 1}})
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    # Weak comparison (RFC 9110 13.1.2): W/ prefixes are ignored
+    opaque = etag.removeprefix("W/")
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+@dataclass
+class PlanRevision:
+    plan_id: str
+    revision: int
+    etag: str
+    not_modified: bool
+    # Extra plan fields requested from the revision check
+    plan: Dict = field(default_factory=dict)
+
+    def _headers(self) -> Dict[str, str]:
+        return {"ETag": self.etag, "Cache-Control": CACHE_CONTROL}
+
+    def not_modified_response(self) -> Response:
+        return Response(status_code=304, headers=self._headers())
+
+    def respond(self, content) -> MongoJSONResponse:
+        return MongoJSONResponse(content, headers=self._headers())
+
+
+async def get_plan_revision(
+    request: Request,
+    db,
+    plan_id: str,
+    user_id: str,
+    fields: Optional[List[str]] = None
+) -> PlanRevision:
+    """Revision of a plan the user owns (404 otherwise) and the request's ETag for it"""
+    projection = {REVISION_FIELD: 1, **{name: 1 for name in fields or []}}
+    plan = await db.plans.find_one({"_id": to_object_id(plan_id), "user_id": user_id}, projection)
+    if not plan:
+        raise HTTPException(status_code=404, detail="Plan not found")
+
+    revision = plan.get(REVISION_FIELD, 0)
+    representation = f"{request.url.path}?{'&'.join(sorted(request.url.query.split('&')))}"
+    digest = hashlib.sha1(representation.encode("utf-8")).hexdigest()[:12]
+    etag = f'W/"{revision}-{digest}"'
+
+    return PlanRevision(
+        plan_id=plan_id,
+        revision=revision,
+        etag=etag,
+        not_modified=_etag_matches(request.headers.get("if-none-match"), etag),
+        plan=plan
+    )
@@ -0,0 +1,198 @@
+"""Plan version history - text deltas with periodic keyframes
+
+Each content edit used to store a full copy of every section. Versions are now
+one of:
+
+- keyframe: the full section list (every PLAN_VERSION_KEYFRAME_INTERVAL
+  versions, for a plan's first version, and whenever sections changed outside
+  the version history - regeneration, restores);
+- delta: a line delta (utils/text_delta) for the edited section against the
+  previous version.
+
+Every version also records each section's content digest, which is how an edit
+can tell that the previous version still describes the sections exactly (and a
+delta is safe) without loading any content. Sections stored before digests
+existed are hashed from their content instead, and get their digest stored when
+the next keyframe is written. Version numbers come from an
+atomic counter on the plan document. reconstruct_sections rebuilds any version
+on demand from its keyframe plus at most INTERVAL - 1 deltas, fetched in one
+query.
+"""
+
+import logging
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+
+from utils.content_ast import content_ast_fields, content_digest
+from utils.serializers import to_object_id
+from utils.text_delta import apply_delta, text_delta
+
+logger = logging.getLogger(__name__)
+
+KEYFRAME_INTERVAL = int(os.environ.get("PLAN_VERSION_KEYFRAME_INTERVAL", "20"))
+
+# Version listings: metadata only
+VERSION_LIST_PROJECTION = {"sections": 0, "section_deltas": 0, "sections_snapshot": 0, "digests": 0}
+
+# Section fields kept in keyframes (derived AST fields are rebuilt on restore)
+_KEYFRAME_EXCLUDE = {"_id", "plan_id", "content_ast", "content_digest"}
+
+
+def _section_digest(section: Dict) -> str:
+    return section.get("content_digest") or content_digest(section.get("content") or "")
+
+
+def _keyframe_section(section: Dict) -> Dict:
+    entry = {key: value for key, value in section.items() if key not in _KEYFRAME_EXCLUDE}
+    entry["id"] = str(section["_id"])
+    return entry
+
+
+async def next_version_number(db, plan_id: str) -> int:
+    """Allocate the plan's next version number atomically"""
+    plan_oid = to_object_id(plan_id)
+    plan = await db.plans.find_one_and_update(
+        {"_id": plan_oid, "version_counter": {"$exists": True}},
+        {"$inc": {"version_counter": 1}},
+        projection={"version_counter": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if plan is None:
+        # First version since counters were introduced: continue after any existing history
+        latest = await db.plan_versions.find_one(
+            {"plan_id": plan_id}, {"version_number": 1}, sort=[("version_number", -1)]
+        )
+        await db.plans.update_one(
+            {"_id": plan_oid, "version_counter": {"$exists": False}},
+            {"$set": {"version_counter": latest["version_number"] if latest else 0}}
+        )
+        plan = await db.plans.find_one_and_update(
+            {"_id": plan_oid},
+            {"$inc": {"version_counter": 1}},
+            projection={"version_counter": 1},
+            return_document=ReturnDocument.AFTER
+        )
+    return plan["version_counter"]
+
+
+async def record_version(
+    db,
+    plan_id: str,
+    user_id: str,
+    section_id: str,
+    old_content: str,
+    new_content: str
+) -> Dict:
+    """Store the version produced by editing one section's content (call after the update)"""
+    version_number = await next_version_number(db, plan_id)
+
+    # Digests only: enough to decide between a delta and a keyframe
+    digests = await _section_digests(db, plan_id)
+    digests[section_id] = content_digest(new_content)
+
+    previous = await db.plan_versions.find_one(
+        {"plan_id": plan_id, "version_number": version_number - 1},
+        {"digests": 1, "keyframe_version": 1}
+    )
+
+    version_doc = {
+        "plan_id": plan_id,
+        "version_number": version_number,
+        "created_by": user_id,
+        "changes": [{
+            "section_id": section_id,
+            "field": "content",
+            "old_value": (old_content or "")[:200],  # First 200 chars
+            "new_value": new_content[:200]
+        }],
+        "digests": digests,
+        "created_at": datetime.utcnow()
+    }
+
+    if _can_delta(previous, digests, section_id, old_content, version_number):
+        version_doc.update({
+            "kind": "delta",
+            "keyframe_version": previous["keyframe_version"],
+            "section_deltas": {section_id: text_delta(old_content, new_content)}
+        })
+    else:
+        full_sections = await db.sections.find(
+            {"plan_id": plan_id}, {"content_ast": 0}
+        ).sort("order_index", 1).to_list(None)
+        version_doc.update({
+            "kind": "keyframe",
+            "keyframe_version": version_number,
+            "sections": [_keyframe_section(s) for s in full_sections],
+            "digests": {str(s["_id"]): _section_digest(s) for s in full_sections}
+        })
+        await _backfill_digests(db, full_sections)
+
+    await db.plan_versions.insert_one(version_doc)
+    return version_doc
+
+
+async def _section_digests(db, plan_id: str) -> Dict[str, str]:
+    """Content digest of every section of the plan, by section id"""
+    sections = await db.sections.find({"plan_id": plan_id}, {"content_digest": 1}).to_list(None)
+    digests = {str(s["_id"]): s.get("content_digest") for s in sections}
+    # Sections stored before digests existed are hashed from their content,
+    # as keyframes do (see _section_digest)
+    missing = [s["_id"] for s in sections if not s.get("content_digest")]
+    if missing:
+        legacy = await db.sections.find({"_id": {"$in": missing}}, {"content": 1}).to_list(None)
+        digests.update({str(s["_id"]): _section_digest(s) for s in legacy})
+    return digests
+
+
+async def _backfill_digests(db, sections: List[Dict]):
+    """Store the derived AST fields on sections written before they existed,
+    so later edits compare digests without loading content"""
+    for section in sections:
+        if not section.get("content_digest"):
+            await db.sections.update_one(
+                {"_id": section["_id"], "content_digest": {"$exists": False}},
+                {"$set": content_ast_fields(section.get("content", ""))}
+            )
+
+
+def _can_delta(previous: Optional[Dict], digests: Dict, section_id: str, old_content: str, version_number: int) -> bool:
+    """A delta is valid only if the previous version matches the pre-edit sections exactly"""
+    if not previous or "digests" not in previous or "keyframe_version" not in previous:
+        return False
+    if version_number - previous["keyframe_version"] >= KEYFRAME_INTERVAL:
+        return False
+    expected = dict(previous["digests"])
+    if expected.get(section_id) != content_digest(old_content or ""):
+        return False
+    expected[section_id] = digests[section_id]
+    return expected == digests
+
+
+async def reconstruct_sections(db, plan_id: str, version: Dict) -> List[Dict]:
+    """Sections (each with its "id") as they were at `version`"""
+    if "sections_snapshot" in version:
+        # Versions written before delta encoding
+        return version["sections_snapshot"]
+    if version.get("kind") == "keyframe":
+        return version["sections"]
+
+    chain = await db.plan_versions.find({
+        "plan_id": plan_id,
+        "version_number": {"$gte": version["keyframe_version"], "$lte": version["version_number"]}
+    }).sort("version_number", 1).to_list(None)
+
+    expected = list(range(version["keyframe_version"], version["version_number"] + 1))
+    if [v["version_number"] for v in chain] != expected or chain[0].get("kind") != "keyframe":
+        logger.error(f"Version chain broken for plan {plan_id} at version {version['version_number']}")
+        raise HTTPException(status_code=500, detail="Version history is incomplete")
+
+    sections = {s["id"]: dict(s) for s in chain[0]["sections"]}
+    for delta in chain[1:]:
+        for section_id, ops in delta.get("section_deltas", {}).items():
+            section = sections[section_id]
+            section["content"] = apply_delta(section.get("content", ""), ops)
+    return sorted(sections.values(), key=lambda s: s.get("order_index", 999))
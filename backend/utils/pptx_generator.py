@@ -0,0 +1,141 @@
+"""
+Pitch Deck PPTX Generator
+Renders slide JSON (title/content pairs) into a branded PowerPoint deck
+"""
+
+from io import BytesIO
+from typing import Dict, List, Optional
+
+from pptx import Presentation
+from pptx.util import Inches, Pt
+from pptx.enum.text import PP_ALIGN
+from pptx.enum.shapes import MSO_SHAPE
+from pptx.dml.color import RGBColor
+
+from utils.content_ast import parse_content, iter_text_lines
+
+PPTX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+# Bump whenever the slide layout changes so stored decks are re-rendered
+DECK_RENDERER_VERSION = "1"
+
+DEFAULT_PRIMARY_COLOR = RGBColor(0, 22, 57)
+DEFAULT_SECONDARY_COLOR = RGBColor(59, 130, 246)
+TEXT_COLOR = RGBColor(71, 85, 105)  # Slate gray text
+SLIDE_NUMBER_COLOR = RGBColor(148, 163, 184)
+WHITE = RGBColor(255, 255, 255)
+
+
+def _hex_to_rgb(hex_color: str) -> RGBColor:
+    """Convert hex color to RGBColor"""
+    hex_color = hex_color.lstrip('#')
+    r = int(hex_color[0:2], 16)
+    g = int(hex_color[2:4], 16)
+    b = int(hex_color[4:6], 16)
+    return RGBColor(r, g, b)
+
+
+def _slide_text(content) -> str:
+    """Slide content as text - the model returns either a string or a list of bullets"""
+    if isinstance(content, list):
+        return '\n'.join(str(item) for item in content)
+    if not isinstance(content, str):
+        return str(content)
+    return content
+
+
+def build_presentation(slides_data: List[Dict], branding: Optional[Dict] = None) -> bytes:
+    """
+    Render slides into a PPTX deck.
+
+    Args:
+        slides_data: List of {"title", "content"} slides; the first is the title slide
+        branding: Optional branding config (primary_color, secondary_color)
+
+    Returns:
+        bytes: The PPTX file
+    """
+    branding = branding or {}
+
+    prs = Presentation()
+    prs.slide_width = Inches(10)
+    prs.slide_height = Inches(7.5)
+
+    # Set branding colors
+    primary_color = _hex_to_rgb(branding["primary_color"]) if branding.get("primary_color") else DEFAULT_PRIMARY_COLOR
+    secondary_color = _hex_to_rgb(branding["secondary_color"]) if branding.get("secondary_color") else DEFAULT_SECONDARY_COLOR
+
+    # Create slides with professional design
+    for idx, slide_data in enumerate(slides_data):
+        slide = prs.slides.add_slide(prs.slide_layouts[6])  # Blank layout
+
+        # Add background rectangle for visual appeal
+        if idx == 0:  # Title slide gets special treatment
+            bg_shape = slide.shapes.add_shape(
+                MSO_SHAPE.RECTANGLE,
+                Inches(0), Inches(0), Inches(10), Inches(2.5)
+            )
+            bg_shape.fill.solid()
+            bg_shape.fill.fore_color.rgb = primary_color
+            bg_shape.line.fill.background()
+        else:
+            # Subtle top accent bar for other slides
+            accent_bar = slide.shapes.add_shape(
+                MSO_SHAPE.RECTANGLE,
+                Inches(0), Inches(0), Inches(10), Inches(0.3)
+            )
+            accent_bar.fill.solid()
+            accent_bar.fill.fore_color.rgb = secondary_color
+            accent_bar.line.fill.background()
+
+        # Add title with better styling
+        if slide_data.get("title"):
+            title_y = Inches(0.6) if idx == 0 else Inches(0.5)
+            title_height = Inches(1.2) if idx == 0 else Inches(0.8)
+            title_box = slide.shapes.add_textbox(Inches(0.75), title_y, Inches(8.5), title_height)
+            title_frame = title_box.text_frame
+            title_frame.text = slide_data["title"]
+            title_para = title_frame.paragraphs[0]
+            title_para.font.size = Pt(44) if idx == 0 else Pt(36)
+            title_para.font.bold = True
+            title_para.font.color.rgb = WHITE if idx == 0 else primary_color
+            title_para.alignment = PP_ALIGN.LEFT
+            title_para.space_after = Pt(0)
+
+        # Add content with better formatting
+        if slide_data.get("content"):
+            content_y = Inches(2.8) if idx == 0 else Inches(1.6)
+            content_height = Inches(4.5) if idx == 0 else Inches(5.5)
+            content_box = slide.shapes.add_textbox(Inches(0.75), content_y, Inches(8.5), content_height)
+            content_frame = content_box.text_frame
+            content_frame.word_wrap = True
+            content_frame.margin_left = Inches(0)
+            content_frame.margin_right = Inches(0)
+            content_frame.margin_top = Inches(0)
+            content_frame.margin_bottom = Inches(0)
+
+            # Bullet markers are stripped by the content parser
+            content_text = _slide_text(slide_data["content"])
+            for line_idx, (line, _is_bullet) in enumerate(iter_text_lines(parse_content(content_text))):
+                p = content_frame.add_paragraph() if line_idx > 0 else content_frame.paragraphs[0]
+                p.text = line
+                p.level = 0
+                p.font.size = Pt(20) if idx == 0 else Pt(18)
+                p.font.color.rgb = WHITE if idx == 0 else TEXT_COLOR
+                p.space_after = Pt(14)
+                p.space_before = Pt(0)
+
+        # Add slide number (except on title slide)
+        if idx > 0:
+            slide_num_shape = slide.shapes.add_textbox(Inches(9), Inches(7), Inches(0.8), Inches(0.3))
+            slide_num_frame = slide_num_shape.text_frame
+            slide_num_frame.text = f"{idx}"
+            slide_num_para = slide_num_frame.paragraphs[0]
+            slide_num_para.font.size = Pt(14)
+            slide_num_para.font.color.rgb = SLIDE_NUMBER_COLOR
+            slide_num_para.alignment = PP_ALIGN.RIGHT
+
+    # Save to bytes
+    buffer = BytesIO()
+    prs.save(buffer)
+    return buffer.getvalue()
@@ -0,0 +1,162 @@
+"""Principal resolution - who is calling, cached
+
+Every authenticated request needs the caller's user id; admin routes also need
+their user document (role) and export routes their subscription tier. This
+module is the single implementation of those dependencies:
+
+- Verified tokens are kept in a bounded LRU until their `exp`, so a token is
+  decoded (signature checked) once, not on every request.
+- User documents (minus the password hash) and subscription tiers are cached
+  for PRINCIPAL_CACHE_TTL seconds. Code that changes a user's role, profile or
+  tier calls invalidate_principal(user_id) so this process sees the change
+  immediately; other serverless instances see it within the TTL.
+
+Steady-state authentication is therefore a dict lookup and no database query.
+Counters that gate quotas (plans_created_this_month, ...) are never cached;
+routes that enforce them still read the subscription.
+"""
+
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from fastapi import Depends, Header, HTTPException
+
+from utils.auth import decode_token
+from utils.dependencies import get_db
+from utils.serializers import to_object_id
+
+logger = logging.getLogger(__name__)
+
+TOKEN_CACHE_SIZE = int(os.environ.get("AUTH_TOKEN_CACHE_SIZE", "4096"))
+PRINCIPAL_CACHE_SIZE = int(os.environ.get("PRINCIPAL_CACHE_SIZE", "4096"))
+PRINCIPAL_CACHE_TTL = float(os.environ.get("PRINCIPAL_CACHE_TTL", "300"))
+
+
+class _ExpiringLRU:
+    """Bounded LRU whose entries carry their own expiry (epoch seconds)"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, object]]" = OrderedDict()
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value, expires_at: float):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: str):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+_tokens = _ExpiringLRU(TOKEN_CACHE_SIZE)
+_users = _ExpiringLRU(PRINCIPAL_CACHE_SIZE)
+_tiers = _ExpiringLRU(PRINCIPAL_CACHE_SIZE)
+
+
+# ============================================================================
+# TOKENS
+# ============================================================================
+
+def verify_token(token: str) -> Optional[Dict]:
+    """Token payload if the token is valid, from cache until it expires"""
+    payload = _tokens.get(token)
+    if payload is not None:
+        return payload
+    payload = decode_token(token)
+    if payload and payload.get("exp"):
+        _tokens.set(token, payload, float(payload["exp"]))
+    return payload
+
+
+async def get_current_user_id(authorization: Optional[str] = Header(None)):
+    """Extract user_id from JWT token"""
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Missing authorization header")
+
+    try:
+        scheme, token = authorization.split()
+        if scheme.lower() != 'bearer':
+            raise HTTPException(status_code=401, detail="Invalid authentication scheme")
+
+        payload = verify_token(token)
+        if not payload:
+            raise HTTPException(status_code=401, detail="Invalid token")
+
+        user_id = payload.get("sub")
+        if not user_id:
+            raise HTTPException(status_code=401, detail="Invalid token payload")
+
+        return user_id
+    except HTTPException:
+        raise
+    except ValueError:
+        raise HTTPException(status_code=401, detail="Invalid authorization header format")
+    except Exception as e:
+        logger.error(f"Auth error: {e}")
+        raise HTTPException(status_code=401, detail="Authentication failed")
+
+
+# ============================================================================
+# USER AND ENTITLEMENTS
+# ============================================================================
+
+async def get_principal_user(db, user_id: str) -> Optional[Dict]:
+    """User document without password hash (cached)"""
+    user = _users.get(user_id)
+    if user is None:
+        user = await db.users.find_one({"_id": to_object_id(user_id)}, {"password_hash": 0})
+        if user is None:
+            return None
+        _users.set(user_id, user, time.time() + PRINCIPAL_CACHE_TTL)
+    return user
+
+
+async def get_subscription_tier(db, user_id: str) -> Optional[str]:
+    """Subscription tier, or None without a subscription (cached)"""
+    tier = _tiers.get(user_id)
+    if tier is None:
+        subscription = await db.subscriptions.find_one({"user_id": user_id}, {"tier": 1})
+        if not subscription:
+            return None
+        tier = subscription.get("tier", "free")
+        _tiers.set(user_id, tier, time.time() + PRINCIPAL_CACHE_TTL)
+    return tier
+
+
+def invalidate_principal(user_id: str):
+    """Forget cached user and tier data after a role, profile or subscription change"""
+    _users.pop(str(user_id))
+    _tiers.pop(str(user_id))
+
+
+async def get_current_admin_user(
+    user_id: str = Depends(get_current_user_id),
+    db = Depends(get_db)
+):
+    """Get current user and verify admin role - use as dependency"""
+    user = await get_principal_user(db, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    if user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    return user
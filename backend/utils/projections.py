@@ -0,0 +1,70 @@
+"""Named field projections ("views") for read endpoints
+
+List and read endpoints take a `view` query parameter selecting which fields
+Mongo returns, so dashboards and outlines do not pull full documents over the
+wire only to throw most of them away:
+
+    projection = resolve_view("plans", view)
+    plans = await db.plans.find({"user_id": user_id}, projection)...
+
+Views are enforced in the query projection, never by trimming documents after
+they have been fetched. "full" keeps the endpoint's historical response (minus
+internal fields); it is the default wherever clients rely on whole documents.
+"""
+
+from typing import Dict, Optional
+
+from fastapi import HTTPException, Query
+
+from utils.content_ast import SECTION_AST_PROJECTION
+
+VIEWS: Dict[str, Dict[str, Optional[Dict]]] = {
+    "plans": {
+        # Dashboard cards: no intake answers, cached analytics or AI blobs
+        "summary": {
+            "name": 1, "status": 1, "plan_purpose": 1, "company_id": 1,
+            "intake_data.business_name": 1, "intake_data.industry": 1,
+            "created_at": 1, "updated_at": 1, "completed_at": 1
+        },
+        "full": None,
+    },
+    "sections": {
+        # Editor sidebar / table of contents
+        "outline": {
+            "plan_id": 1, "section_type": 1, "title": 1, "order_index": 1,
+            "word_count": 1, "edited_by_user": 1, "updated_at": 1
+        },
+        "full": SECTION_AST_PROJECTION,
+    },
+    "exports": {
+        "summary": {
+            "plan_id": 1, "format": 1, "status": 1, "file_name": 1,
+            "size": 1, "download_count": 1, "created_at": 1, "completed_at": 1
+        },
+        "full": {"content": 0},
+    },
+    "tickets": {
+        # Ticket lists: no description or response thread
+        "summary": {
+            "user_id": 1, "subject": 1, "priority": 1, "category": 1, "status": 1,
+            "assigned_to": 1, "created_at": 1, "updated_at": 1, "resolved_at": 1
+        },
+        "full": None,
+    },
+}
+
+
+def resolve_view(resource: str, view: str) -> Optional[Dict]:
+    """Projection for a named view of `resource` (400 for unknown views)"""
+    views = VIEWS[resource]
+    if view not in views:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid view '{view}'. Supported views: {', '.join(views)}"
+        )
+    return views[view]
+
+
+def view_query(default: str, resource: str):
+    """`view` query parameter documenting the views available for `resource`"""
+    return Query(default, description=f"Fields to return: {' | '.join(VIEWS[resource])}")
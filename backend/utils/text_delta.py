@@ -0,0 +1,56 @@
+"""Line-based text deltas for plan version history
+
+A delta is a list of compact ops that turns one text into another:
+
+    ["=", 12]             keep the next 12 lines
+    ["-", 3]              drop the next 3 lines
+    ["+", ["a\\n", "b"]]   insert these lines
+
+Lines keep their line endings, so applying a delta reproduces the new text
+byte for byte. Edits to a section usually touch a few paragraphs, so a delta
+is a small fraction of the section it describes.
+"""
+
+from difflib import SequenceMatcher
+from typing import List
+
+
+def _lines(text: str) -> List[str]:
+    return (text or "").splitlines(keepends=True)
+
+
+def text_delta(old: str, new: str) -> List:
+    """Ops turning `old` into `new`"""
+    old_lines, new_lines = _lines(old), _lines(new)
+    ops: List = []
+    matcher = SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append(["=", i2 - i1])
+            continue
+        if i2 > i1:
+            ops.append(["-", i2 - i1])
+        if j2 > j1:
+            ops.append(["+", new_lines[j1:j2]])
+    return ops
+
+
+def apply_delta(old: str, ops: List) -> str:
+    """Text produced by applying `ops` to `old`"""
+    old_lines = _lines(old)
+    position = 0
+    out: List[str] = []
+    for op, value in ops:
+        if op == "=":
+            out.extend(old_lines[position:position + value])
+            position += value
+        elif op == "-":
+            position += value
+        elif op == "+":
+            out.extend(value)
+        else:
+            raise ValueError(f"Unknown delta op: {op}")
+    if position != len(old_lines):
+        raise ValueError("Delta does not match the base text")
+    return "".join(out)
+
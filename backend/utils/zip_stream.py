@@ -0,0 +1,75 @@
+"""Streaming ZIP writer - build an archive on the fly without buffering it
+
+zipfile can write to an unseekable stream (it then emits data descriptors
+after each entry instead of patching local headers), so the archive is
+written into a sink that is drained after every write and yielded to the
+client. Only the current chunk is ever held in memory.
+"""
+
+import io
+import time
+import zipfile
+from typing import AsyncIterable, AsyncIterator, Iterable, Tuple, Union
+
+# Already-compressed formats are stored as-is; deflating them wastes CPU
+STORED_EXTENSIONS = {".pdf", ".docx", ".pptx", ".zip", ".png", ".jpg"}
+
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only, unseekable buffer that hands its contents out on drain()"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+ZipEntry = Tuple[str, Union[AsyncIterable[bytes], Iterable[bytes]]]
+
+
+def _compression_for(name: str) -> int:
+    ext = name[name.rfind("."):].lower() if "." in name else ""
+    return zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+
+async def stream_zip(entries: AsyncIterable[ZipEntry]) -> AsyncIterator[bytes]:
+    """
+    Yield a ZIP archive built from (name, chunks) entries as they arrive.
+    `chunks` may be a sync or async iterable of bytes.
+    """
+    sink = _DrainableSink()
+    with zipfile.ZipFile(sink, mode="w", allowZip64=True) as archive:
+        async for name, chunks in entries:
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            info.compress_type = _compression_for(name)
+            with archive.open(info, mode="w", force_zip64=True) as entry:
+                if hasattr(chunks, "__aiter__"):
+                    async for chunk in chunks:
+                        entry.write(chunk)
+                        data = sink.drain()
+                        if data:
+                            yield data
+                else:
+                    for chunk in chunks:
+                        entry.write(chunk)
+                        data = sink.drain()
+                        if data:
+                            yield data
+            data = sink.drain()
+            if data:
+                yield data
+    # Central directory
+    data = sink.drain()
+    if data:
+        yield data
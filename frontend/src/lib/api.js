@@ -144,6 +144,21 @@ const handleResponse = async (response) => {
   return response;
 };
 
+// List endpoints are cursor-paginated: follow next_cursor and merge every
+// page's items under `key`, so callers still receive the whole list
+export const fetchAllPages = async (endpoint, key) => {
+  const items = [];
+  let page;
+  let cursor = null;
+  do {
+    const separator = endpoint.includes('?') ? '&' : '?';
+    page = await apiRequest(cursor ? `${endpoint}${separator}cursor=${encodeURIComponent(cursor)}` : endpoint);
+    items.push(...(page[key] || []));
+    cursor = page.next_cursor;
+  } while (cursor);
+  return { ...page, [key]: items, next_cursor: null, has_more: false };
+};
+
 // API methods
 export const api = {
   // Auth
@@ -161,7 +176,7 @@ export const api = {
   
   // Plans
   plans: {
-    list: () => apiRequest('/api/plans'),
+    list: () => fetchAllPages('/api/plans', 'plans'),
     create: (data) => apiRequest('/api/plans', {
       method: 'POST',
       body: JSON.stringify(data)
@@ -185,7 +200,7 @@ export const api = {
   
   // Sections
   sections: {
-    list: (planId) => apiRequest(`/api/${planId}/sections`),
+    list: (planId) => fetchAllPages(`/api/${planId}/sections`, 'sections'),
     get: (planId, sectionId) => apiRequest(`/api/${planId}/sections/${sectionId}`),
     update: (planId, sectionId, data) => apiRequest(`/api/${planId}/sections/${sectionId}`, {
       method: 'PATCH',
@@ -241,7 +256,7 @@ export const api = {
   
   // Companies
   companies: {
-    list: () => apiRequest('/api/companies'),
+    list: () => fetchAllPages('/api/companies', 'companies'),
     get: (companyId) => apiRequest(`/api/companies/${companyId}`),
     create: (data) => apiRequest('/api/companies', {
       method: 'POST',
@@ -362,7 +377,7 @@ export const api = {
     }),
     list: (status) => {
       const params = status ? `?status=${status}` : '';
-      return apiRequest(`/api/tickets${params}`);
+      return fetchAllPages(`/api/tickets${params}`, 'tickets');
     },
     get: (ticketId) => apiRequest(`/api/tickets/${ticketId}`),
     respond: (ticketId, message) => apiRequest(`/api/tickets/${ticketId}/respond`, {
@@ -433,7 +448,7 @@ export const api = {
       method: 'POST',
       body: JSON.stringify(shareData)
     }),
-    listShares: (planId) => apiRequest(`/api/plans/${planId}/shares`),
+    listShares: (planId) => fetchAllPages(`/api/plans/${planId}/shares`, 'shares'),
     revokeShare: (planId, shareToken) => apiRequest(`/api/plans/${planId}/shares/${shareToken}`, {
       method: 'DELETE'
     }),
@@ -445,7 +460,7 @@ export const api = {
       method: 'POST',
       body: JSON.stringify({ email, role })
     }),
-    listCollaborators: (planId) => apiRequest(`/api/plans/${planId}/collaborators`),
+    listCollaborators: (planId) => fetchAllPages(`/api/plans/${planId}/collaborators`, 'collaborators'),
     removeCollaborator: (planId, collaboratorId) => apiRequest(`/api/plans/${planId}/collaborators/${collaboratorId}`, {
       method: 'DELETE'
     }),
@@ -455,7 +470,7 @@ export const api = {
     }),
     listComments: (planId, sectionId = null) => {
       const params = sectionId ? `?section_id=${sectionId}` : '';
-      return apiRequest(`/api/plans/${planId}/comments${params}`);
+      return fetchAllPages(`/api/plans/${planId}/comments${params}`, 'comments');
     },
     updateComment: (planId, commentId, content) => apiRequest(`/api/plans/${planId}/comments/${commentId}`, {
       method: 'PATCH',
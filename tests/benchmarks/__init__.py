@@ -0,0 +1 @@
+# Performance benchmarks with committed baselines
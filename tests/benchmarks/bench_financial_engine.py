@@ -0,0 +1,128 @@
+"""
+Financial engine benchmarks.
+
+Times the deterministic paths behind /financials and /scenarios:
+model generation across horizons, the three-scenario build, sensitivity,
+what-if grids and chart shaping.
+
+Run directly:  python tests/benchmarks/bench_financial_engine.py
+"""
+
+import sys
+from pathlib import Path
+from typing import List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from agents.financial_engine import FinancialEngine  # noqa: E402
+from agents.scenario_engine import build_scenario, build_scenario_set, calculate_sensitivity  # noqa: E402
+from utils.financial_charts import format_financial_charts  # noqa: E402
+
+try:
+    from .harness import Case, run_suite
+except ImportError:
+    from harness import Case, run_suite
+
+SUITE_NAME = "financial_engine"
+
+# Same shape as a real intake form submission
+INTAKE_DATA = {
+    "business_name": "Sarah's Coffee House",
+    "industry": "food_beverage_cafe",
+    "starting_capital": 50000,
+    "currency": "GBP",
+    "monthly_revenue_estimate": 15000,
+    "price_per_unit": 4.50,
+    "units_per_month": 3000,
+    "operating_expenses": {
+        "salaries": 6000,
+        "software_tools": 150,
+        "hosting_domain": 30,
+        "marketing": 800,
+        "workspace_utilities": 2200,
+        "miscellaneous": 300,
+        "custom": [
+            {"name": "Insurance", "amount": 170},
+            {"name": "Equipment lease", "amount": 450}
+        ]
+    }
+}
+
+# Mirrors PlanOrchestrator._get_industry_benchmarks defaults
+BENCHMARKS = {
+    "gross_margin_median": 0.65,
+    "operating_expense_ratio": 0.45,
+    "cogs_percentage": 0.35,
+    "employee_cost_average": 25000,
+    "rent_per_sqft_average": 50,
+    "marketing_spend_percentage": 0.08,
+    "utilities_monthly": 500,
+    "insurance_annual": 2000,
+    "failure_rate_year1": 0.20,
+    "break_even_months_median": 18,
+    "revenue_to_capital_ratio": 0.30,
+    "growth_rate": 0.15
+}
+
+HORIZONS = [5, 10, 30]
+GRID_SIZES = [3, 10]
+
+
+def _base_model(years: int = 5) -> dict:
+    return FinancialEngine(INTAKE_DATA, BENCHMARKS).generate_financial_model(years=years)
+
+
+def _multipliers(size: int) -> List[float]:
+    """`size` evenly spaced multipliers between 0.5 and 1.5"""
+    if size == 1:
+        return [1.0]
+    step = 1.0 / (size - 1)
+    return [round(0.5 + i * step, 4) for i in range(size)]
+
+
+def _what_if_grid(size: int) -> None:
+    for revenue_multiplier in _multipliers(size):
+        for cost_multiplier in _multipliers(size):
+            build_scenario(INTAKE_DATA, BENCHMARKS, revenue_multiplier, cost_multiplier)
+
+
+def get_cases() -> List[Case]:
+    cases: List[Case] = []
+
+    for years in HORIZONS:
+        cases.append((
+            f"generate_financial_model[{years}y]",
+            lambda years=years: _base_model(years)
+        ))
+
+    base = _base_model()
+    cases.append(("scenario_set[5y]", lambda: build_scenario_set(INTAKE_DATA, base, BENCHMARKS)))
+    cases.append(("sensitivity[5y]", lambda: calculate_sensitivity(INTAKE_DATA, base, BENCHMARKS)))
+
+    for size in GRID_SIZES:
+        cases.append((f"what_if_grid[{size}x{size}]", lambda size=size: _what_if_grid(size)))
+
+    for years in HORIZONS:
+        model = _base_model(years)
+        cases.append((f"format_financial_charts[{years}y]", lambda model=model: format_financial_charts(model)))
+
+    return cases
+
+
+def main() -> bool:
+    print("=" * 80)
+    print("FINANCIAL ENGINE BENCHMARKS")
+    print("=" * 80)
+    _, regressions = run_suite(SUITE_NAME, get_cases())
+    for regression in regressions:
+        print(
+            f"REGRESSION {regression['case']}: {regression['ratio']}x baseline "
+            f"({regression['score']} vs {regression['baseline_score']})"
+        )
+    return not regressions
+
+
+if __name__ == "__main__":
+    exit(0 if main() else 1)
@@ -0,0 +1,208 @@
+"""
+JSON response benchmarks.
+
+Encodes realistic plan payloads the old way (serialize_doc, then FastAPI's
+jsonable_encoder, then JSONResponse's json.dumps) and the new way
+(public_doc + MongoJSONResponse, one orjson pass):
+
+- a plan's full section list (GET /plans/{id}/sections)
+- a version keyframe with its sections (GET /plans/{id}/versions/{vid})
+- the plans list, summary view (GET /plans)
+- a 10-year financial model (GET /plans/{id}/financials)
+
+Run directly:  python tests/benchmarks/bench_json_response.py
+"""
+
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from bson import ObjectId  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from agents.financial_engine import FinancialEngine  # noqa: E402
+from utils.json_response import MongoJSONResponse, public_doc, public_docs  # noqa: E402
+from utils.serializers import serialize_doc  # noqa: E402
+
+try:
+    from .harness import Case, run_suite
+    from .bench_financial_engine import BENCHMARKS, INTAKE_DATA
+except ImportError:
+    from harness import Case, run_suite
+    from bench_financial_engine import BENCHMARKS, INTAKE_DATA
+
+SUITE_NAME = "json_response"
+
+NOW = datetime(2025, 3, 14, 9, 26, 53, 589000)
+PLAN_ID = str(ObjectId())
+
+SECTION_TYPES = [
+    "executive_summary", "company_overview", "market_analysis", "competitive_analysis",
+    "products_services", "marketing_strategy", "operations_plan", "management_team",
+    "financial_plan", "funding_request", "risk_analysis", "appendix"
+]
+
+PARAGRAPH = (
+    "Sarah's Coffee House will serve specialty coffee and fresh pastries to commuters "
+    "and remote workers in a growing city-centre neighbourhood. Revenue comes from "
+    "walk-in sales, a loyalty subscription and small-batch catering orders. "
+)
+
+
+def _section(order_index: int, section_type: str) -> Dict:
+    content = "\n\n".join(
+        [f"## {section_type.replace('_', ' ').title()}"]
+        + [f"- {PARAGRAPH}" if i % 3 == 2 else PARAGRAPH * 2 for i in range(14)]
+    )
+    return {
+        "_id": ObjectId(),
+        "plan_id": PLAN_ID,
+        "section_type": section_type,
+        "title": section_type.replace("_", " ").title(),
+        "content": content,
+        "order_index": order_index,
+        "word_count": len(content.split()),
+        "edited_by_user": order_index % 4 == 0,
+        "created_at": NOW,
+        "updated_at": NOW + timedelta(minutes=order_index)
+    }
+
+
+SECTIONS = [_section(i, section_type) for i, section_type in enumerate(SECTION_TYPES)]
+
+VERSION = {
+    "_id": ObjectId(),
+    "plan_id": PLAN_ID,
+    "version_number": 21,
+    "kind": "keyframe",
+    "keyframe_version": 21,
+    "created_by": str(ObjectId()),
+    "changes": [{"section_id": str(SECTIONS[0]["_id"]), "field": "content", "old_value": PARAGRAPH, "new_value": PARAGRAPH}],
+    "created_at": NOW,
+}
+VERSION_SECTIONS = [
+    {**{k: v for k, v in s.items() if k not in ("_id", "plan_id")}, "id": str(s["_id"])}
+    for s in SECTIONS
+]
+
+PLAN_SUMMARIES = [{
+    "_id": ObjectId(),
+    "name": f"Business plan {i}",
+    "status": "complete",
+    "plan_purpose": "investor",
+    "intake_data": {"business_name": "Sarah's Coffee House", "industry": "food_beverage_cafe"},
+    "created_at": NOW - timedelta(days=i),
+    "updated_at": NOW - timedelta(days=i, hours=-2)
+} for i in range(50)]
+
+FINANCIAL_MODEL = {
+    "_id": ObjectId(),
+    "plan_id": PLAN_ID,
+    "data": FinancialEngine(INTAKE_DATA, BENCHMARKS).generate_financial_model(years=10),
+    "created_at": NOW
+}
+
+
+# ============================================================================
+# ENCODING PATHS
+# ============================================================================
+
+def _current(content) -> bytes:
+    """serialize_doc'd content through FastAPI's default response path"""
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def _fast(content) -> bytes:
+    return MongoJSONResponse(content).body
+
+
+def current_sections() -> bytes:
+    return _current({"sections": [serialize_doc(s) for s in SECTIONS], "next_cursor": None, "has_more": False, "limit": 50})
+
+
+def fast_sections() -> bytes:
+    return _fast({"sections": public_docs(SECTIONS), "next_cursor": None, "has_more": False, "limit": 50})
+
+
+def current_version() -> bytes:
+    version = serialize_doc(VERSION)
+    version["sections"] = serialize_doc(VERSION_SECTIONS)
+    return _current(version)
+
+
+def fast_version() -> bytes:
+    version = public_doc(VERSION)
+    version["sections"] = VERSION_SECTIONS
+    return _fast(version)
+
+
+def current_plans() -> bytes:
+    return _current({"plans": [serialize_doc(p) for p in PLAN_SUMMARIES], "next_cursor": None, "has_more": False, "limit": 50})
+
+
+def fast_plans() -> bytes:
+    return _fast({"plans": public_docs(PLAN_SUMMARIES), "next_cursor": None, "has_more": False, "limit": 50})
+
+
+def current_financials() -> bytes:
+    return _current({
+        "id": str(FINANCIAL_MODEL["_id"]),
+        "plan_id": FINANCIAL_MODEL["plan_id"],
+        "data": FINANCIAL_MODEL["data"],
+        "created_at": FINANCIAL_MODEL["created_at"].isoformat()
+    })
+
+
+def fast_financials() -> bytes:
+    return _fast({
+        "id": str(FINANCIAL_MODEL["_id"]),
+        "plan_id": FINANCIAL_MODEL["plan_id"],
+        "data": FINANCIAL_MODEL["data"],
+        "created_at": FINANCIAL_MODEL["created_at"]
+    })
+
+
+PAYLOADS = {
+    "sections[12]": (current_sections, fast_sections),
+    "version_keyframe[12]": (current_version, fast_version),
+    "plans_summary[50]": (current_plans, fast_plans),
+    "financial_model[10y]": (current_financials, fast_financials),
+}
+
+
+def get_cases() -> List[Case]:
+    cases: List[Case] = []
+    for payload, (current, fast) in PAYLOADS.items():
+        cases.append((f"current:{payload}", current))
+        cases.append((f"fast:{payload}", fast))
+    return cases
+
+
+def main() -> bool:
+    print("=" * 80)
+    print("JSON RESPONSE BENCHMARKS")
+    print("=" * 80)
+    run, regressions = run_suite(SUITE_NAME, get_cases())
+
+    print()
+    for payload in PAYLOADS:
+        current = run["cases"][f"current:{payload}"]["seconds"]
+        fast = run["cases"][f"fast:{payload}"]["seconds"]
+        print(f"{payload:<40} {current / fast:>6.1f}x faster")
+
+    for regression in regressions:
+        print(
+            f"REGRESSION {regression['case']}: {regression['ratio']}x baseline "
+            f"({regression['score']} vs {regression['baseline_score']})"
+        )
+    return not regressions
+
+
+if __name__ == "__main__":
+    exit(0 if main() else 1)
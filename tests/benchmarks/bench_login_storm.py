@@ -0,0 +1,115 @@
+"""
+Login storm benchmark.
+
+bcrypt is deliberately slow (~250ms at cost 12). Checked inline in an async
+route, every login freezes the event loop for that long and every other
+request on the instance waits behind it. This benchmark fires a burst of
+concurrent password checks while a "ticker" coroutine stands in for unrelated
+requests, and reports for each mode:
+
+- logins/sec over the burst;
+- the ticker's worst and p95 scheduling delay (how late an unrelated request
+  would have been served).
+
+Modes: inline (verify_password on the loop, the old behaviour) and pooled
+(verify_password_async on the bcrypt thread pool).
+
+Run directly:  python tests/benchmarks/bench_login_storm.py
+Env: LOGIN_STORM_SIZE (default 32), BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from utils.auth import (  # noqa: E402
+    BCRYPT_ROUNDS,
+    PASSWORD_HASH_WORKERS,
+    get_password_hash,
+    verify_password,
+    verify_password_async,
+)
+
+STORM_SIZE = int(os.environ.get("LOGIN_STORM_SIZE", "32"))
+TICK_INTERVAL = 0.005  # seconds between ticker wake-ups
+PASSWORD = "correct horse battery staple"
+
+
+async def _ticker(delays: List[float], stop: asyncio.Event):
+    """Records how late each wake-up is relative to when it was due"""
+    while not stop.is_set():
+        due = time.perf_counter() + TICK_INTERVAL
+        await asyncio.sleep(TICK_INTERVAL)
+        delays.append(max(0.0, time.perf_counter() - due))
+
+
+async def _inline_login(hashed: str) -> bool:
+    return verify_password(PASSWORD, hashed)
+
+
+async def _pooled_login(hashed: str) -> bool:
+    return await verify_password_async(PASSWORD, hashed)
+
+
+async def run_storm(login, hashed: str) -> Dict[str, float]:
+    delays: List[float] = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_ticker(delays, stop))
+    await asyncio.sleep(TICK_INTERVAL * 2)  # let the ticker settle
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[login(hashed) for _ in range(STORM_SIZE)])
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await ticker
+    assert all(results), "password check failed"
+
+    delays.sort()
+    return {
+        "logins_per_sec": STORM_SIZE / elapsed,
+        "elapsed": elapsed,
+        "max_delay_ms": delays[-1] * 1000 if delays else 0.0,
+        "p95_delay_ms": delays[int(len(delays) * 0.95) - 1] * 1000 if len(delays) >= 20 else 0.0,
+        "median_delay_ms": statistics.median(delays) * 1000 if delays else 0.0,
+        "ticks": len(delays),
+    }
+
+
+async def _main() -> bool:
+    hashed = get_password_hash(PASSWORD)
+    print("=" * 80)
+    print(f"Login storm: {STORM_SIZE} concurrent logins, cost {BCRYPT_ROUNDS}, {PASSWORD_HASH_WORKERS} workers")
+    print("=" * 80)
+    print(f"{'mode':<10}{'logins/s':>12}{'elapsed s':>12}{'max lag ms':>14}{'p95 lag ms':>14}{'ticks':>8}")
+
+    results = {}
+    for mode, login in (("inline", _inline_login), ("pooled", _pooled_login)):
+        stats = await run_storm(login, hashed)
+        results[mode] = stats
+        print(
+            f"{mode:<10}{stats['logins_per_sec']:>12.1f}{stats['elapsed']:>12.2f}"
+            f"{stats['max_delay_ms']:>14.1f}{stats['p95_delay_ms']:>14.1f}{stats['ticks']:>8}"
+        )
+
+    # The point of the pool: unrelated requests keep being served during a storm
+    ok = results["pooled"]["max_delay_ms"] < results["inline"]["max_delay_ms"]
+    if not ok:
+        print("REGRESSION: pooled logins still block the event loop")
+    return ok
+
+
+def main() -> bool:
+    return asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    exit(0 if main() else 1)
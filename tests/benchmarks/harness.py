@@ -0,0 +1,170 @@
+"""
+Benchmark harness - timing, machine calibration and baseline comparison.
+
+Timings are normalised against a fixed pure-Python calibration loop so that
+baselines recorded on one machine remain meaningful on another. A case
+regresses when its normalised score exceeds baseline × threshold.
+
+Environment:
+    BENCH_REGRESSION_THRESHOLD  allowed slowdown factor (default 2.0)
+    BENCH_UPDATE_BASELINE=1     rewrite the baseline file with this run (the
+                                only way a baseline is ever written)
+"""
+
+import json
+import os
+import platform
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+BASELINES_DIR = Path(__file__).parent / "baselines"
+
+DEFAULT_THRESHOLD = 2.0
+DEFAULT_REPEAT = 5
+MIN_SAMPLE_SECONDS = 0.05
+
+Case = Tuple[str, Callable[[], object]]
+
+
+def get_threshold() -> float:
+    """Allowed slowdown factor before a case counts as a regression"""
+    return float(os.environ.get("BENCH_REGRESSION_THRESHOLD", DEFAULT_THRESHOLD))
+
+
+def should_update_baseline() -> bool:
+    return os.environ.get("BENCH_UPDATE_BASELINE", "").lower() in ("1", "true", "yes")
+
+
+def _calibration_workload() -> int:
+    """Fixed mix of dict, float and list work similar to the engine's inner loops"""
+    total = 0
+    rows = []
+    for i in range(2000):
+        row = {"year": i, "revenue": i * 1.15, "cogs": round(i * 0.35, 2)}
+        row["gross_profit"] = row["revenue"] - row["cogs"]
+        rows.append(row)
+        total += int(row["gross_profit"])
+    return total + len(rows)
+
+
+def time_callable(fn: Callable[[], object], repeat: int = DEFAULT_REPEAT) -> float:
+    """
+    Best-of-`repeat` seconds per call. The inner loop count is grown until one
+    sample takes at least MIN_SAMPLE_SECONDS so that fast cases are not
+    dominated by timer resolution.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_SAMPLE_SECONDS:
+            break
+        number *= 2
+
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def calibrate(repeat: int = DEFAULT_REPEAT) -> float:
+    """Seconds per calibration workload on this machine"""
+    return time_callable(_calibration_workload, repeat=repeat)
+
+
+def run_cases(cases: List[Case], repeat: int = DEFAULT_REPEAT) -> Dict:
+    """Time every case and return raw and calibration-normalised results"""
+    unit = calibrate(repeat=repeat)
+    results = {}
+    for name, fn in cases:
+        seconds = time_callable(fn, repeat=repeat)
+        results[name] = {
+            "seconds": seconds,
+            "score": seconds / unit
+        }
+    return {"calibration_seconds": unit, "cases": results}
+
+
+def load_baseline(name: str) -> Dict:
+    path = BASELINES_DIR / f"{name}.json"
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(name: str, run: Dict) -> Path:
+    BASELINES_DIR.mkdir(exist_ok=True)
+    path = BASELINES_DIR / f"{name}.json"
+    baseline = {
+        "recorded_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "calibration_seconds": run["calibration_seconds"],
+        "cases": {
+            case: {"score": round(data["score"], 6)}
+            for case, data in sorted(run["cases"].items())
+        }
+    }
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2)
+        f.write("\n")
+    return path
+
+
+def compare(run: Dict, baseline: Dict, threshold: float) -> List[Dict]:
+    """Return one entry per case whose score regressed past the threshold"""
+    regressions = []
+    baseline_cases = baseline.get("cases", {})
+    for case, data in run["cases"].items():
+        expected = baseline_cases.get(case, {}).get("score")
+        if not expected:
+            continue
+        ratio = data["score"] / expected
+        if ratio > threshold:
+            regressions.append({
+                "case": case,
+                "baseline_score": expected,
+                "score": round(data["score"], 6),
+                "ratio": round(ratio, 2)
+            })
+    return regressions
+
+
+def format_report(run: Dict, baseline: Dict) -> str:
+    baseline_cases = baseline.get("cases", {})
+    lines = [f"{'case':<40} {'time':>12} {'score':>10} {'vs base':>9}"]
+    for case, data in run["cases"].items():
+        expected = baseline_cases.get(case, {}).get("score")
+        ratio = f"{data['score'] / expected:.2f}x" if expected else "new"
+        lines.append(
+            f"{case:<40} {data['seconds'] * 1e6:>10.1f}us {data['score']:>10.3f} {ratio:>9}"
+        )
+    return "\n".join(lines)
+
+
+def run_suite(name: str, cases: List[Case], repeat: int = DEFAULT_REPEAT) -> Tuple[Dict, List[Dict]]:
+    """
+    Run a named suite against its committed baseline.
+    Returns (run, regressions). The baseline file is only written when
+    BENCH_UPDATE_BASELINE is set; without a baseline nothing can regress.
+    """
+    run = run_cases(cases, repeat=repeat)
+    baseline = load_baseline(name)
+    print(format_report(run, baseline))
+
+    if should_update_baseline():
+        path = save_baseline(name, run)
+        print(f"Baseline written to {path}")
+        return run, []
+    if not baseline:
+        print(f"No baseline for {name}; record one with BENCH_UPDATE_BASELINE=1")
+        return run, []
+
+    return run, compare(run, baseline, get_threshold())
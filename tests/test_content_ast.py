@@ -0,0 +1,65 @@
+"""
+Content AST tests - section text parses to the same blocks whether it
+arrives as editor HTML or as writer-agent markdown.
+"""
+
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from utils.content_ast import (  # noqa: E402
+    content_ast_fields,
+    get_section_ast,
+    iter_text_lines,
+    parse_content,
+    spans_to_reportlab
+)
+
+MARKDOWN = "## Market\n\nDemand is **strong** and *growing*.\nSecond line\n\n- Cafés\n- Offices\n\n1. Launch\n2. Scale"
+HTML = (
+    "<h2>Market</h2><p>Demand is <strong>strong</strong> and <em>growing</em>.<br/>Second line</p>"
+    "<ul><li>Cafés</li><li>Offices</li></ul><ol><li>Launch</li><li>Scale</li></ol>"
+)
+
+
+def test_markdown_and_html_parse_identically():
+    assert parse_content(MARKDOWN) == parse_content(HTML)
+
+
+def test_block_structure():
+    blocks = parse_content(MARKDOWN)
+    assert [b["type"] for b in blocks] == ["heading", "paragraph", "list", "list"]
+    assert blocks[0]["level"] == 2
+    assert {"text": "strong", "bold": True} in blocks[1]["spans"]
+    assert {"text": "growing", "italic": True} in blocks[1]["spans"]
+    assert blocks[2]["ordered"] is False and len(blocks[2]["items"]) == 2
+    assert blocks[3]["ordered"] is True
+
+
+def test_reportlab_markup_is_escaped():
+    blocks = parse_content("Revenue & costs <5%> **up**")
+    assert spans_to_reportlab(blocks[0]["spans"]) == "Revenue &amp; costs &lt;5%&gt; <b>up</b>"
+
+
+def test_stored_ast_is_reused_only_for_matching_content():
+    section = {"content": MARKDOWN, **content_ast_fields(MARKDOWN)}
+    assert get_section_ast(section) is section["content_ast"]
+
+    section["content"] = "Edited"
+    assert get_section_ast(section) == [{"type": "paragraph", "spans": [{"text": "Edited"}]}]
+
+
+def test_slide_lines_strip_bullets():
+    lines = list(iter_text_lines(parse_content("• First point\n• Second point")))
+    assert lines == [("First point", True), ("Second point", True)]
+
+
+if __name__ == "__main__":
+    tests = [obj for name, obj in list(globals().items()) if name.startswith("test_")]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"{len(tests)} tests passed")
@@ -0,0 +1,49 @@
+"""
+Financial engine performance regression gate.
+
+Runs the benchmark suite in tests/benchmarks against the committed baseline
+and fails when any case is slower than baseline × BENCH_REGRESSION_THRESHOLD.
+Wall-clock gates are noisy on shared machines, so pytest only runs it when
+opted in:
+
+    BENCH=1 python -m pytest tests/test_financial_benchmarks.py
+
+Running this file directly always runs the gate. Record a new baseline after
+an intentional change with:
+
+    BENCH_UPDATE_BASELINE=1 python tests/test_financial_benchmarks.py
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from tests.benchmarks.bench_financial_engine import SUITE_NAME, get_cases  # noqa: E402
+from tests.benchmarks.harness import get_threshold, run_suite  # noqa: E402
+
+BENCH_ENABLED = os.environ.get("BENCH", "").lower() in ("1", "true", "yes")
+
+
+@pytest.mark.skipif(not BENCH_ENABLED, reason="timing gate; set BENCH=1 to run")
+def test_financial_engine_benchmarks():
+    """No financial engine path may regress past the threshold"""
+    _, regressions = run_suite(SUITE_NAME, get_cases())
+    assert not regressions, (
+        f"Benchmark regressions (threshold {get_threshold()}x): {regressions}"
+    )
+
+
+if __name__ == "__main__":
+    try:
+        test_financial_engine_benchmarks()
+        print("✅ No benchmark regressions")
+        exit(0)
+    except AssertionError as e:
+        print(f"❌ {e}")
+        exit(1)
@@ -0,0 +1,63 @@
+"""
+JSON response tests - the orjson path produces the same JSON as serialize_doc.
+"""
+
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from bson import ObjectId  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from utils.json_response import MongoJSONResponse, public_doc, public_docs  # noqa: E402
+from utils.serializers import serialize_doc  # noqa: E402
+
+
+def _section(n: int) -> dict:
+    return {
+        "_id": ObjectId(),
+        "plan_id": str(ObjectId()),
+        "title": f"Section {n}",
+        "content": "## Heading\n\nBody text — with unicode ✓",
+        "order_index": n,
+        "word_count": 6,
+        "score": 0.75,
+        "source_id": ObjectId(),
+        "tags": ["a", "b"],
+        "meta": {"reviewed_at": datetime(2025, 1, 2, 3, 4, 5, 123456), "by": ObjectId()},
+        "history": [{"at": datetime(2025, 1, 1, tzinfo=timezone.utc), "note": None}],
+        "created_at": datetime(2025, 1, 2, 3, 4, 5),
+    }
+
+
+def test_matches_serialize_doc():
+    sections = [_section(n) for n in range(3)]
+    expected = JSONResponse(jsonable_encoder({"sections": [serialize_doc(s) for s in sections]})).body
+    actual = MongoJSONResponse({"sections": public_docs(sections)}).body
+    assert json.loads(actual) == json.loads(expected)
+
+
+def test_public_doc_is_shallow_and_keeps_documents_without_id():
+    section = _section(1)
+    doc = public_doc(section)
+    assert doc["id"] == str(section["_id"]) and "_id" not in doc
+    assert doc["meta"] is section["meta"]
+    assert "_id" in section
+
+    embedded = {"id": "abc", "title": "Keyframe section"}
+    assert public_doc(embedded) is embedded
+    assert public_doc(None) is None
+
+
+if __name__ == "__main__":
+    tests = [obj for name, obj in list(globals().items()) if name.startswith("test_")]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"{len(tests)} tests passed")
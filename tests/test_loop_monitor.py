@@ -0,0 +1,77 @@
+"""
+Loop monitor tests - lag is sampled and a blocking call is captured with its route.
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from utils.loop_monitor import LoopMonitor, _current_request  # noqa: E402
+
+FAKE_REQUEST = SimpleNamespace(method="POST", scope={"route": SimpleNamespace(path="/api/plans/{plan_id}/export")})
+
+
+def render_synchronously():
+    time.sleep(0.3)
+
+
+async def _handler():
+    render_synchronously()
+
+
+def test_lag_and_blocked_route_are_recorded():
+    async def run():
+        monitor = LoopMonitor(interval=0.05, debug=True, threshold_ms=100)
+        monitor.start()
+        await asyncio.sleep(0.2)
+
+        async def request_task():
+            token = _current_request.set(FAKE_REQUEST)
+            try:
+                # Child task of the request, like call_next / gather
+                await asyncio.create_task(_handler())
+            finally:
+                _current_request.reset(token)
+
+        await asyncio.create_task(request_task())
+
+        await asyncio.sleep(0.2)
+        monitor.stop()
+        return monitor.stats()
+
+    stats = asyncio.run(run())
+    assert stats["samples"] >= 3
+    assert stats["lag"]["max_ms"] >= 200
+    assert stats["over_threshold"] >= 1
+
+    block = stats["blocks"][0]
+    assert block["route"] == "POST /api/plans/{plan_id}/export"
+    assert block["count"] == 1 and block["max_ms"] >= 200
+    assert any("render_synchronously" in frame for frame in block["stack"])
+
+
+def test_quiet_loop_records_no_blocks():
+    async def run():
+        monitor = LoopMonitor(interval=0.02, debug=True, threshold_ms=100)
+        monitor.start()
+        await asyncio.sleep(0.3)
+        monitor.stop()
+        return monitor.stats()
+
+    stats = asyncio.run(run())
+    assert stats["samples"] >= 5
+    assert stats["blocks"] == []
+
+
+if __name__ == "__main__":
+    tests = [obj for name, obj in list(globals().items()) if name.startswith("test_")]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"{len(tests)} tests passed")
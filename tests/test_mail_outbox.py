@@ -0,0 +1,197 @@
+"""
+Mail delivery tests - the shared SMTP session against a local SMTP sink.
+
+The sink speaks just enough SMTP to accept messages, records what it
+receives and counts connections, so the tests can check that a batch reuses
+one session and that a dropped session is reopened.
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime
+from email import message_from_bytes
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from bson import ObjectId  # noqa: E402
+
+import utils.mail_outbox as mail_outbox  # noqa: E402
+from utils.mail_outbox import MAIL_MAX_ATTEMPTS, SMTPConnection, build_message, enqueue_mail  # noqa: E402
+
+
+class SMTPSink:
+    def __init__(self, drop_after: int = 0):
+        self.messages = []
+        self.connections = 0
+        # Close the connection after this many messages (0: never)
+        self.drop_after = drop_after
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        received = 0
+        writer.write(b"220 sink ESMTP\r\n")
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.decode().strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                writer.write(b"250 sink\r\n")
+            elif command.startswith("DATA"):
+                writer.write(b"354 end with .\r\n")
+                await writer.drain()
+                data = await reader.readuntil(b"\r\n.\r\n")
+                self.messages.append(message_from_bytes(data[:-5]))
+                received += 1
+                writer.write(b"250 queued\r\n")
+                if self.drop_after and received >= self.drop_after:
+                    await writer.drain()
+                    break
+            elif command.startswith("QUIT"):
+                writer.write(b"221 bye\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"250 ok\r\n")
+            await writer.drain()
+        writer.close()
+
+
+def _mail(n: int):
+    return build_message({
+        "to": ["support@strattio.test"],
+        "subject": f"Message {n}",
+        "body": f"Body {n}",
+        "reply_to": "user@example.test",
+    })
+
+
+def test_batch_reuses_one_session():
+    async def run():
+        sink = SMTPSink()
+        port = await sink.start()
+        connection = SMTPConnection(hostname="127.0.0.1", port=port, username="")
+        results = await connection.send_batch([_mail(n) for n in range(3)])
+        results += await connection.send_batch([_mail(3)])
+        await connection.close()
+        await sink.stop()
+
+        assert results == [None] * 4
+        assert sink.connections == 1
+        assert [m["Subject"] for m in sink.messages] == [f"Message {n}" for n in range(4)]
+        assert sink.messages[0]["Reply-To"] == "user@example.test"
+
+    asyncio.run(run())
+
+
+def test_dropped_session_is_reopened():
+    async def run():
+        sink = SMTPSink(drop_after=1)
+        port = await sink.start()
+        connection = SMTPConnection(hostname="127.0.0.1", port=port, username="")
+        results = await connection.send_batch([_mail(n) for n in range(2)])
+        await connection.close()
+        await sink.stop()
+
+        assert results == [None, None]
+        assert len(sink.messages) == 2
+        assert connection.connects == 2
+
+    asyncio.run(run())
+
+
+class FakeOutbox:
+    """The outbox operations deliver_pending uses, in memory"""
+
+    def __init__(self, mails):
+        self.mails = {mail["_id"]: mail for mail in mails}
+
+    async def insert_one(self, mail):
+        mail["_id"] = ObjectId()
+        self.mails[mail["_id"]] = mail
+        return type("InsertResult", (), {"inserted_id": mail["_id"]})()
+
+    async def find_one_and_update(self, query, update, sort=None, return_document=None):
+        due = [m for m in self.mails.values()
+               if m["status"] in query["status"]["$in"] and m["next_attempt_at"] <= query["next_attempt_at"]["$lte"]]
+        if not due:
+            return None
+        mail = min(due, key=lambda m: m["next_attempt_at"])
+        mail.update(update["$set"])
+        return dict(mail)
+
+    async def bulk_write(self, requests, ordered=True):
+        for request in requests:
+            self.mails[request._filter["_id"]].update(request._doc["$set"])
+
+
+def _outbox_mail(subject: str) -> dict:
+    return {"_id": ObjectId(), "to": ["support@strattio.test"], "subject": subject, "body": "Body",
+            "status": "pending", "attempts": 0, "next_attempt_at": datetime.utcnow()}
+
+
+def test_enqueue_folds_line_breaks_in_headers():
+    async def run():
+        outbox = FakeOutbox([])
+        mail_id = await enqueue_mail({"mail_outbox": outbox}, "support@strattio.test",
+                                     "Hello\r\nBcc: victim@example.test", "Body", reply_to="user@example.test\n")
+        mail = outbox.mails[ObjectId(mail_id)]
+        assert mail["subject"] == "Hello Bcc: victim@example.test"
+        assert mail["reply_to"] == "user@example.test"
+        assert build_message(mail)["Subject"] == mail["subject"]
+
+    asyncio.run(run())
+
+
+def test_unbuildable_message_fails_alone():
+    async def run():
+        sink = SMTPSink()
+        port = await sink.start()
+        connection = SMTPConnection(hostname="127.0.0.1", port=port, username="")
+        # Stored before enqueue_mail folded line breaks
+        broken = _outbox_mail("Broken\nsubject")
+        outbox = FakeOutbox([broken, _outbox_mail("Fine")])
+
+        previous = mail_outbox.get_smtp_connection, os.environ.get("SMTP_SERVER")
+        mail_outbox.get_smtp_connection = lambda: connection
+        os.environ["SMTP_SERVER"] = "127.0.0.1"
+        try:
+            sent = await mail_outbox.deliver_pending({"mail_outbox": outbox})
+            for _ in range(MAIL_MAX_ATTEMPTS - 1):
+                broken["next_attempt_at"] = datetime.utcnow()  # skip the backoff
+                await mail_outbox.deliver_pending({"mail_outbox": outbox})
+        finally:
+            mail_outbox.get_smtp_connection = previous[0]
+            if previous[1] is None:
+                os.environ.pop("SMTP_SERVER")
+            else:
+                os.environ["SMTP_SERVER"] = previous[1]
+            await connection.close()
+            await sink.stop()
+
+        assert sent == 1
+        assert [m["Subject"] for m in sink.messages] == ["Fine"]
+        assert broken["status"] == "failed"
+        assert broken["attempts"] == MAIL_MAX_ATTEMPTS
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    tests = [obj for name, obj in list(globals().items()) if name.startswith("test_")]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"{len(tests)} tests passed")
@@ -0,0 +1,250 @@
+"""
+Plan metrics tests - incremental totals match a full recompute, and the
+scores built from them match the per-section formulas.
+"""
+
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from utils.plan_metrics import (  # noqa: E402
+    METRICS_FIELD, completion_percent, plan_metrics, quality_breakdown, readiness_breakdown,
+    readiness_updates, section_metrics, section_write_update
+)
+
+NOW = datetime(2025, 3, 14, 9, 0)
+FINANCIAL_MODEL = {"data": {
+    "pnl_monthly": [{}] * 12, "cashflow_monthly": [{}] * 12,
+    "break_even": {"months_to_break_even": 9}, "kpis": {"margin": 0.2}
+}}
+
+
+def _section(section_type: str, content: str, offset: int = 0, **fields) -> dict:
+    section = {"section_type": section_type, "title": section_type.replace("_", " ").title(),
+               "content": content, "order_index": offset, "created_at": NOW + timedelta(minutes=offset), **fields}
+    section[METRICS_FIELD] = section_metrics(section)
+    return section
+
+
+def _sections() -> list:
+    return [
+        _section("executive_summary", "Our vision: serve the market demand, grow revenue with a strong founder team. " * 30),
+        _section("market_analysis", "Market size and growth trends. " * 120, 1, data_citations=[{}, {}, {}]),
+        _section("competitive_analysis", "Competitors lack our advantage.", 2),
+        _section("operations_plan", "Key risk: supply. " * 10, 3, edited_by_user=True),
+    ]
+
+
+def _apply(totals: dict, update: dict) -> dict:
+    """Apply a plan metrics update to a totals document, as Mongo would"""
+    totals = {**totals, "readiness": dict(totals["readiness"]), "readiness_order": dict(totals["readiness_order"])}
+    for path, delta in update.get("$inc", {}).items():
+        key = path.split(".", 1)[1]
+        totals[key] += delta
+    for path, value in update["$set"].items():
+        keys = path.split(".")[1:]
+        if len(keys) == 2:
+            totals[keys[0]][keys[1]] = value
+        else:
+            totals[keys[0]] = value
+    for path, value in update.get("$min", {}).items():
+        key = path.split(".", 1)[1]
+        totals[key] = min(totals[key], value) if totals[key] else value
+    return totals
+
+
+def _write(totals: dict, before, after: dict) -> dict:
+    """Fold a section write into the totals as record_section_write does"""
+    totals = _apply(totals, section_write_update(before, after))
+    for leader_filter, update in readiness_updates(before or after, after[METRICS_FIELD]):
+        (path, condition), = leader_filter.items()
+        leader = totals["readiness_order"].get(path.rsplit(".", 1)[1])
+        if leader is None or not leader < condition["$not"]["$lt"]:
+            totals = _apply(totals, update)
+    return totals
+
+
+def _baseline_readiness(sections: list, financial_model) -> dict:
+    """routes/readiness_score before the totals existed, scoring sections directly"""
+    def first(predicate):
+        return next((s for s in sections if predicate(s)), None)
+
+    def words(section):
+        return len(section.get("content", "").split())
+
+    def mentions(section, keywords):
+        return any(word in section.get("content", "").lower() for word in keywords)
+
+    breakdown = {}
+    section = first(lambda s: s.get("section_type") == "executive_summary")
+    score = 0
+    if section:
+        score = 20 - (5 if words(section) < 200 else 0) - (3 if words(section) > 1000 else 0)
+        for keywords in (["vision", "mission", "goal"], ["market", "opportunity", "demand"],
+                         ["revenue", "profit", "funding", "investment"], ["team", "founder", "management"]):
+            score -= 0 if mentions(section, keywords) else 3
+    breakdown["executive_summary"] = score
+
+    section = first(lambda s: s.get("section_type") == "market_analysis")
+    score = 0
+    if section:
+        score = 15 + (3 if len(section.get("data_citations", [])) >= 3 else 0)
+        score += (2 if words(section) >= 500 else 0) - (5 if words(section) < 300 else 0)
+    breakdown["market_analysis"] = score
+
+    score = 0
+    if financial_model:
+        data = financial_model.get("data", {})
+        score = 25 + (5 if len(data.get("pnl_monthly", [])) >= 12 else 0)
+        score += 5 if len(data.get("cashflow_monthly", [])) >= 12 else 0
+        score += 5 if (data.get("break_even") or {}).get("months_to_break_even") else 0
+        score += 5 if data.get("kpis") else 0
+    breakdown["financial_projections"] = score
+
+    section = first(lambda s: s.get("section_type") == "team")
+    score = 0
+    if section:
+        score = 10 + (2 if words(section) >= 300 else 0)
+        score += (2 if mentions(section, ["experience", "background", "qualification"]) else 0)
+        score -= 5 if words(section) < 150 else 0
+    breakdown["team_management"] = score
+
+    variations = ["competitive_analysis", "competitor_analysis", "competitors_analysis", "competition_analysis"]
+    section = first(lambda s: s.get("section_type", "").lower().strip().replace(" ", "_") in variations
+                    or ("competitor" in s.get("section_type", "").lower() and "analysis" in s.get("section_type", "").lower()))
+    score = 0
+    if section:
+        score = 10 + (3 if words(section) >= 400 else 0)
+        score += (2 if mentions(section, ["competitor", "competitive", "advantage", "differentiator"]) else 0)
+        score -= 5 if words(section) < 200 else 0
+    breakdown["competitive_analysis"] = score
+
+    section = first(lambda s: "risk" in s.get("section_type", "").lower() or "risk" in s.get("title", "").lower())
+    score = 0
+    if section:
+        score = 10 + (3 if words(section) >= 300 else 0)
+        score += (2 if mentions(section, ["mitigation", "strategy", "solution"]) else 0)
+        score -= 5 if words(section) < 150 else 0
+    elif "risk" in " ".join(s.get("content", "") for s in sections).lower():
+        score = 5
+    breakdown["risk_assessment"] = score
+
+    score = 10
+    completed = sum(1 for s in sections if s.get("content") and len(s.get("content", "").strip()) > 50)
+    rate = completed / len(sections) if sections else 0
+    if rate >= 0.9:
+        score += 3
+    elif rate >= 0.7:
+        score += 1
+    elif rate < 0.5:
+        score -= 5
+    if any(s.get("edited_by_user", False) for s in sections):
+        score += 2
+    breakdown["presentation"] = score
+
+    return {category: max(0, min(100, value)) for category, value in breakdown.items()}
+
+
+def _comparable(totals: dict) -> dict:
+    return {key: value for key, value in totals.items() if key != "updated_at"}
+
+
+def test_incremental_writes_match_recompute():
+    sections = _sections()
+    totals = plan_metrics(sections, FINANCIAL_MODEL)
+
+    # A user edit of the competitive analysis
+    before = sections[2]
+    after = {**before, "content": "Our competitive advantage is a differentiator. " * 50, "edited_by_user": True}
+    after[METRICS_FIELD] = section_metrics(after)
+    sections[2] = after
+    totals = _write(totals, before, after)
+
+    # A generated SWOT section
+    swot = _section("swot_analysis", "Strengths and weaknesses. " * 40, -5)
+    sections.append(swot)
+    totals = _write(totals, None, swot)
+
+    # An edit of a section stored before metrics existed
+    legacy = {key: value for key, value in sections[3].items() if key != METRICS_FIELD}
+    edited = {**legacy, "content": "Nothing to see here."}
+    edited[METRICS_FIELD] = section_metrics(edited)
+    sections[3] = edited
+    totals = _write(totals, legacy, edited)
+
+    assert _comparable(totals) == _comparable(plan_metrics(sections, FINANCIAL_MODEL))
+    assert totals["first_section_at"] == swot["created_at"]
+
+
+def test_readiness_scores_first_section_of_category():
+    # Investor template: two risk sections, only the first is scored
+    sections = _sections() + [
+        _section("risk_analysis", "Risk of supply delays. " * 80, 4),
+        _section("investment_risks", "Some risks.", 5),
+    ]
+    totals = plan_metrics(sections, FINANCIAL_MODEL)
+    assert totals["readiness"]["risk_assessment"] == 13
+
+    before = sections[5]
+    after = {**before, "content": "Investors face dilution risk.", "edited_by_user": True}
+    after[METRICS_FIELD] = section_metrics(after)
+    sections[5] = after
+    totals = _write(totals, before, after)
+    assert totals["readiness"]["risk_assessment"] == 13
+
+    # Editing the first one does change the score
+    before = sections[4]
+    after = {**before, "content": "Key risks are listed below. " * 10, "edited_by_user": True}
+    after[METRICS_FIELD] = section_metrics(after)
+    sections[4] = after
+    totals = _write(totals, before, after)
+    assert totals["readiness"]["risk_assessment"] == 5
+    assert _comparable(totals) == _comparable(plan_metrics(sections, FINANCIAL_MODEL))
+
+
+def test_readiness_matches_baseline_scorer():
+    plans = [
+        _sections(),
+        # A market analysis that is also the plan's risk section
+        _sections() + [_section("market_analysis", "Market risks and their mitigation. " * 70, -1,
+                                title="Market & Risk Analysis")],
+        # Investor template: only the first risk section is scored
+        _sections() + [_section("risk_analysis", "Risk of supply delays. " * 80, 4),
+                       _section("investment_risks", "Some risks.", 5)],
+        [_section("competition analysis", "Our advantage. " * 150, 0),
+         _section("team", "Founders with experience. " * 100, 1, title="Team and Key Risks")],
+        [],
+    ]
+    for sections in plans:
+        assert readiness_breakdown(plan_metrics(sections, FINANCIAL_MODEL)) == _baseline_readiness(sections, FINANCIAL_MODEL)
+    assert readiness_breakdown(plan_metrics(plans[1], None))["risk_assessment"] == 15
+
+
+def test_scores():
+    totals = plan_metrics(_sections(), FINANCIAL_MODEL)
+    assert completion_percent(totals) == 75
+    assert quality_breakdown(totals) == {
+        "section_length": 12, "financial_completeness": 25, "detail_level": 6, "user_engagement": 6
+    }
+    assert readiness_breakdown(totals) == {
+        "executive_summary": 20,
+        "market_analysis": 20,
+        "financial_projections": 45,
+        "team_management": 0,
+        "competitive_analysis": 7,
+        "risk_assessment": 5,  # No risk section, but risks are mentioned
+        "presentation": 13
+    }
+    assert readiness_breakdown(plan_metrics([], None))["presentation"] == 5
+
+
+if __name__ == "__main__":
+    tests = [obj for name, obj in list(globals().items()) if name.startswith("test_")]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"{len(tests)} tests passed")
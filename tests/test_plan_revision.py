@@ -0,0 +1,39 @@
+"""
+Plan revision tests - ETag matching and revision bumps on plan updates.
+"""
+
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from utils.plan_revision import _etag_matches, with_revision_bump  # noqa: E402
+
+ETAG = 'W/"7-0123456789ab"'
+
+
+def test_if_none_match():
+    assert _etag_matches(ETAG, ETAG)
+    assert _etag_matches('"7-0123456789ab"', ETAG)  # weak comparison
+    assert _etag_matches('W/"6-0123456789ab", W/"7-0123456789ab"', ETAG)
+    assert _etag_matches("*", ETAG)
+    assert not _etag_matches('W/"6-0123456789ab"', ETAG)
+    assert not _etag_matches(None, ETAG)
+
+
+def test_revision_bump_keeps_other_operators():
+    update = {"$set": {"status": "complete"}, "$inc": {"version_counter": 1}}
+    bumped = with_revision_bump(update)
+    assert bumped == {"$set": {"status": "complete"}, "$inc": {"version_counter": 1, "revision": 1}}
+    assert update["$inc"] == {"version_counter": 1}
+    assert with_revision_bump({}) == {"$inc": {"revision": 1}}
+
+
+if __name__ == "__main__":
+    tests = [obj for name, obj in list(globals().items()) if name.startswith("test_")]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"{len(tests)} tests passed")
@@ -0,0 +1,167 @@
+"""
+Plan version tests - edits of sections stored before content digests existed
+are recorded as deltas, not keyframes.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from bson import ObjectId  # noqa: E402
+
+from utils.content_ast import content_ast_fields  # noqa: E402
+from utils.plan_versions import reconstruct_sections, record_version  # noqa: E402
+
+PLAN_ID = str(ObjectId())
+
+
+# ============================================================================
+# IN-MEMORY COLLECTIONS (just the operations plan_versions uses)
+# ============================================================================
+
+def _matches(doc: dict, query: dict) -> bool:
+    for key, condition in query.items():
+        value = doc.get(key)
+        if isinstance(condition, dict):
+            if "$exists" in condition and (key in doc) != condition["$exists"]:
+                return False
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+            if "$gte" in condition and not value >= condition["$gte"]:
+                return False
+            if "$lte" in condition and not value <= condition["$lte"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+def _project(doc: dict, projection: dict) -> dict:
+    if not projection:
+        return dict(doc)
+    if any(projection.values()):
+        return {key: value for key, value in doc.items() if key == "_id" or projection.get(key)}
+    return {key: value for key, value in doc.items() if key not in projection}
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, field, direction):
+        self.docs.sort(key=lambda d: d.get(field), reverse=direction < 0)
+        return self
+
+    async def to_list(self, length):
+        return self.docs
+
+
+class FakeCollection:
+    def __init__(self, docs=None):
+        self.docs = docs or []
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append((query, projection))
+        return FakeCursor([_project(d, projection) for d in self.docs if _matches(d, query)])
+
+    async def find_one(self, query, projection=None, sort=None):
+        docs = [d for d in self.docs if _matches(d, query)]
+        for field, direction in sort or []:
+            docs.sort(key=lambda d: d.get(field), reverse=direction < 0)
+        return _project(docs[0], projection) if docs else None
+
+    async def update_one(self, query, update):
+        for doc in self.docs:
+            if _matches(doc, query):
+                doc.update(update.get("$set", {}))
+                return
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=None):
+        for doc in self.docs:
+            if _matches(doc, query):
+                for key, delta in update.get("$inc", {}).items():
+                    doc[key] = doc.get(key, 0) + delta
+                return _project(doc, projection)
+        return None
+
+    async def insert_one(self, doc):
+        self.docs.append(doc)
+
+
+class FakeDB:
+    def __init__(self, sections):
+        self.plans = FakeCollection([{"_id": ObjectId(PLAN_ID)}])
+        self.sections = FakeCollection(sections)
+        self.plan_versions = FakeCollection()
+
+
+def _legacy_sections() -> list:
+    """Sections as stored before content_digest / content_ast existed"""
+    return [
+        {"_id": ObjectId(), "plan_id": PLAN_ID, "section_type": section_type, "order_index": index,
+         "content": f"{section_type} line one\n{section_type} line two\n"}
+        for index, section_type in enumerate(("executive_summary", "market_analysis", "operations_plan"))
+    ]
+
+
+async def _edit(db, section: dict, new_content: str) -> dict:
+    """Update a section's content the way the routes do, then record the version"""
+    old_content = section["content"]
+    section.update({"content": new_content, **content_ast_fields(new_content)})
+    return await record_version(db, PLAN_ID, "user-1", str(section["_id"]), old_content, new_content)
+
+
+# ============================================================================
+# TESTS
+# ============================================================================
+
+def test_digestless_sections_are_delta_encoded():
+    async def run():
+        sections = _legacy_sections()
+        db = FakeDB(sections)
+
+        first = await _edit(db, sections[0], "A new summary\n")
+        assert first["kind"] == "keyframe"
+
+        # Edits of the other (digest-less) sections continue the chain
+        second = await _edit(db, sections[1], "market_analysis line one\nA new second line\n")
+        third = await _edit(db, sections[2], "operations_plan rewritten\n")
+        assert [second["kind"], third["kind"]] == ["delta", "delta"]
+        assert third["keyframe_version"] == first["version_number"]
+
+        restored = await reconstruct_sections(db, PLAN_ID, third)
+        assert [s["content"] for s in restored] == [s["content"] for s in sections]
+
+    asyncio.run(run())
+
+
+def test_digests_are_read_from_content_only_when_missing():
+    async def run():
+        sections = _legacy_sections()
+        db = FakeDB(sections)
+
+        # A keyframe written by an earlier release: sections still lack digests
+        await _edit(db, sections[0], "A new summary\n")
+        for section in sections[1:]:
+            del section["content_ast"], section["content_digest"]
+
+        db.sections.queries.clear()
+        version = await _edit(db, sections[1], "market_analysis changed\n")
+        assert version["kind"] == "delta"
+        content_queries = [q for q, projection in db.sections.queries if projection == {"content": 1}]
+        assert content_queries == [{"_id": {"$in": [sections[2]["_id"]]}}]
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    tests = [obj for name, obj in list(globals().items()) if name.startswith("test_")]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"{len(tests)} tests passed")
@@ -0,0 +1,141 @@
+"""
+Stripe checkout tests - the async client against a local mock Stripe server.
+
+The server answers the two Checkout endpoints the app uses and counts
+requests, so the tests can check status caching, request coalescing and
+retries without network access or real keys.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+
+class MockStripe(BaseHTTPRequestHandler):
+    sessions = {}
+    retrieves = 0
+    fail_next = 0
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body):
+        raw = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode("utf-8"))
+        session_id = f"cs_test_{len(MockStripe.sessions) + 1}"
+        MockStripe.sessions[session_id] = {
+            "id": session_id,
+            "object": "checkout.session",
+            "url": f"https://checkout.stripe.test/{session_id}",
+            "status": "open",
+            "payment_status": "unpaid",
+            "amount_total": int(form["line_items[0][price_data][unit_amount]"][0]),
+            "currency": form["line_items[0][price_data][currency]"][0],
+            "metadata": {"tier": form["metadata[tier]"][0]},
+        }
+        self._send(200, MockStripe.sessions[session_id])
+
+    def do_GET(self):
+        MockStripe.retrieves += 1
+        if MockStripe.fail_next:
+            MockStripe.fail_next -= 1
+            self._send(500, {"error": {"type": "api_error", "message": "boom"}})
+            return
+        session_id = self.path.split("?")[0].rsplit("/", 1)[-1]
+        self._send(200, MockStripe.sessions[session_id])
+
+
+_server = ThreadingHTTPServer(("127.0.0.1", 0), MockStripe)
+threading.Thread(target=_server.serve_forever, daemon=True).start()
+os.environ["STRIPE_API_BASE"] = f"http://127.0.0.1:{_server.server_port}"
+
+from emergentintegrations.payments.stripe import checkout  # noqa: E402
+from emergentintegrations.payments.stripe.checkout import (  # noqa: E402
+    CheckoutSessionRequest,
+    StripeCheckout,
+)
+
+
+async def _create(stripe_checkout, tier="starter"):
+    return await stripe_checkout.create_checkout_session(CheckoutSessionRequest(
+        amount=12.00,
+        currency="gbp",
+        success_url="https://app.test/success",
+        cancel_url="https://app.test/cancel",
+        metadata={"tier": tier},
+    ))
+
+
+def test_create_and_cached_status():
+    async def run():
+        stripe_checkout = StripeCheckout(api_key="sk_test_mock")
+        session = await _create(stripe_checkout)
+        assert session.url.endswith(session.session_id)
+
+        before = MockStripe.retrieves
+        first = await stripe_checkout.get_checkout_status(session.session_id)
+        second = await stripe_checkout.get_checkout_status(session.session_id)
+        assert first == second
+        assert first.amount_total == 1200 and first.metadata == {"tier": "starter"}
+        assert MockStripe.retrieves - before == 1
+
+        # A webhook for the session drops the cached status
+        checkout.invalidate_checkout_status(session.session_id)
+        await stripe_checkout.get_checkout_status(session.session_id)
+        assert MockStripe.retrieves - before == 2
+
+    asyncio.run(run())
+
+
+def test_concurrent_polls_share_one_request():
+    async def run():
+        stripe_checkout = StripeCheckout(api_key="sk_test_mock")
+        session = await _create(stripe_checkout, tier="professional")
+
+        before = MockStripe.retrieves
+        results = await asyncio.gather(*[
+            stripe_checkout.get_checkout_status(session.session_id) for _ in range(10)
+        ])
+        assert all(r.metadata == {"tier": "professional"} for r in results)
+        assert MockStripe.retrieves - before == 1
+
+    asyncio.run(run())
+
+
+def test_server_errors_are_retried():
+    async def run():
+        stripe_checkout = StripeCheckout(api_key="sk_test_mock")
+        session = await _create(stripe_checkout)
+
+        before = MockStripe.retrieves
+        MockStripe.fail_next = 1
+        status = await stripe_checkout.get_checkout_status(session.session_id)
+        assert status.status == "open"
+        assert MockStripe.retrieves - before == 2
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    tests = [obj for name, obj in list(globals().items()) if name.startswith("test_")]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"{len(tests)} tests passed")
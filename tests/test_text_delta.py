@@ -0,0 +1,53 @@
+"""
+Text delta tests - plan versions store line deltas, so applying a delta must
+reproduce the edited section exactly.
+"""
+
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from utils.text_delta import apply_delta, text_delta  # noqa: E402
+
+BASE = "## Market\n\nDemand is strong.\nCafés and offices.\n\n## Risks\nSupply costs.\n"
+
+
+def test_round_trip_edits():
+    edits = [
+        BASE.replace("strong", "very strong"),
+        BASE + "New closing paragraph without newline",
+        BASE.replace("## Risks\nSupply costs.\n", ""),
+        "",
+        "<p>Rewritten in the editor</p>",
+    ]
+    for new in edits:
+        assert apply_delta(BASE, text_delta(BASE, new)) == new
+    assert apply_delta("", text_delta("", BASE)) == BASE
+
+
+def test_delta_is_smaller_than_text_for_small_edits():
+    long_text = "".join(f"Paragraph {i} of the plan.\n" for i in range(200))
+    edited = long_text.replace("Paragraph 100 ", "Paragraph one hundred ")
+    ops = text_delta(long_text, edited)
+    inserted = [line for op, value in ops if op == "+" for line in value]
+    assert inserted == ["Paragraph one hundred of the plan.\n"]
+
+
+def test_delta_rejects_wrong_base():
+    ops = text_delta(BASE, BASE.upper())
+    try:
+        apply_delta("short\n", ops)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("applying a delta to another text must fail")
+
+
+if __name__ == "__main__":
+    test_round_trip_edits()
+    test_delta_is_smaller_than_text_for_small_edits()
+    test_delta_rejects_wrong_base()
+    print("✓ text delta tests passed")